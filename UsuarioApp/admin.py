@@ -1,14 +1,35 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
 
-# Register your models here.
-from django.contrib import admin
+from .directorio import anotar_verificacion, buscar, directorio
 from .models import Profile, Position
 
 # Register your models here.
 
 
-class ProfileAdmin(admin.ModelAdmin):
-    list_display = ("user_FK",)
+class DirectorioAdminMixin:
+    """Listados del admin con las consultas del directorio (UsuarioApp.directorio)."""
+
+    prefijo_usuario = ""
+
+    @admin.display(boolean=True, description="Verificado", ordering="verificado")
+    def verificado(self, obj):
+        return obj.verificado
+
+    def get_search_results(self, request, queryset, search_term):
+        return buscar(queryset, search_term, self.prefijo_usuario), False
+
+
+class ProfileAdmin(DirectorioAdminMixin, admin.ModelAdmin):
+    list_display = ("user_FK", "position_FK", "verificado", "last_activity")
+    list_filter = ("position_FK",)
+    list_select_related = ("user_FK", "position_FK")
+    search_fields = ("user_FK__username",)
+    prefijo_usuario = "user_FK__"
+
+    def get_queryset(self, request):
+        return anotar_verificacion(super().get_queryset(request), "user_FK")
 
 
 admin.site.register(Profile, ProfileAdmin)
@@ -19,3 +40,19 @@ class PositionAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Position, PositionAdmin)
+
+
+class DirectorioUserAdmin(DirectorioAdminMixin, UserAdmin):
+    list_display = ("username", "first_name", "last_name", "email", "cargo", "verificado", "is_staff")
+
+    @admin.display(description="Cargo", ordering="profile__position_FK")
+    def cargo(self, obj):
+        perfil = getattr(obj, "profile", None)
+        return perfil.position_FK if perfil else None
+
+    def get_queryset(self, request):
+        return directorio()
+
+
+admin.site.unregister(User)
+admin.site.register(User, DirectorioUserAdmin)
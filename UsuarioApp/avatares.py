@@ -0,0 +1,72 @@
+# UsuarioApp/avatares.py
+"""
+Procesamiento de fotos de perfil fuera del request.
+
+Al guardar un Profile con una imagen nueva, `programar()` encarga a un pool
+de hilos (AVATARES_HILOS; 0 = en línea) la generación de las variantes de
+`utils.customer_img.procesar_avatar`. Cuando terminan se guarda el hash en
+`Profile.avatar_hash`; hasta entonces las plantillas muestran la imagen
+original.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from utils.customer_img import TAMANOS_AVATAR, borrar_variantes, procesar_avatar, ruta_variante
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def _hilos():
+    return getattr(settings, "AVATARES_HILOS", 2)
+
+
+def _ejecutor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=_hilos(), thread_name_prefix="avatares")
+    return _pool
+
+
+def procesar(pk, nombre, hash_anterior=""):
+    """Genera las variantes de `nombre` y las asigna al perfil si sigue usando esa imagen."""
+    from reportes.profiling import perfilar_trabajo
+
+    from .models import Profile
+
+    try:
+        with perfilar_trabajo("avatares"):
+            digest = procesar_avatar(nombre, origen=Profile._meta.get_field("image").storage)
+        if digest:
+            Profile.objects.filter(pk=pk, image=nombre).update(avatar_hash=digest)
+        # Las variantes se comparten entre perfiles con la misma foto
+        if hash_anterior and hash_anterior != digest and not Profile.objects.filter(avatar_hash=hash_anterior).exists():
+            borrar_variantes(hash_anterior)
+        return digest
+    except Exception:
+        logger.exception("No se pudo procesar el avatar %s", nombre)
+    finally:
+        if _hilos():
+            close_old_connections()
+
+
+def programar(profile, hash_anterior=""):
+    """Encola el procesamiento una vez confirmada la transacción del guardado."""
+    args = (profile.pk, profile.image.name, hash_anterior)
+    if not _hilos():
+        transaction.on_commit(lambda: procesar(*args))
+    else:
+        transaction.on_commit(lambda: _ejecutor().submit(procesar, *args))
+
+
+def url_variante(profile, tam):
+    """URL de la variante más chica de al menos `tam` px, o la imagen original."""
+    if not profile.avatar_hash:
+        return profile.image.url
+    elegido = next((t for t in sorted(TAMANOS_AVATAR) if t >= tam), max(TAMANOS_AVATAR))
+    return f"{settings.MEDIA_URL}{ruta_variante(profile.avatar_hash, elegido)}"
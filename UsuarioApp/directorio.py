@@ -0,0 +1,43 @@
+# UsuarioApp/directorio.py
+"""
+Consultas del directorio de usuarios, compartidas por la lista de usuarios y
+el admin.
+
+`directorio()` trae en una sola consulta cada usuario con su perfil y cargo
+(`select_related`) y el estado de verificación del email anotado con
+`Exists` (`verificado`), así que una página cuesta un número fijo de
+consultas sin importar cuántos usuarios muestre.
+
+`buscar()` filtra por prefijo de usuario, nombre o apellido: cada palabra
+del texto debe ser el comienzo de alguno de los tres campos. Con prefijos
+SQLite usa los índices `COLLATE NOCASE` de la migración 0005 en vez de
+recorrer la tabla completa.
+"""
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef, Q
+
+CAMPOS_BUSQUEDA = ("username", "first_name", "last_name")
+
+
+def anotar_verificacion(queryset, campo_usuario="pk"):
+    """Agrega `verificado` (email verificado en allauth) a `queryset`."""
+    verificados = EmailAddress.objects.filter(user=OuterRef(campo_usuario), verified=True)
+    return queryset.annotate(verificado=Exists(verificados))
+
+
+def buscar(queryset, texto, prefijo=""):
+    """Filtra `queryset` por prefijo; `prefijo` es la ruta al usuario (p.ej. "user_FK__")."""
+    for palabra in (texto or "").split():
+        condicion = Q()
+        for campo in CAMPOS_BUSQUEDA:
+            condicion |= Q(**{f"{prefijo}{campo}__istartswith": palabra})
+        queryset = queryset.filter(condicion)
+    return queryset
+
+
+def directorio(texto=None):
+    """Usuarios del directorio, del más reciente al más antiguo."""
+    queryset = User.objects.select_related("profile", "profile__position_FK").order_by("-id")
+    return anotar_verificacion(buscar(queryset, texto))
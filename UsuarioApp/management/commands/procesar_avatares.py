@@ -0,0 +1,24 @@
+# UsuarioApp/management/commands/procesar_avatares.py
+
+from django.core.management.base import BaseCommand
+
+from UsuarioApp import avatares
+from UsuarioApp.models import Profile
+from utils.customer_img import IMAGEN_POR_DEFECTO
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP de las fotos de perfil que todavía no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todos", action="store_true", help="Reprocesa también los perfiles con variantes.")
+
+    def handle(self, *args, **options):
+        perfiles = Profile.objects.exclude(image=IMAGEN_POR_DEFECTO).exclude(image="")
+        if not options["todos"]:
+            perfiles = perfiles.filter(avatar_hash="")
+        procesados = 0
+        for pk, nombre in perfiles.values_list("pk", "image"):
+            if avatares.procesar(pk, nombre):
+                procesados += 1
+        self.stdout.write(self.style.SUCCESS(f"Avatares procesados: {procesados}"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("UsuarioApp", "0002_alter_position_permission_code"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="avatar_hash",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:57
+
+import UsuarioApp.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("UsuarioApp", "0003_profile_avatar_hash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profile",
+            name="image",
+            field=models.ImageField(
+                default="profile.webp",
+                storage=core.storage.almacen_contenido,
+                upload_to=UsuarioApp.models.profile_picture_path,
+            ),
+        ),
+    ]
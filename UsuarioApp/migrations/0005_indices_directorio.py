@@ -0,0 +1,37 @@
+# Índices para la búsqueda por prefijo del directorio (UsuarioApp.directorio)
+
+from django.db import migrations
+
+INDICES = {
+    "idx_usuario_username_nocase": "username",
+    "idx_usuario_nombre_nocase": "first_name",
+    "idx_usuario_apellido_nocase": "last_name",
+}
+
+
+def crear_indices(apps, schema_editor):
+    # `istartswith` en SQLite es un LIKE sin distinción de mayúsculas, que
+    # solo usa índices declarados con COLLATE NOCASE
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre, columna in INDICES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{nombre}" ON "auth_user" ("{columna}" COLLATE NOCASE)')
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{nombre}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("UsuarioApp", "0004_alter_profile_image"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
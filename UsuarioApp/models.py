@@ -7,7 +7,10 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
 import os
-from utils.customer_img import resize_image, crop_image, handle_old_image
+from utils.customer_img import IMAGEN_POR_DEFECTO, handle_old_image
+from core.escrituras import diferir
+from core.storage import almacen_contenido
+from . import avatares
 
 
 def profile_picture_path(instance, filename):
@@ -32,7 +35,8 @@ class Position(models.Model):
 
 class Profile(models.Model):
     last_activity = models.DateTimeField(null=True, blank=True)
-    image = models.ImageField(upload_to=profile_picture_path, default="profile.webp")
+    # Almacén por contenido: la carpeta de upload_to se ignora, cuenta la extensión
+    image = models.ImageField(upload_to=profile_picture_path, storage=almacen_contenido, default="profile.webp")
     user_FK = models.OneToOneField(
         User, on_delete=models.CASCADE, related_name="profile"
     )
@@ -40,6 +44,16 @@ class Profile(models.Model):
         Position, on_delete=models.SET_NULL, null=True, blank=True
     )
 
+    # Hash de las variantes WebP (UsuarioApp.avatares); vacío mientras se procesan
+    avatar_hash = models.CharField(max_length=32, blank=True, default="")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Imagen con la que se cargó: evita releer el perfil al guardar
+        instance._imagen_cargada = instance.__dict__.get("image")
+        return instance
+
     def save(self, *args, **kwargs):
         update_last_activity = kwargs.pop("update_last_activity", False)
 
@@ -47,17 +61,36 @@ class Profile(models.Model):
             self.last_activity = timezone.now()
             kwargs["update_fields"] = ["last_activity"]
 
-        if self.pk:
-            handle_old_image(Profile, self.pk, self.image)
+        anterior = getattr(self, "_imagen_cargada", None)
+        subida = bool(self.image) and not self.image._committed
+        conocida = self._state.adding or anterior is not None
+        nueva = conocida and self.image.name not in (anterior, IMAGEN_POR_DEFECTO)
+        hash_anterior = self.avatar_hash
+        if nueva:
+            self.avatar_hash = ""
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = list(kwargs["update_fields"]) + ["avatar_hash"]
 
         super(Profile, self).save(*args, **kwargs)
 
-        if self.image and os.path.exists(self.image.path):
-            resize_image(self.image.path, 300)
-            crop_image(self.image.path, 300)
+        if subida and anterior is not None:
+            handle_old_image(anterior, self.image)
+        self._imagen_cargada = self.image.name
+        if nueva and self.image:
+            avatares.programar(self, hash_anterior)
+
+    def avatar_url(self, tam):
+        return avatares.url_variante(self, tam)
 
     def update_last_activity(self):
-        self.save(update_last_activity=True)
+        # UPDATE directo (sin pasar por save());
+        # con ESCRITURAS_DIFERIDAS lo aplica la cola de escrituras
+        self.last_activity = timezone.now()
+        diferir(
+            Profile.objects.filter(pk=self.pk).update,
+            last_activity=self.last_activity,
+            operacion="ultima_actividad",
+        )
 
     class Meta:
         verbose_name = "Perfil"
@@ -0,0 +1,12 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def avatar(profile, tam):
+    """{{ user.profile|avatar:32 }}: URL de la variante más chica que cubre `tam` px."""
+    # Usuarios sin perfil: la variable llega como "" (igual que antes profile.image.url)
+    if not hasattr(profile, "avatar_url"):
+        return ""
+    return profile.avatar_url(int(tam))
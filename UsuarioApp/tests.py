@@ -1,3 +1,132 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from allauth.account.models import EmailAddress
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from utils.customer_img import procesar_avatar, ruta_variante
+
+from .directorio import directorio
+from .models import Position, Profile
+
+MEDIA_PRUEBAS = tempfile.mkdtemp()
+
+
+def imagen_subida(nombre="foto.png", tam=(500, 300), color="red"):
+    salida = io.BytesIO()
+    Image.new("RGB", tam, color).save(salida, "PNG")
+    return SimpleUploadedFile(nombre, salida.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, AVATARES_HILOS=0)
+class AvataresTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def perfil(self, username):
+        return Profile.objects.create(user_FK=User.objects.create_user(username, password="x"))
+
+    def subir(self, perfil, imagen):
+        perfil = Profile.objects.get(pk=perfil.pk)
+        perfil.image = imagen
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+        return Profile.objects.get(pk=perfil.pk)
+
+    def test_variantes_cuadradas_webp_y_la_mas_chica_que_cubre(self):
+        perfil = self.subir(self.perfil("ana"), imagen_subida())
+        self.assertTrue(perfil.avatar_hash)
+        for tam in (32, 64, 300):
+            with default_storage.open(ruta_variante(perfil.avatar_hash, tam)) as f, Image.open(f) as img:
+                self.assertEqual((img.format, img.size), ("WEBP", (tam, tam)))
+        self.assertTrue(perfil.avatar_url(32).endswith("-32.webp"))
+        self.assertTrue(perfil.avatar_url(40).endswith("-64.webp"))
+        self.assertTrue(perfil.avatar_url(600).endswith("-300.webp"))
+
+    def test_misma_foto_comparte_archivo_y_variantes(self):
+        primero = self.subir(self.perfil("ana"), imagen_subida())
+        segundo = self.subir(self.perfil("bea"), imagen_subida("otra.png"))
+        self.assertEqual(primero.avatar_hash, segundo.avatar_hash)
+
+        # Almacén por contenido: la misma foto es un solo archivo con dos referencias
+        self.assertEqual(primero.image.name, segundo.image.name)
+        almacen = primero.image.storage
+        self.assertEqual(almacen.referencias(primero.image.name), 2)
+
+        segundo = self.subir(segundo, imagen_subida(color="blue"))
+        self.assertNotEqual(segundo.avatar_hash, primero.avatar_hash)
+        self.assertEqual(almacen.referencias(primero.image.name), 1)
+        # Original y variantes siguen en uso por el primer perfil
+        self.assertTrue(almacen.exists(primero.image.name))
+        self.assertTrue(default_storage.exists(ruta_variante(primero.avatar_hash, 32)))
+
+        primero = self.subir(primero, imagen_subida(color="blue"))
+        self.assertEqual(primero.image.name, segundo.image.name)
+        self.assertEqual(almacen.referencias(primero.image.name), 2)
+
+    def test_archivo_que_no_es_imagen_se_registra_en_el_log(self):
+        nombre = default_storage.save("users/no_imagen.png", io.BytesIO(b"no es una imagen"))
+        with self.assertLogs("utils.customer_img", "WARNING") as registro:
+            self.assertIsNone(procesar_avatar(nombre))
+        self.assertIn(nombre, registro.output[0])
+        self.assertIn("UnidentifiedImageError", registro.output[0])
+
+    def test_sin_variantes_usa_la_imagen_original(self):
+        perfil = self.perfil("ana")
+        self.assertEqual(perfil.avatar_url(32), perfil.image.url)
+        perfil.update_last_activity()
+        self.assertEqual(Profile.objects.get(pk=perfil.pk).avatar_hash, "")
+
+
+class DirectorioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cargo = Position.objects.create(user_position="Matrona")
+        for i in range(6):
+            usuario = User.objects.create_user(f"usuario{i}", password="x", first_name=f"Nombre{i}", last_name="Soto")
+            Profile.objects.create(user_FK=usuario, position_FK=cargo)
+            EmailAddress.objects.create(user=usuario, email=f"u{i}@h.cl", verified=i % 2 == 0)
+        cls.admin = User.objects.create_superuser("admin", password="x")
+        Profile.objects.create(user_FK=cls.admin)
+
+    def consultas(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(capturadas)
+
+    def test_consultas_constantes_por_pagina(self):
+        self.client.force_login(self.admin)
+        base = self.consultas(reverse("User"))
+        for i in range(6, 12):
+            usuario = User.objects.create_user(f"usuario{i}", password="x")
+            Profile.objects.create(user_FK=usuario)
+        self.assertEqual(self.consultas(reverse("User")), base)
+        admin_base = self.consultas(reverse("admin:auth_user_changelist"))
+        User.objects.create_user("otro", password="x")
+        self.assertEqual(self.consultas(reverse("admin:auth_user_changelist")), admin_base)
+
+    def test_verificacion_anotada_y_busqueda_por_prefijo(self):
+        verificados = dict(directorio().values_list("username", "verificado"))
+        self.assertTrue(verificados["usuario0"])
+        self.assertFalse(verificados["usuario1"])
+        self.assertEqual(list(directorio("nombre3 SOTO").values_list("username", flat=True)), ["usuario3"])
+        self.assertFalse(directorio("ombre3").exists())
+
+    def test_busqueda_usa_indices(self):
+        # Sin ORDER BY: en una tabla chica y sin ANALYZE el planificador prefiere recorrer por id
+        sql, params = directorio("usu").order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(fila) for fila in cursor.fetchall())
+        self.assertIn("idx_usuario_username_nocase", plan)
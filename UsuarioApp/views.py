@@ -4,10 +4,9 @@ from django.views.generic import ListView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.shortcuts import redirect, render
-from django.db.models import Q
-from allauth.account.models import EmailAddress
 from django.contrib import messages
 from core.mixins import PermitsPositionMixin
+from .directorio import directorio
 
 # Create your views here.
 
@@ -19,27 +18,11 @@ class UserListView(LoginRequiredMixin, ListView):
     paginate_by = 9
 
     def get_queryset(self):
-        queryset = super().get_queryset().order_by("-id")
-        search_query = self.request.GET.get("search")
-
-        if search_query:
-            queryset = queryset.filter(
-                Q(username__icontains=search_query)
-                | Q(first_name__icontains=search_query)
-                | Q(last_name__icontains=search_query)
-            )
-        return queryset
+        # Perfil, cargo y verificación en la misma consulta (UsuarioApp.directorio)
+        return directorio(self.request.GET.get("search"))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        verification_users = []
-        for user in context["users"]:
-            verification = EmailAddress.objects.filter(
-                user=user, verified=True
-            ).exists()
-            verification_users.append((user, verification))
-
-        context["verification_users"] = verification_users
         context["placeholder"] = "Buscar por usuario, nombre o apellido "
         # Para mantener el texto en el campo de búsqueda
         context["search_query"] = self.request.GET.get("search", "")
@@ -0,0 +1,182 @@
+# clinica/brazaletes.py
+"""
+Hojas imprimibles de brazaletes y etiquetas de recién nacidos con el código
+QR de su identificador (`RN-<parto>-<rn>`).
+
+Los recién nacidos se eligen por parto, por id o por ventana de fecha del
+parto (un turno completo). Se leen con `values_list` (sin instanciar modelos),
+los QR salen de `clinica.qr.generar` ya dibujados como operadores vectoriales
+(caché LRU en memoria y pool de procesos para lotes grandes) y la hoja se
+dibuja directamente en el canvas de reportlab, en un archivo temporal que se
+sirve con `FileResponse`.
+"""
+
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import RecienNacido
+
+MAX_COPIAS = 4
+# reportlab.lib.units.cm; reportlab y qrcode se importan al generar la hoja,
+# no al cargar las URLs (igual que los exportadores de reportes)
+cm = 72 / 2.54
+
+
+@dataclass(frozen=True)
+class Formato:
+    columnas: int
+    filas: int
+    ancho: float
+    alto: float
+    qr: float
+
+
+# Etiquetas: 2 x 10 en carta (ficha, cuna, muestras). Brazaletes: una tira por fila.
+FORMATOS = {
+    "etiquetas": Formato(columnas=2, filas=10, ancho=9.5 * cm, alto=2.5 * cm, qr=2.2 * cm),
+    "brazaletes": Formato(columnas=1, filas=9, ancho=19 * cm, alto=2.8 * cm, qr=2.5 * cm),
+}
+
+COLUMNAS = (
+    "identificador",
+    "parto__paciente__nombre_completo",
+    "parto__paciente__rut",
+    "parto__fecha_hora",
+    "sexo",
+    "peso_gramos",
+)
+
+
+def momento(valor):
+    """Fecha u hora de un parámetro (`2024-05-01` o `2024-05-01T08:00`); ValueError si no lo es."""
+    if not valor:
+        return None
+    resultado = parse_datetime(valor)
+    if resultado is None:
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise ValueError(valor)
+        resultado = datetime.combine(fecha, datetime.min.time())
+    return timezone.make_aware(resultado) if timezone.is_naive(resultado) else resultado
+
+
+def ventana(desde, hasta, max_horas):
+    """
+    (desde, hasta) de un turno pedido por la web: ambos extremos, en orden y
+    de a lo más `max_horas`. ValueError si no.
+    """
+    desde, hasta = momento(desde), momento(hasta)
+    if (desde is None) != (hasta is None):
+        raise ValueError("Indique desde y hasta")
+    if desde is not None and not timedelta(0) < hasta - desde <= timedelta(hours=max_horas):
+        raise ValueError(f"La ventana debe durar entre 0 y {max_horas} horas")
+    return desde, hasta
+
+
+def seleccionar(partos=(), recien_nacidos=(), desde=None, hasta=None):
+    """
+    Recién nacidos de los `partos` indicados, más los `recien_nacidos` por id,
+    más los de partos ocurridos en [desde, hasta). Vacío si no hay criterio.
+    """
+    qs = RecienNacido.objects.none()
+    if partos:
+        qs = qs | RecienNacido.objects.filter(parto_id__in=partos)
+    if recien_nacidos:
+        qs = qs | RecienNacido.objects.filter(pk__in=recien_nacidos)
+    if desde or hasta:
+        turno = RecienNacido.objects.all()
+        if desde:
+            turno = turno.filter(parto__fecha_hora__gte=desde)
+        if hasta:
+            turno = turno.filter(parto__fecha_hora__lt=hasta)
+        qs = qs | turno
+    return qs
+
+
+def filas(qs, limite=None):
+    """Tuplas de COLUMNAS en orden de parto (a lo más `limite`)."""
+    qs = qs.exclude(identificador="").order_by("parto__fecha_hora", "parto_id", "id").values_list(*COLUMNAS)
+    return list(qs[:limite] if limite is not None else qs)
+
+
+def _recortar(c, texto, fuente, tamano, ancho):
+    if c.stringWidth(texto, fuente, tamano) <= ancho:
+        return texto
+    while texto and c.stringWidth(f"{texto}…", fuente, tamano) > ancho:
+        texto = texto[:-1]
+    return f"{texto}…"
+
+
+def _qr(c, x, y, lado, dibujo):
+    modulos, operadores = dibujo
+    c.saveState()
+    c.translate(x, y)
+    c.scale(lado / modulos, lado / modulos)
+    c.setFillColorRGB(0, 0, 0)
+    c.addLiteral(operadores)
+    c.restoreState()
+
+
+def _etiqueta(c, x, y, formato, fila, dibujo):
+    identificador, madre, rut, fecha, sexo, peso = fila
+    margen = 0.15 * cm
+    c.roundRect(x, y, formato.ancho, formato.alto, 0.2 * cm, stroke=1, fill=0)
+    _qr(c, x + margen, y + (formato.alto - formato.qr) / 2, formato.qr, dibujo)
+
+    texto_x = x + formato.qr + 2 * margen
+    ancho = formato.ancho - formato.qr - 3 * margen
+    linea = formato.alto - 0.55 * cm
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(texto_x, y + linea, identificador)
+    c.setFont("Helvetica", 8)
+    c.drawString(texto_x, y + linea - 0.45 * cm, _recortar(c, f"Madre: {madre}", "Helvetica", 8, ancho))
+    c.drawString(texto_x, y + linea - 0.85 * cm, f"RUT: {rut}")
+    c.drawString(
+        texto_x, y + linea - 1.25 * cm,
+        f"{timezone.localtime(fecha):%d/%m/%Y %H:%M}  ·  Sexo: {sexo}  ·  {peso} g",
+    )
+
+
+def escribir_hoja(filas_, formato="etiquetas", copias=1, procesos=None):
+    """PDF con `copias` etiquetas por recién nacido; devuelve el archivo rebobinado."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    from . import qr
+
+    formato = FORMATOS[formato]
+    dibujos = qr.generar([fila[0] for fila in filas_], procesos)
+    archivo = tempfile.TemporaryFile(suffix=".pdf")
+    c = pdf_canvas.Canvas(archivo, pagesize=letter, pageCompression=1)
+    c.setTitle("Brazaletes de recién nacidos")
+
+    ancho_pagina, alto_pagina = letter
+    x0 = (ancho_pagina - formato.columnas * formato.ancho) / 2
+    y0 = (alto_pagina + formato.filas * formato.alto) / 2
+    por_pagina = formato.columnas * formato.filas
+    n = 0
+    for fila in filas_:
+        for _ in range(copias):
+            if n and n % por_pagina == 0:
+                c.showPage()
+            posicion = n % por_pagina
+            x = x0 + (posicion % formato.columnas) * formato.ancho
+            y = y0 - (posicion // formato.columnas + 1) * formato.alto
+            _etiqueta(c, x, y, formato, fila, dibujos[fila[0]])
+            n += 1
+    c.save()
+    archivo.seek(0)
+    return archivo
+
+
+def respuesta(filas_, formato="etiquetas", copias=1):
+    nombre = f"{formato.capitalize()}_RN_{timezone.localdate():%Y%m%d}.pdf"
+    return FileResponse(
+        escribir_hoja(filas_, formato, copias), as_attachment=True, filename=nombre,
+        content_type="application/pdf",
+    )
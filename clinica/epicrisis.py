@@ -0,0 +1,288 @@
+# clinica/epicrisis.py
+"""
+Epicrisis (resumen de alta) en PDF por cada Alta: madre, parto, recién
+nacidos y datos del egreso.
+
+El documento se genera una vez, fuera del request, al confirmarse la
+transacción que guarda el alta o cualquiera de sus filas relacionadas
+(`programar`, desde las señales de `clinica.signals`), en un pool de hilos
+(EPICRISIS_HILOS; 0 = en línea). Se guarda en el storage por defecto como
+`epicrisis/<alta>/<version>.pdf`, donde la versión es un hash de las
+`fecha_actualizacion` del alta, el parto, la paciente y los recién nacidos
+(más la cantidad de estos últimos). `obtener` sirve el archivo de la versión
+vigente y solo lo genera si los datos cambiaron desde la última vez.
+"""
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.metrics import medir_exportacion, registrar_cache
+
+from .models import Alta, RecienNacido
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "epicrisis/"
+# Subirlo cuando cambie el contenido o el diseño del documento
+FORMATO = 1
+
+_pool = None
+_pendientes = set()
+_lock = threading.Lock()
+
+
+def _hilos():
+    return getattr(settings, "EPICRISIS_HILOS", 2)
+
+
+def _ejecutor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=_hilos(), thread_name_prefix="epicrisis")
+    return _pool
+
+
+# --- VERSIÓN Y ALMACENAMIENTO ---
+
+def version(alta_pk):
+    """Hash de los datos de los que depende el documento; None si el alta no existe."""
+    fila = (
+        Alta.objects.filter(pk=alta_pk)
+        .values_list("fecha_actualizacion", "parto__fecha_actualizacion", "parto__paciente__fecha_actualizacion")
+        .annotate(
+            rn_ultima=Max("parto__recien_nacidos__fecha_actualizacion"),
+            rn_total=Count("parto__recien_nacidos"),
+        )
+        .order_by("pk")
+        .first()
+    )
+    if fila is None:
+        return None
+    firma = "|".join(str(valor) for valor in (FORMATO, *fila))
+    return hashlib.sha256(firma.encode()).hexdigest()[:20]
+
+
+def nombre(alta_pk, version_):
+    return f"{PREFIJO}{alta_pk}/{version_}.pdf"
+
+
+def _borrar_anteriores(alta_pk, vigente=None, storage=None):
+    """
+    Borra los documentos del alta salvo `vigente` y los posteriores a ella
+    (de datos que cambiaron después); sin `vigente`, todos.
+    """
+    storage = storage or default_storage
+    directorio = f"{PREFIJO}{alta_pk}/"
+    try:
+        _, archivos = storage.listdir(directorio)
+        limite = storage.get_modified_time(vigente) if vigente else None
+    except FileNotFoundError:
+        # La vigente todavía no está: la limpieza queda para quien la genere
+        return
+    for archivo in archivos:
+        ruta = f"{directorio}{archivo}"
+        if ruta == vigente:
+            continue
+        try:
+            if limite is None or storage.get_modified_time(ruta) < limite:
+                storage.delete(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def generar(alta_pk, storage=None):
+    """
+    Genera y guarda el documento de la versión vigente si aún no existe.
+    Devuelve el nombre en el storage, o None si el alta ya no existe.
+    """
+    storage = storage or default_storage
+    version_ = version(alta_pk)
+    if version_ is None:
+        return None
+    destino = nombre(alta_pk, version_)
+    if storage.exists(destino):
+        return destino
+
+    with medir_exportacion("epicrisis"):
+        archivo = escribir(alta_pk)
+    with archivo:
+        guardado = storage.save(destino, File(archivo))
+    if guardado != destino:
+        # Otro hilo la guardó primero: se conserva esa copia
+        storage.delete(guardado)
+    # Si los datos cambiaron mientras se escribía, la vigente ya es otra
+    # versión (quizá de un hilo más rápido): esa es la que se conserva
+    vigente = version(alta_pk)
+    if vigente is not None:
+        _borrar_anteriores(alta_pk, nombre(alta_pk, vigente), storage)
+    return destino
+
+
+def obtener(alta_pk, storage=None):
+    """Nombre del documento vigente, generándolo solo si los datos cambiaron."""
+    storage = storage or default_storage
+    version_ = version(alta_pk)
+    if version_ is None:
+        return None
+    destino = nombre(alta_pk, version_)
+    acierto = storage.exists(destino)
+    registrar_cache("epicrisis", acierto)
+    return destino if acierto else generar(alta_pk, storage)
+
+
+def _procesar(alta_pk):
+    with _lock:
+        _pendientes.discard(alta_pk)
+    from reportes.profiling import perfilar_trabajo
+
+    try:
+        with perfilar_trabajo("epicrisis"):
+            return generar(alta_pk)
+    except Exception:
+        logger.exception("No se pudo generar la epicrisis del alta %s", alta_pk)
+    finally:
+        if _hilos():
+            close_old_connections()
+
+
+def _encolar(alta_pk):
+    # Varios guardados en la misma transacción (o seguidos) generan una sola vez
+    with _lock:
+        if alta_pk in _pendientes:
+            return
+        _pendientes.add(alta_pk)
+    if _hilos():
+        _ejecutor().submit(_procesar, alta_pk)
+    else:
+        _procesar(alta_pk)
+
+
+def programar(*altas_pk):
+    """Genera las epicrisis de `altas_pk` una vez confirmada la transacción en curso."""
+    for alta_pk in altas_pk:
+        transaction.on_commit(lambda pk=alta_pk: _encolar(pk))
+
+
+def descartar(alta_pk):
+    """Borra los documentos de un alta eliminada, al confirmarse la eliminación."""
+    transaction.on_commit(lambda: _borrar_anteriores(alta_pk))
+
+
+# --- DOCUMENTO ---
+
+def _fecha(valor, formato="%d/%m/%Y %H:%M"):
+    if not valor:
+        return "-"
+    if hasattr(valor, "tzinfo") and timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    return valor.strftime(formato)
+
+
+def _si_no(valor):
+    return "Sí" if valor else "No"
+
+
+def _parrafo(texto):
+    from reportlab.platypus import Paragraph
+
+    from reportes.exportadores.pdf import ESTILOS
+
+    # Texto libre: se escapa para que "<" o "&" no se lean como marcado
+    return Paragraph(escape(texto or "-").replace("\n", "<br/>"), ESTILOS["celda"])
+
+
+def _ficha(filas):
+    from reportlab.lib.units import cm
+
+    from reportes.exportadores.pdf import tabla
+
+    return tabla(["Dato", "Valor"], filas, [5.5 * cm, 13 * cm])
+
+
+def _flowables(alta, recien_nacidos):
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, Spacer
+
+    from reportes.exportadores.pdf import ESTILOS, tabla
+
+    parto = alta.parto
+    paciente = parto.paciente
+    profesional = alta.profesional_responsable
+
+    yield Paragraph("Epicrisis — Alta Obstétrica", ESTILOS["titulo"])
+    yield Paragraph(f"Alta N° {alta.pk} · Generado el {_fecha(timezone.now())}", ESTILOS["meta"])
+    yield Spacer(1, 0.4 * cm)
+
+    yield Paragraph("Madre", ESTILOS["seccion"])
+    yield _ficha([
+        ["Nombre", _parrafo(paciente.nombre_completo or paciente.full_name)],
+        ["RUT", paciente.rut],
+        ["Fecha de nacimiento", _fecha(paciente.fecha_nacimiento, "%d/%m/%Y")],
+        ["Edad al parto", parto.edad_materna_parto if parto.edad_materna_parto is not None else "-"],
+        ["Riesgo obstétrico", paciente.get_riesgo_obstetrico_display()],
+    ])
+
+    yield Paragraph("Parto", ESTILOS["seccion"])
+    patologias = [
+        etiqueta for campo, etiqueta in (
+            ("preeclampsia_severa", "Preeclampsia severa"),
+            ("eclampsia", "Eclampsia"),
+            ("sepsis", "Sepsis"),
+            ("infeccion_ovular", "Infección ovular"),
+        ) if getattr(parto, campo)
+    ]
+    yield _ficha([
+        ["Fecha y hora", _fecha(parto.fecha_hora)],
+        ["Tipo de parto", str(parto.tipo_parto) if parto.tipo_parto else "-"],
+        ["Posición", parto.get_posicion_parto_display() or "-"],
+        ["Paridad", parto.paridad if parto.paridad is not None else "-"],
+        ["Control prenatal", _si_no(parto.control_prenatal)],
+        ["Patologías", ", ".join(patologias) or "Ninguna"],
+        ["Complicaciones", _parrafo(parto.complicaciones)],
+    ])
+
+    yield Paragraph("Recién nacidos", ESTILOS["seccion"])
+    yield tabla(
+        ["Identificador", "Sexo", "Peso (g)", "Talla (cm)", "APGAR 1/5", "EG (sem)", "Reanimación", "Diagnóstico de alta"],
+        [
+            [
+                rn.identificador, rn.get_sexo_display(), rn.peso_gramos, rn.talla_cm,
+                f"{rn.apgar1 if rn.apgar1 is not None else '-'}/{rn.apgar5 if rn.apgar5 is not None else '-'}",
+                rn.edad_gestacional_semanas or "-", rn.get_reanimacion_display(), _parrafo(rn.diagnostico_alta),
+            ]
+            for rn in recien_nacidos
+        ] or [["Sin recién nacidos registrados", "", "", "", "", "", "", ""]],
+        [2.6 * cm, 2 * cm, 1.6 * cm, 1.7 * cm, 1.8 * cm, 1.5 * cm, 2.2 * cm, 5.1 * cm],
+    )
+
+    yield Paragraph("Egreso", ESTILOS["seccion"])
+    yield _ficha([
+        ["Fecha y hora de alta", _fecha(alta.fecha_alta)],
+        ["Tipo de alta", alta.get_tipo_alta_display()],
+        ["Profesional responsable", (profesional.get_full_name() or profesional.username) if profesional else "-"],
+        ["Condición al egreso", _parrafo(alta.condicion_egreso)],
+        ["Requiere seguimiento", _si_no(alta.requiere_seguimiento)],
+        ["Próxima cita / control", _fecha(alta.proxima_cita, "%d/%m/%Y")],
+        ["Observaciones", _parrafo(alta.observaciones)],
+    ])
+
+
+def escribir(alta_pk):
+    """PDF de la epicrisis en un archivo temporal rebobinado."""
+    from reportes.exportadores.pdf import escribir_pdf
+
+    alta = Alta.objects.select_related(
+        "parto__paciente", "parto__tipo_parto", "profesional_responsable"
+    ).get(pk=alta_pk)
+    recien_nacidos = list(RecienNacido.objects.filter(parto_id=alta.parto_id).order_by("id"))
+    return escribir_pdf(_flowables(alta, recien_nacidos), f"Epicrisis alta {alta.pk}")
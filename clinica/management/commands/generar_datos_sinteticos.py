@@ -0,0 +1,461 @@
+# clinica/management/commands/generar_datos_sinteticos.py
+
+import random
+import time as reloj
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from clinica.models import (
+    Alta,
+    CasoClinico,
+    Consultorio,
+    EventoClinicoRN,
+    HistorialPaciente,
+    Nacionalidad,
+    Paciente,
+    Parto,
+    PuebloOriginario,
+    RecienNacido,
+    TipoParto,
+)
+from reportes.ejecutor import invalidar_todo
+
+# --- CATÁLOGOS MÍNIMOS (mismos valores que DB_hospital_regional_fixeado.sql) ---
+CATALOGO_NACIONALIDADES = [
+    ("CHL", "Chile"),
+    ("PER", "Perú"),
+    ("BOL", "Bolivia"),
+    ("ARG", "Argentina"),
+    ("VEN", "Venezuela"),
+]
+CATALOGO_TIPOS_PARTO = [
+    ("Normal", "Parto vaginal sin complicaciones"),
+    ("Cesárea", "Parto por cesárea electiva o de emergencia"),
+    ("Fórceps", "Parto vaginal asistido con fórceps"),
+    ("Vacuum", "Parto vaginal asistido con extracción por vacío"),
+]
+CATALOGO_PUEBLOS = ["Mapuche", "Aymara", "Rapa Nui", "Diaguita", "Quechua"]
+CATALOGO_CONSULTORIOS = [
+    ("CESFAM Violeta Parra", "Chillán"),
+    ("CESFAM Los Volcanes", "Chillán Viejo"),
+    ("Consultorio de Pinto", "Pinto"),
+    ("CESFAM Bulnes", "Bulnes"),
+]
+
+# --- DISTRIBUCIONES ---
+NOMBRES = [
+    "María José", "Camila", "Valentina", "Francisca", "Javiera", "Constanza",
+    "Catalina", "Fernanda", "Daniela", "Carolina", "Paula", "Antonia",
+    "Carmen", "Isidora", "Macarena", "Natalia", "Josefa", "Ignacia",
+]
+APELLIDOS = [
+    "González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras",
+    "Silva", "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López",
+    "Fuentes", "Hernández", "Torres", "Araya", "Flores", "Espinoza", "Valenzuela",
+]
+PESO_TIPO_PARTO = {"Normal": 0.60, "Cesárea": 0.33, "Fórceps": 0.03, "Vacuum": 0.04}
+COMPLICACIONES = [
+    "Desgarro perineal grado I",
+    "Desgarro perineal grado II",
+    "Hemorragia postparto",
+    "Retención placentaria",
+    "Sufrimiento fetal agudo",
+    "Distocia de hombros",
+]
+SALAS = ["Sala 1", "Sala 2", "Sala 3", "Pabellón 1", "Pabellón 2"]
+
+# Estacionalidad mensual de nacimientos (enero..diciembre), relativa al promedio.
+PESO_MES = [0.96, 0.91, 0.98, 0.95, 0.99, 0.97, 1.01, 1.03, 1.08, 1.07, 1.03, 1.02]
+# Menos partos en fin de semana (cesáreas electivas se programan en días hábiles).
+PESO_DIA_SEMANA = [1.04, 1.05, 1.04, 1.03, 1.02, 0.93, 0.89]
+
+# Peso (g) y talla (cm) medianos por edad gestacional (semanas).
+CURVA_CRECIMIENTO = [
+    (24, 650, 31.0),
+    (28, 1100, 37.0),
+    (32, 1750, 42.0),
+    (34, 2250, 45.0),
+    (36, 2700, 47.0),
+    (38, 3150, 49.5),
+    (40, 3450, 51.0),
+    (42, 3650, 52.0),
+]
+
+# Los RUT sintéticos parten en 60.000.000 para no chocar con RUT de personas.
+RUT_BASE_SINTETICO = 60_000_000
+RUT_SINTETICO_REGEX = r"^[6-9][0-9]\."
+
+
+def digito_verificador(numero):
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - (suma % 11)
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+def formatear_rut(numero):
+    return f"{numero:,}".replace(",", ".") + f"-{digito_verificador(numero)}"
+
+
+def interpolar_curva(semanas):
+    """Peso y talla medianos para una edad gestacional (interpolación lineal)."""
+    for (s0, p0, t0), (s1, p1, t1) in zip(CURVA_CRECIMIENTO, CURVA_CRECIMIENTO[1:]):
+        if semanas <= s1:
+            f = max(0.0, (semanas - s0) / (s1 - s0))
+            return p0 + f * (p1 - p0), t0 + f * (t1 - t0)
+    return CURVA_CRECIMIENTO[-1][1], CURVA_CRECIMIENTO[-1][2]
+
+
+@contextmanager
+def sin_fechas_automaticas(*modelos):
+    """
+    Desactiva temporalmente auto_now / auto_now_add para poder guardar
+    fechas históricas realistas (creación, auditoría, eventos).
+    """
+    campos = []
+    for modelo in modelos:
+        for campo in modelo._meta.concrete_fields:
+            if getattr(campo, "auto_now", False) or getattr(campo, "auto_now_add", False):
+                campos.append((campo, campo.auto_now, campo.auto_now_add))
+                campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera volúmenes reproducibles de datos clínicos sintéticos (madres, partos, "
+        "recién nacidos, altas, eventos, casos e historial) para pruebas de escala. "
+        "Inserta con bulk_create por lotes, sin disparar las señales de auditoría."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--madres", type=int, default=1000, help="Cantidad de pacientes a generar.")
+        parser.add_argument("--anios", type=int, default=10, help="Años de historia hacia atrás.")
+        parser.add_argument("--semilla", type=int, default=2024, help="Semilla para resultados reproducibles.")
+        parser.add_argument("--lote", type=int, default=5000, help="Madres procesadas por transacción.")
+        parser.add_argument(
+            "--hasta",
+            default=None,
+            help="Fecha final del período (YYYY-MM-DD). Por defecto, hoy.",
+        )
+        parser.add_argument(
+            "--limpiar",
+            action="store_true",
+            help="Elimina antes los pacientes sintéticos generados previamente.",
+        )
+
+    def handle(self, *args, **options):
+        if options["madres"] < 0 or options["anios"] < 1 or options["lote"] < 1:
+            raise CommandError("--madres, --anios y --lote deben ser positivos.")
+
+        if options["hasta"]:
+            try:
+                self.fin = datetime.strptime(options["hasta"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--hasta debe tener formato YYYY-MM-DD.")
+        else:
+            self.fin = timezone.localdate()
+        self.inicio = self.fin - timedelta(days=365 * options["anios"])
+        self.ahora = timezone.now()
+        self.rnd = random.Random(options["semilla"])
+        self.lote = options["lote"]
+
+        if options["limpiar"]:
+            borrados, _ = Paciente.objects.filter(rut__regex=RUT_SINTETICO_REGEX).delete()
+            self.stdout.write(f"Eliminados {borrados} registros sintéticos previos.")
+
+        self.cargar_catalogos()
+        self.cargar_profesionales()
+        self.siguiente_id = {
+            modelo: (modelo.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+            for modelo in (Paciente, Parto, RecienNacido, Alta, EventoClinicoRN, HistorialPaciente, CasoClinico)
+        }
+        desplazamiento_rut = Paciente.objects.filter(rut__regex=RUT_SINTETICO_REGEX).count()
+
+        totales = dict.fromkeys(self.siguiente_id, 0)
+        t0 = reloj.perf_counter()
+        with sin_fechas_automaticas(*totales):
+            for inicio_lote in range(0, options["madres"], self.lote):
+                n = min(self.lote, options["madres"] - inicio_lote)
+                with transaction.atomic():
+                    conteos = self.generar_lote(n, RUT_BASE_SINTETICO + desplazamiento_rut + inicio_lote)
+                for modelo, cantidad in conteos.items():
+                    totales[modelo] += cantidad
+                self.stdout.write(
+                    f"  {inicio_lote + n}/{options['madres']} madres "
+                    f"({reloj.perf_counter() - t0:.1f}s)"
+                )
+        # bulk_create no emite señales: los parciales de reportes se descartan de una vez
+        invalidar_todo()
+
+        resumen = ", ".join(f"{modelo.__name__}={total}" for modelo, total in totales.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos sintéticos generados en {reloj.perf_counter() - t0:.1f}s: {resumen}"
+        ))
+
+    # --- PREPARACIÓN ---
+
+    def cargar_catalogos(self):
+        for codigo, nombre in CATALOGO_NACIONALIDADES:
+            Nacionalidad.objects.get_or_create(codigo=codigo, defaults={"nombre": nombre})
+        for nombre, descripcion in CATALOGO_TIPOS_PARTO:
+            TipoParto.objects.get_or_create(nombre=nombre, defaults={"descripcion": descripcion})
+        for nombre in CATALOGO_PUEBLOS:
+            PuebloOriginario.objects.get_or_create(nombre=nombre)
+        for nombre, comuna in CATALOGO_CONSULTORIOS:
+            Consultorio.objects.get_or_create(nombre=nombre, defaults={"comuna": comuna})
+
+        self.nacionalidades = list(Nacionalidad.objects.filter(activo=True).values_list("codigo", flat=True))
+        self.pueblos = list(PuebloOriginario.objects.filter(activo=True).values_list("pk", flat=True))
+        self.consultorios = list(Consultorio.objects.filter(activo=True).values_list("pk", flat=True))
+        tipos = list(TipoParto.objects.filter(activo=True).values_list("pk", "nombre"))
+        self.tipos_parto = [pk for pk, _ in tipos]
+        self.pesos_tipo_parto = [PESO_TIPO_PARTO.get(nombre, 0.05) for _, nombre in tipos]
+        self.tipos_vaginales = {pk for pk, nombre in tipos if nombre != "Cesárea"}
+
+    def cargar_profesionales(self):
+        User = get_user_model()
+        self.profesionales = list(User.objects.filter(is_active=True).values_list("pk", flat=True)[:20])
+        if not self.profesionales:
+            for n in range(1, 5):
+                user = User.objects.create_user(username=f"sintetico_profesional_{n}", password=None)
+                self.profesionales.append(user.pk)
+
+    def nuevo_id(self, modelo):
+        pk = self.siguiente_id[modelo]
+        self.siguiente_id[modelo] += 1
+        return pk
+
+    # --- MUESTREO ---
+
+    def fecha_parto(self):
+        """Día de parto con estacionalidad mensual y semanal (muestreo por rechazo)."""
+        dias = (self.fin - self.inicio).days
+        tope = max(PESO_MES) * max(PESO_DIA_SEMANA)
+        while True:
+            dia = self.inicio + timedelta(days=self.rnd.randrange(dias + 1))
+            if self.rnd.random() * tope <= PESO_MES[dia.month - 1] * PESO_DIA_SEMANA[dia.weekday()]:
+                return dia
+
+    def fechas_partos_madre(self):
+        cantidad = self.rnd.choices([1, 2, 3], weights=[0.72, 0.22, 0.06])[0]
+        fechas = sorted(self.fecha_parto() for _ in range(cantidad))
+        # Intervalo intergenésico mínimo de ~10 meses
+        resultado = [fechas[0]]
+        for dia in fechas[1:]:
+            if (dia - resultado[-1]).days >= 300:
+                resultado.append(dia)
+        return resultado
+
+    def momento(self, dia, hora_min=0, hora_max=23):
+        hora = time(self.rnd.randint(hora_min, hora_max), self.rnd.randrange(60))
+        return timezone.make_aware(datetime.combine(dia, hora))
+
+    def edad_gestacional(self, gemelar):
+        if gemelar:
+            return self.rnd.choice([32, 33, 34, 35, 36, 36, 37, 37])
+        if self.rnd.random() < 0.07:
+            return self.rnd.randint(26, 36)
+        return self.rnd.choices([37, 38, 39, 40, 41, 42], weights=[10, 22, 30, 25, 11, 2])[0]
+
+    # --- GENERACIÓN POR LOTE ---
+
+    def generar_lote(self, cantidad, rut_inicial):
+        rnd = self.rnd
+        pacientes, partos, rns, altas, eventos, historial, casos = [], [], [], [], [], [], []
+        tipos_evento = EventoClinicoRN.TipoEventoChoices.values
+
+        for i in range(cantidad):
+            fechas = self.fechas_partos_madre()
+            edad_primer_parto = max(15, min(45, int(rnd.triangular(15, 45, 28))))
+            nacimiento = fechas[0] - timedelta(days=365 * edad_primer_parto + rnd.randrange(365))
+            registrador = rnd.choice(self.profesionales)
+            nombres = rnd.choice(NOMBRES)
+            paterno, materno = rnd.choice(APELLIDOS), rnd.choice(APELLIDOS)
+            creada = self.momento(fechas[0] - timedelta(days=rnd.randint(0, 240)), 8, 18)
+
+            paciente = Paciente(
+                id=self.nuevo_id(Paciente),
+                rut=formatear_rut(rut_inicial + i),
+                nombres=nombres,
+                apellido_paterno=paterno,
+                apellido_materno=materno,
+                nombre_completo=f"{nombres} {paterno} {materno}",
+                fecha_nacimiento=nacimiento,
+                sexo=Paciente.SexoChoices.FEMENINO,
+                telefono=f"+569{rnd.randint(10_000_000, 99_999_999)}",
+                estado_civil=rnd.choice(Paciente.EstadoCivilChoices.values),
+                nivel_educacional=rnd.choices(
+                    Paciente.NivelEducacionalChoices.values, weights=[1, 12, 45, 18, 20, 4]
+                )[0],
+                consultorio_id=rnd.choice(self.consultorios) if self.consultorios else None,
+                nacionalidad_id=(
+                    self.nacionalidades[0] if rnd.random() < 0.85 or len(self.nacionalidades) < 2
+                    else rnd.choice(self.nacionalidades[1:])
+                ) if self.nacionalidades else None,
+                pueblo_originario_id=(
+                    rnd.choice(self.pueblos) if self.pueblos and rnd.random() < 0.12 else None
+                ),
+                estado_atencion=Paciente.EstadoAtencionChoices.ATENDIDO,
+                riesgo_obstetrico=rnd.choices(
+                    Paciente.RiesgoObstetricoChoices.values, weights=[70, 22, 8]
+                )[0],
+                registrado_por_id=registrador,
+                fecha_creacion=creada,
+                fecha_actualizacion=creada,
+            )
+            pacientes.append(paciente)
+            historial.append(HistorialPaciente(
+                id=self.nuevo_id(HistorialPaciente),
+                paciente_id=paciente.id,
+                usuario_id=registrador,
+                fecha=creada,
+                campo_modificado="CREACIÓN PACIENTE",
+                valor_anterior="-",
+                valor_nuevo=f"Creado por {registrador}",
+            ))
+
+            if paciente.riesgo_obstetrico == Paciente.RiesgoObstetricoChoices.ALTO:
+                casos.append(CasoClinico(
+                    id=self.nuevo_id(CasoClinico),
+                    paciente_id=paciente.id,
+                    titulo="Control embarazo de alto riesgo",
+                    resumen="Seguimiento por riesgo obstétrico alto.",
+                    especialidad="Obstetricia",
+                    prioridad=CasoClinico.PrioridadChoices.ALTA,
+                    estado=CasoClinico.EstadoChoices.CERRADO,
+                    medico_responsable_id=registrador,
+                    fecha_creacion=creada,
+                    fecha_actualizacion=creada,
+                ))
+
+            for paridad, dia in enumerate(fechas):
+                tipo = rnd.choices(self.tipos_parto, weights=self.pesos_tipo_parto)[0] if self.tipos_parto else None
+                vaginal = tipo in self.tipos_vaginales
+                fecha_hora = self.momento(dia)
+                profesional = rnd.choice(self.profesionales)
+                parto = Parto(
+                    id=self.nuevo_id(Parto),
+                    paciente_id=paciente.id,
+                    fecha_hora=fecha_hora,
+                    fecha_ingreso=fecha_hora - timedelta(minutes=rnd.randint(60, 900)),
+                    tipo_parto_id=tipo,
+                    posicion_parto=(
+                        rnd.choices(Parto.PosicionPartoChoices.values, weights=[40, 8, 30, 5, 5, 7, 5])[0]
+                        if vaginal else ""
+                    ),
+                    sala=rnd.choice(SALAS),
+                    edad_materna_parto=(dia - nacimiento).days // 365,
+                    paridad=paridad,
+                    control_prenatal=rnd.random() < 0.95,
+                    preeclampsia_severa=rnd.random() < 0.02,
+                    eclampsia=rnd.random() < 0.002,
+                    sepsis=rnd.random() < 0.005,
+                    infeccion_ovular=rnd.random() < 0.01,
+                    ligadura_tardia_cordon=rnd.random() < 0.7,
+                    contacto_piel_piel=rnd.random() < 0.8,
+                    duracion_contacto_min=rnd.randint(15, 90),
+                    lactancia_primera_hora=rnd.random() < 0.75,
+                    alojamiento_conjunto=rnd.random() < 0.9,
+                    complicaciones=rnd.choice(COMPLICACIONES) if rnd.random() < 0.12 else "",
+                    duracion_trabajo_parto_min=rnd.randint(120, 900) if vaginal else None,
+                    personal_responsable_id=profesional,
+                    fecha_creacion=fecha_hora + timedelta(minutes=rnd.randint(10, 180)),
+                    fecha_actualizacion=fecha_hora + timedelta(minutes=rnd.randint(10, 180)),
+                )
+                partos.append(parto)
+                historial.append(HistorialPaciente(
+                    id=self.nuevo_id(HistorialPaciente),
+                    paciente_id=paciente.id,
+                    usuario_id=profesional,
+                    fecha=parto.fecha_creacion,
+                    campo_modificado="CREACIÓN PARTO",
+                    valor_anterior="-",
+                    valor_nuevo=f"Parto {tipo}",
+                ))
+
+                gemelar = rnd.random() < 0.015
+                semanas = self.edad_gestacional(gemelar)
+                for _ in range(2 if gemelar else 1):
+                    peso_med, talla_med = interpolar_curva(semanas)
+                    peso = int(max(400, min(6500, rnd.gauss(peso_med * (0.9 if gemelar else 1), peso_med * 0.12))))
+                    rn_id = self.nuevo_id(RecienNacido)
+                    apgar1 = max(0, min(10, int(rnd.gauss(8.3 if semanas >= 37 else 7, 1.2))))
+                    rn = RecienNacido(
+                        id=rn_id,
+                        parto_id=parto.id,
+                        identificador=f"RN-{parto.id}-{rn_id}",
+                        sexo=rnd.choices(RecienNacido.SexoChoices.values, weights=[512, 487, 1])[0],
+                        peso_gramos=peso,
+                        talla_cm=int(max(20, min(65, round(rnd.gauss(talla_med, 2))))),
+                        apgar1=apgar1,
+                        apgar5=min(10, apgar1 + rnd.choice([0, 1, 1, 2])),
+                        edad_gestacional_semanas=semanas,
+                        fecha_control_7_dias=dia + timedelta(days=7),
+                        fecha_control_28_dias=dia + timedelta(days=28),
+                        reanimacion=(
+                            RecienNacido.ReanimacionChoices.BASICA if apgar1 < 7
+                            else RecienNacido.ReanimacionChoices.NINGUNA
+                        ),
+                        tiene_malformacion=rnd.random() < 0.02,
+                        fecha_creacion=parto.fecha_creacion,
+                        fecha_actualizacion=parto.fecha_creacion,
+                    )
+                    rns.append(rn)
+                    historial.append(HistorialPaciente(
+                        id=self.nuevo_id(HistorialPaciente),
+                        paciente_id=paciente.id,
+                        usuario_id=profesional,
+                        fecha=rn.fecha_creacion,
+                        campo_modificado="NACIMIENTO RN",
+                        valor_anterior="-",
+                        valor_nuevo=f"Nace {rn.sexo} ({rn.peso_gramos}g)",
+                    ))
+                    for tipo_evento in rnd.sample(tipos_evento, rnd.randint(3, len(tipos_evento))):
+                        momento_evento = fecha_hora + timedelta(hours=rnd.randint(1, 48))
+                        eventos.append(EventoClinicoRN(
+                            id=self.nuevo_id(EventoClinicoRN),
+                            recien_nacido_id=rn_id,
+                            tipo_evento=tipo_evento,
+                            fecha_hora=momento_evento,
+                            resultado="Aplicado",
+                            created_at=momento_evento,
+                            updated_at=momento_evento,
+                        ))
+
+                fecha_alta = fecha_hora + timedelta(hours=rnd.randint(36, 96))
+                if fecha_alta < self.ahora and rnd.random() < 0.98:
+                    altas.append(Alta(
+                        id=self.nuevo_id(Alta),
+                        parto_id=parto.id,
+                        fecha_alta=fecha_alta,
+                        tipo_alta=rnd.choices(Alta.TipoAltaChoices.values, weights=[96, 3, 0.1, 0.9])[0],
+                        profesional_responsable_id=rnd.choice(self.profesionales),
+                        condicion_egreso="Madre y RN en buenas condiciones generales.",
+                        requiere_seguimiento=rnd.random() < 0.15,
+                        proxima_cita=fecha_alta.date() + timedelta(days=7),
+                        fecha_creacion=fecha_alta,
+                        fecha_actualizacion=fecha_alta,
+                    ))
+
+        # bulk_create no dispara pre_save/post_save: el historial se genera arriba.
+        lotes = [
+            (Paciente, pacientes), (CasoClinico, casos), (Parto, partos),
+            (RecienNacido, rns), (Alta, altas), (EventoClinicoRN, eventos),
+            (HistorialPaciente, historial),
+        ]
+        for modelo, objetos in lotes:
+            modelo.objects.bulk_create(objetos, batch_size=self.lote)
+        return {modelo: len(objetos) for modelo, objetos in lotes}
@@ -0,0 +1,30 @@
+# clinica/management/commands/generar_epicrisis.py
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from clinica import epicrisis
+from clinica.models import Alta
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las epicrisis en PDF de las altas que no tienen la versión vigente "
+        "(altas anteriores a la generación automática o cargadas en bloque)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alta", type=int, action="append", default=[], help="Id de alta (repetible).")
+
+    def handle(self, *args, **options):
+        altas = Alta.objects.order_by("pk")
+        if options["alta"]:
+            altas = altas.filter(pk__in=options["alta"])
+        generadas = vigentes = 0
+        for pk in list(altas.values_list("pk", flat=True)):
+            if default_storage.exists(epicrisis.nombre(pk, epicrisis.version(pk))):
+                vigentes += 1
+            else:
+                epicrisis.generar(pk)
+                generadas += 1
+        self.stdout.write(self.style.SUCCESS(f"Epicrisis generadas: {generadas} (ya vigentes: {vigentes})"))
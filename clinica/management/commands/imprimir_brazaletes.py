@@ -0,0 +1,51 @@
+# clinica/management/commands/imprimir_brazaletes.py
+
+import shutil
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica import brazaletes
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el PDF de brazaletes o etiquetas con QR de los recién nacidos de "
+        "los partos indicados o de una ventana de fechas (un turno completo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parto", type=int, action="append", default=[], help="Id de parto (repetible).")
+        parser.add_argument("--rn", type=int, action="append", default=[], help="Id de recién nacido (repetible).")
+        parser.add_argument("--desde", help="Partos desde esta fecha u hora (YYYY-MM-DD[THH:MM]).")
+        parser.add_argument("--hasta", help="Partos hasta esta fecha u hora, excluida.")
+        parser.add_argument("--formato", choices=list(brazaletes.FORMATOS), default="etiquetas")
+        parser.add_argument("--copias", type=int, default=1, help=f"Copias por recién nacido (1 a {brazaletes.MAX_COPIAS}).")
+        parser.add_argument(
+            "--procesos", type=int, default=None,
+            help="Procesos para generar los QR (por defecto BRAZALETES_PROCESOS).",
+        )
+        parser.add_argument("--salida", required=True, help="Ruta del PDF a escribir.")
+
+    def handle(self, *args, **options):
+        if not 1 <= options["copias"] <= brazaletes.MAX_COPIAS:
+            raise CommandError(f"--copias debe estar entre 1 y {brazaletes.MAX_COPIAS}.")
+        try:
+            desde, hasta = brazaletes.momento(options["desde"]), brazaletes.momento(options["hasta"])
+        except ValueError:
+            raise CommandError("--desde y --hasta deben tener formato YYYY-MM-DD[THH:MM].")
+
+        t0 = time.perf_counter()
+        filas = brazaletes.filas(brazaletes.seleccionar(options["parto"], options["rn"], desde, hasta))
+        if not filas:
+            raise CommandError("No hay recién nacidos para imprimir.")
+        archivo = brazaletes.escribir_hoja(filas, options["formato"], options["copias"], options["procesos"])
+        with archivo, open(options["salida"], "wb") as destino:
+            shutil.copyfileobj(archivo, destino)
+
+        segundos = time.perf_counter() - t0
+        etiquetas = len(filas) * options["copias"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{etiquetas} {options['formato']} de {len(filas)} recién nacidos en {segundos:.2f} s "
+            f"({etiquetas / segundos:.0f}/s) → {options['salida']}"
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="historialpaciente",
+            index=models.Index(fields=["fecha"], name="idx_historial_fecha"),
+        ),
+    ]
@@ -670,4 +670,7 @@ class HistorialPaciente(models.Model):
     valor_nuevo = models.TextField(blank=True, null=True)
 
     class Meta:
-        ordering = ['-fecha']
\ No newline at end of file
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=["fecha"], name="idx_historial_fecha"),
+        ]
\ No newline at end of file
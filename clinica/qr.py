@@ -0,0 +1,158 @@
+# clinica/qr.py
+"""
+Códigos QR de los identificadores de recién nacidos, ya dibujados para PDF.
+
+`dibujo_qr` devuelve `(modulos, operadores)`: los operadores de contenido PDF
+que pintan el código en un cuadrado de `modulos` x `modulos` unidades (un
+rectángulo por tramo horizontal de módulos oscuros). La hoja los inserta con
+una escala, así que un QR no se vuelve a codificar, rasterizar ni comprimir
+como imagen por cada etiqueta, y se imprime nítido a cualquier tamaño.
+
+`CacheQR` guarda en memoria los últimos BRAZALETES_CACHE_QR dibujos del
+proceso (LRU): reimprimir brazaletes o etiquetas del mismo turno no vuelve a
+codificar nada. `generar()` completa los que falten, en un pool de procesos
+cuando son más de BRAZALETES_UMBRAL_PROCESOS.
+
+Este módulo no importa Django al nivel superior: los procesos del pool se
+crean con `spawn` y solo necesitan `dibujos_lote`.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+
+logger = logging.getLogger(__name__)
+
+# Zona silenciosa en módulos (el estándar pide 4; la etiqueta ya deja margen)
+BORDE = 2
+
+
+def dibujo_qr(texto):
+    codigo = qrcode.QRCode(error_correction=ERROR_CORRECT_M, border=BORDE)
+    codigo.add_data(texto)
+    codigo.make(fit=True)
+    matriz = codigo.get_matrix()
+    modulos = len(matriz)
+    operadores = []
+    for fila, oscuros in enumerate(matriz):
+        # La fila 0 es la de arriba; en PDF el eje y crece hacia arriba
+        y = modulos - fila - 1
+        inicio = None
+        for x, oscuro in enumerate([*oscuros, False]):
+            if oscuro and inicio is None:
+                inicio = x
+            elif not oscuro and inicio is not None:
+                operadores.append(f"{inicio} {y} {x - inicio} 1 re")
+                inicio = None
+    operadores.append("f")
+    return modulos, "\n".join(operadores)
+
+
+def dibujos_lote(textos):
+    return [dibujo_qr(texto) for texto in textos]
+
+
+class CacheQR:
+    def __init__(self, maximo=2048):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, texto):
+        with self._lock:
+            dibujo = self._datos.get(texto)
+            if dibujo is not None:
+                self._datos.move_to_end(texto)
+            return dibujo
+
+    def set(self, texto, dibujo):
+        with self._lock:
+            self._datos[texto] = dibujo
+            self._datos.move_to_end(texto)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+_cache = None
+_pool = None
+
+
+def _config(nombre, defecto):
+    from django.conf import settings
+
+    return getattr(settings, nombre, defecto)
+
+
+def cache_qr():
+    global _cache
+    if _cache is None:
+        _cache = CacheQR(_config("BRAZALETES_CACHE_QR", 2048))
+    return _cache
+
+
+def _cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _obtener_pool(procesos):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=get_context("spawn"))
+    return _pool
+
+
+def _lotes(textos, cantidad):
+    tamano = max(1, -(-len(textos) // cantidad))
+    return [textos[i:i + tamano] for i in range(0, len(textos), tamano)]
+
+
+def generar(textos, procesos=None, umbral=None):
+    """{texto: dibujo} para `textos`, generando (y guardando en la caché) los que falten."""
+    cache = cache_qr()
+    resultado = {}
+    faltantes = []
+    for texto in dict.fromkeys(textos):
+        dibujo = cache.get(texto)
+        if dibujo is None:
+            faltantes.append(texto)
+        else:
+            resultado[texto] = dibujo
+    if not faltantes:
+        return resultado
+
+    procesos = _config("BRAZALETES_PROCESOS", 1) if procesos is None else procesos
+    umbral = _config("BRAZALETES_UMBRAL_PROCESOS", 200) if umbral is None else umbral
+    generados = None
+    if procesos > 1 and len(faltantes) > umbral:
+        try:
+            # Varios lotes por proceso para repartir la carga sin serializar texto por texto
+            lotes = _lotes(faltantes, procesos * 4)
+            generados = [
+                dibujo for lote in _obtener_pool(procesos).map(dibujos_lote, lotes) for dibujo in lote
+            ]
+        except BrokenProcessPool:
+            logger.exception("Pool de códigos QR caído; se generan en el proceso actual")
+            _cerrar_pool()
+    if generados is None:
+        generados = dibujos_lote(faltantes)
+
+    for texto, dibujo in zip(faltantes, generados):
+        cache.set(texto, dibujo)
+        resultado[texto] = dibujo
+    return resultado
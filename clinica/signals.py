@@ -1,9 +1,11 @@
 # clinica/signals.py
 
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import post_delete, pre_save, post_save
 from django.dispatch import receiver
 from django.forms.models import model_to_dict
-from .models import Paciente, Parto, RecienNacido, HistorialPaciente
+from core.escrituras import diferir
+from . import epicrisis
+from .models import Alta, Paciente, Parto, RecienNacido, HistorialPaciente
 
 # --- FUNCIÓN AUXILIAR PARA OBTENER USUARIO REAL ---
 def get_user_from_instance(instance, default_field_user=None):
@@ -16,6 +18,14 @@ def get_user_from_instance(instance, default_field_user=None):
         return instance._usuario_auditoria
     return default_field_user
 
+def registrar_historial(**campos):
+    """
+    Inserta en HistorialPaciente. Con ESCRITURAS_DIFERIDAS la inserción va a
+    la cola de escrituras al confirmarse el guardado clínico, en lugar de
+    alargar su transacción.
+    """
+    diferir(HistorialPaciente.objects.create, operacion="auditoria", **campos)
+
 # --- FUNCIÓN AUXILIAR PARA NO REPETIR CÓDIGO ---
 def auditar_cambios(instance, modelo_nombre, campos_a_auditar, usuario_responsable, paciente_asociado):
     """
@@ -35,7 +45,7 @@ def auditar_cambios(instance, modelo_nombre, campos_a_auditar, usuario_responsab
         if val_nue == 'None': val_nue = ''
 
         if val_ant != val_nue:
-            HistorialPaciente.objects.create(
+            registrar_historial(
                 paciente=paciente_asociado,
                 usuario=usuario_responsable,
                 campo_modificado=f"{modelo_nombre}: {campo}", # Ej: "RN: peso_gramos"
@@ -69,7 +79,7 @@ def audit_paciente(sender, instance, created, **kwargs):
         usuario = instance.registrado_por # Al crear, siempre es registrado_por
 
     if created:
-        HistorialPaciente.objects.create(
+        registrar_historial(
             paciente=instance,
             usuario=usuario,
             campo_modificado="CREACIÓN PACIENTE",
@@ -88,7 +98,7 @@ def audit_parto(sender, instance, created, **kwargs):
     paciente = instance.paciente # La madre
 
     if created:
-        HistorialPaciente.objects.create(
+        registrar_historial(
             paciente=paciente,
             usuario=usuario,
             campo_modificado="CREACIÓN PARTO",
@@ -113,7 +123,7 @@ def audit_rn(sender, instance, created, **kwargs):
     identificador = instance.identificador or f"RN {instance.pk}"
 
     if created:
-        HistorialPaciente.objects.create(
+        registrar_historial(
             paciente=paciente,
             usuario=usuario,
             campo_modificado="NACIMIENTO RN",
@@ -122,4 +132,33 @@ def audit_rn(sender, instance, created, **kwargs):
         )
     else:
         campos = ['peso_gramos', 'talla_cm', 'apgar1', 'apgar5', 'reanimacion', 'fecha_control_7_dias']
-        auditar_cambios(instance, f"RN ({identificador})", campos, usuario, paciente)
\ No newline at end of file
+        auditar_cambios(instance, f"RN ({identificador})", campos, usuario, paciente)
+
+
+# --- EPICRISIS: se regenera en segundo plano cuando cambian sus datos ---
+@receiver(post_save, sender=Alta)
+def epicrisis_alta(sender, instance, **kwargs):
+    epicrisis.programar(instance.pk)
+
+
+@receiver(post_delete, sender=Alta)
+def epicrisis_alta_eliminada(sender, instance, **kwargs):
+    epicrisis.descartar(instance.pk)
+
+
+@receiver(post_save, sender=Paciente)
+def epicrisis_paciente(sender, instance, created, **kwargs):
+    if not created:
+        epicrisis.programar(*Alta.objects.filter(parto__paciente=instance).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Parto)
+def epicrisis_parto(sender, instance, created, **kwargs):
+    if not created:
+        epicrisis.programar(*Alta.objects.filter(parto_id=instance.pk).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=RecienNacido)
+@receiver(post_delete, sender=RecienNacido)
+def epicrisis_rn(sender, instance, **kwargs):
+    epicrisis.programar(*Alta.objects.filter(parto_id=instance.parto_id).values_list("pk", flat=True))
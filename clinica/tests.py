@@ -1,10 +1,22 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from pypdf import PdfReader
+
+from core.pruebas import DatosSinteticosMixin
 
+from . import brazaletes, epicrisis, qr
 from .forms import PacienteForm
-from .models import Alta, Paciente, Parto, RecienNacido
+from .models import Alta, HistorialPaciente, Paciente, Parto, RecienNacido
 
 
 class ClinicaViewsTests(TestCase):
@@ -209,3 +221,240 @@ class ClinicaViewsTests(TestCase):
         self.assertEqual(pacientes_page.paginator.count, 1)
         self.assertContains(response, "Camila López")
         self.assertNotContains(response, "Paciente Test")
+
+
+class GenerarDatosSinteticosTests(TestCase):
+    def generar(self, *extra):
+        call_command(
+            "generar_datos_sinteticos", "--madres", "40", "--anios", "2",
+            "--semilla", "7", "--hasta", "2024-06-30", *extra, stdout=StringIO(),
+        )
+
+    def test_genera_volumen_con_catalogos_y_sin_senales(self):
+        self.generar()
+        self.assertEqual(Paciente.objects.count(), 40)
+        self.assertTrue(Parto.objects.filter(tipo_parto__isnull=False).exists())
+        # bulk_create no pasa por las señales: solo existe el historial generado
+        esperado = Paciente.objects.count() + Parto.objects.count() + RecienNacido.objects.count()
+        self.assertEqual(HistorialPaciente.objects.count(), esperado)
+        rn = RecienNacido.objects.first()
+        self.assertEqual(rn.identificador, f"RN-{rn.parto_id}-{rn.pk}")
+
+    def test_es_reproducible_con_la_misma_semilla(self):
+        self.generar()
+        primera = list(Parto.objects.order_by("pk").values_list("fecha_hora", "tipo_parto__nombre"))
+        self.generar("--limpiar")
+        segunda = list(Parto.objects.order_by("pk").values_list("fecha_hora", "tipo_parto__nombre"))
+        self.assertEqual(primera, segunda)
+
+
+class BrazaletesTests(DatosSinteticosMixin, TestCase):
+    datos = {"madres": 10, "anios": 1, "semilla": 3}
+    nombre_usuario = "matrona"
+
+    def setUp(self):
+        super().setUp()
+        qr.cache_qr().limpiar()
+
+    def paginas(self, contenido):
+        return PdfReader(BytesIO(contenido)).pages
+
+    def test_pdf_de_un_parto_con_copias(self):
+        parto = Parto.objects.filter(recien_nacidos__isnull=False).first()
+        identificadores = list(parto.recien_nacidos.values_list("identificador", flat=True))
+        respuesta = self.client.get(
+            reverse("clinica:brazaletes"), {"parto": parto.pk, "formato": "brazaletes", "copias": 2}
+        )
+        self.assertEqual(respuesta["Content-Type"], "application/pdf")
+        paginas = self.paginas(b"".join(respuesta.streaming_content))
+        texto = paginas[0].extract_text()
+        for identificador in identificadores:
+            self.assertEqual(texto.count(identificador), 2)
+
+    def test_turno_pagina_las_etiquetas(self):
+        desde, hasta = "2024-01-01", "2024-07-01"
+        total = RecienNacido.objects.filter(
+            parto__fecha_hora__gte=brazaletes.momento(desde), parto__fecha_hora__lt=brazaletes.momento(hasta)
+        ).count()
+        filas = brazaletes.filas(brazaletes.seleccionar(desde=brazaletes.momento(desde), hasta=brazaletes.momento(hasta)))
+        with brazaletes.escribir_hoja(filas, procesos=1) as archivo:
+            paginas = self.paginas(archivo.read())
+        self.assertEqual(len(paginas), -(-total // 20))
+        self.assertEqual(len(qr.cache_qr()), total)
+
+    def test_turno_web_de_un_dia(self):
+        parto = Parto.objects.filter(recien_nacidos__isnull=False).first()
+        inicio = timezone.localtime(parto.fecha_hora).replace(minute=0, second=0, microsecond=0)
+        desde = inicio.strftime("%Y-%m-%dT%H:%M")
+        hasta = (inicio + timedelta(hours=24)).strftime("%Y-%m-%dT%H:%M")
+        respuesta = self.client.get(reverse("clinica:brazaletes"), {"desde": desde, "hasta": hasta})
+        self.assertEqual(respuesta.status_code, 200)
+        texto = self.paginas(b"".join(respuesta.streaming_content))[0].extract_text()
+        self.assertIn(parto.recien_nacidos.first().identificador, texto)
+
+    def test_parametros_invalidos_o_sin_seleccion(self):
+        url = reverse("clinica:brazaletes")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"parto": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "ayer"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"parto": 1, "formato": "sobre"}).status_code, 400)
+
+    def test_turno_web_acotado(self):
+        url = reverse("clinica:brazaletes")
+        # Sin uno de los extremos, al revés o de más de BRAZALETES_MAX_HORAS
+        self.assertEqual(self.client.get(url, {"desde": "2024-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"hasta": "2024-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "2024-01-02", "hasta": "2024-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "2023-01-01", "hasta": "2024-07-01"}).status_code, 400)
+
+        partos = list(Parto.objects.filter(recien_nacidos__isnull=False).values_list("pk", flat=True)[:3])
+        with override_settings(BRAZALETES_MAX_RN=2):
+            respuesta = self.client.get(url, {"parto": partos})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn(b"imprimir_brazaletes", respuesta.content)
+
+    def test_dibujo_reproduce_la_matriz_del_qr(self):
+        import qrcode
+
+        codigo = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=qr.BORDE)
+        codigo.add_data("RN-12-345")
+        matriz = codigo.get_matrix()
+        modulos, operadores = qr.dibujo_qr("RN-12-345")
+        self.assertEqual(modulos, len(matriz))
+        pintados = set()
+        for operador in operadores.splitlines()[:-1]:
+            x, y, ancho, _, _ = operador.split()
+            fila = modulos - int(y) - 1
+            pintados.update((fila, columna) for columna in range(int(x), int(x) + int(ancho)))
+        oscuros = {(f, c) for f, fila in enumerate(matriz) for c, oscuro in enumerate(fila) if oscuro}
+        self.assertEqual(pintados, oscuros)
+
+    def test_cache_lru_evita_regenerar(self):
+        cache = qr.CacheQR(maximo=2)
+        for texto in ("a", "b", "c"):
+            cache.set(texto, texto.encode())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), b"c")
+
+        primero = qr.generar(["RN-1-1", "RN-1-2"], procesos=1)
+        with mock.patch.object(qr, "dibujos_lote", side_effect=AssertionError("no debería generar")):
+            self.assertEqual(qr.generar(["RN-1-2", "RN-1-1"], procesos=1), primero)
+
+    def test_pool_de_procesos_genera_lo_mismo(self):
+        self.addCleanup(qr._cerrar_pool)
+        textos = [f"RN-9-{n}" for n in range(12)]
+        en_pool = qr.generar(textos, procesos=2, umbral=4)
+        self.assertEqual(en_pool, {texto: qr.dibujo_qr(texto) for texto in textos})
+
+    def test_comando_escribe_el_pdf(self):
+        parto = Parto.objects.filter(recien_nacidos__isnull=False).first()
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as salida:
+            call_command("imprimir_brazaletes", "--parto", str(parto.pk), "--salida", salida.name, stdout=StringIO())
+            self.assertEqual(len(PdfReader(salida.name).pages), 1)
+
+
+MEDIA_PRUEBAS = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, EPICRISIS_HILOS=0)
+class EpicrisisTests(DatosSinteticosMixin, TestCase):
+    datos = {"madres": 8, "anios": 1, "semilla": 11}
+    nombre_usuario = "medico"
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(default_storage.path(epicrisis.PREFIJO), ignore_errors=True)
+        self.alta = Alta.objects.filter(parto__recien_nacidos__isnull=False).select_related("parto__paciente").first()
+
+    def guardar(self, instancia):
+        with self.captureOnCommitCallbacks(execute=True):
+            instancia.save()
+
+    def documentos(self):
+        try:
+            return default_storage.listdir(f"{epicrisis.PREFIJO}{self.alta.pk}/")[1]
+        except FileNotFoundError:
+            return []
+
+    def test_se_genera_al_guardar_y_se_sirve_desde_el_storage(self):
+        self.alta.observaciones = "Control en <CESFAM> & matrona"
+        self.guardar(self.alta)
+        self.assertEqual(self.documentos(), [f"{epicrisis.version(self.alta.pk)}.pdf"])
+
+        with mock.patch.object(epicrisis, "escribir", side_effect=AssertionError("no debería regenerar")):
+            respuesta = self.client.get(reverse("clinica:alta_epicrisis", args=[self.alta.pk]))
+        self.assertEqual(respuesta["Content-Type"], "application/pdf")
+        texto = "".join(p.extract_text() for p in PdfReader(BytesIO(b"".join(respuesta.streaming_content))).pages)
+        self.assertIn(self.alta.parto.paciente.rut, texto)
+        self.assertIn("<CESFAM> & matrona", texto)
+        for identificador in self.alta.parto.recien_nacidos.values_list("identificador", flat=True):
+            self.assertIn(identificador, texto)
+
+        revalidacion = self.client.get(
+            reverse("clinica:alta_epicrisis", args=[self.alta.pk]), HTTP_IF_NONE_MATCH=respuesta["ETag"]
+        )
+        self.assertEqual(revalidacion.status_code, 304)
+
+    def test_revalidacion_no_genera_el_documento(self):
+        url = reverse("clinica:alta_epicrisis", args=[self.alta.pk])
+        etag = f'"{epicrisis.version(self.alta.pk)}"'
+        with mock.patch.object(epicrisis, "escribir", side_effect=AssertionError("no debería generar")):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.documentos(), [])
+
+    def test_hilo_atrasado_no_borra_la_version_nueva(self):
+        self.guardar(self.alta)
+        anterior = epicrisis.version(self.alta.pk)
+        self.alta.observaciones = "Nueva indicación"
+        self.guardar(self.alta)
+        vigente = epicrisis.nombre(self.alta.pk, epicrisis.version(self.alta.pk))
+
+        # Un hilo que leyó la versión anterior termina después que el de la nueva
+        actual = epicrisis.version(self.alta.pk)
+        with mock.patch.object(epicrisis, "version", side_effect=[anterior, actual]):
+            epicrisis.generar(self.alta.pk)
+        self.assertTrue(default_storage.exists(vigente))
+
+        # Y si aun así falta el archivo, la vista lo regenera en vez de fallar
+        default_storage.delete(vigente)
+        with mock.patch.object(epicrisis, "obtener", return_value=vigente):
+            respuesta = self.client.get(reverse("clinica:alta_epicrisis", args=[self.alta.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(default_storage.exists(vigente))
+
+    def test_cambio_en_un_recien_nacido_reemplaza_la_version(self):
+        self.guardar(self.alta)
+        anterior = self.documentos()
+        rn = self.alta.parto.recien_nacidos.first()
+        rn.peso_gramos += 10
+        self.guardar(rn)
+        actual = self.documentos()
+        self.assertEqual(len(actual), 1)
+        self.assertNotEqual(actual, anterior)
+        self.assertEqual(actual, [f"{epicrisis.version(self.alta.pk)}.pdf"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alta.delete()
+        self.assertEqual(self.documentos(), [])
+
+    def test_sin_documento_previo_se_genera_en_la_solicitud(self):
+        # Altas cargadas en bloque: sin señales, no hay documento todavía
+        self.assertEqual(self.documentos(), [])
+        respuesta = self.client.get(reverse("clinica:alta_epicrisis", args=[self.alta.pk]))
+        self.assertTrue(b"".join(respuesta.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(len(self.documentos()), 1)
+        self.assertEqual(self.client.get(reverse("clinica:alta_epicrisis", args=[0])).status_code, 404)
+
+    def test_comando_genera_solo_las_faltantes(self):
+        total = Alta.objects.count()
+        salida = StringIO()
+        call_command("generar_epicrisis", stdout=salida)
+        self.assertIn(f"generadas: {total} (ya vigentes: 0)", salida.getvalue())
+        salida = StringIO()
+        call_command("generar_epicrisis", stdout=salida)
+        self.assertIn(f"generadas: 0 (ya vigentes: {total})", salida.getvalue())
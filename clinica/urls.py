@@ -41,6 +41,11 @@ urlpatterns = [
         views.RecienNacidoCreateView.as_view(),
         name="recien_nacido_create",
     ),
+    path(
+        "recien-nacidos/brazaletes/",
+        views.BrazaletesView.as_view(),
+        name="brazaletes",
+    ),
     path(
         "recien-nacidos/<int:pk>/editar/",
         views.RecienNacidoUpdateView.as_view(),
@@ -55,4 +60,5 @@ urlpatterns = [
     # Altas
     path("altas/nuevo/", views.AltaCreateView.as_view(), name="alta_create"),
     path("altas/<int:pk>/editar/", views.AltaUpdateView.as_view(), name="alta_update"),
+    path("altas/<int:pk>/epicrisis/", views.EpicrisisView.as_view(), name="alta_epicrisis"),
 ]
\ No newline at end of file
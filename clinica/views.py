@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.contrib import messages
 # Eliminamos LoginRequiredMixin porque PermitsPositionMixin ya maneja la autenticación
 from django.db.models import Prefetch, Q
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseBadRequest, HttpResponseNotModified
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control
+from django.views import View
 from django.views.generic import CreateView, DetailView, ListView, UpdateView
 
 # Importamos nuestro mixin personalizado
+from core.escrituras import EscrituraCoordinadaMixin
 from core.mixins import PermitsPositionMixin
+from core.storage import hash_de_nombre
 
+from . import brazaletes, epicrisis
 from .forms import (
     AltaForm,
     CasoClinicoForm,
@@ -63,7 +71,7 @@ class PacienteListView(PermitsPositionMixin, ListView):
         return context
 
 
-class PacienteCreateView(PermitsPositionMixin, CreateView):
+class PacienteCreateView(PermitsPositionMixin, EscrituraCoordinadaMixin, CreateView):
     # Crear pacientes: HU-6 Agregamos CLINICAL_SUPPORT
     permission_required = ['CLINICAL_FULL', 'ADMINISTRATIVE', 'CLINICAL_SUPPORT']
     
@@ -168,7 +176,7 @@ class CasoClinicoListView(PermitsPositionMixin, ListView):
         return super().get_queryset().select_related("paciente", "medico_responsable")
 
 
-class CasoClinicoCreateView(PermitsPositionMixin, CreateView):
+class CasoClinicoCreateView(PermitsPositionMixin, EscrituraCoordinadaMixin, CreateView):
     # Crear caso: Solo Médicos/Matronas (CLINICAL_FULL)
     permission_required = ['CLINICAL_FULL']
     
@@ -226,7 +234,7 @@ class PartoListView(PermitsPositionMixin, ListView):
         return qs
 
 
-class PartoCreateView(PermitsPositionMixin, CreateView):
+class PartoCreateView(PermitsPositionMixin, EscrituraCoordinadaMixin, CreateView):
     # REGISTRAR PARTO: HU-6 Permitir CLINICAL_SUPPORT
     permission_required = ['CLINICAL_FULL', 'CLINICAL_SUPPORT']
     
@@ -249,7 +257,7 @@ class PartoCreateView(PermitsPositionMixin, CreateView):
         return reverse("clinica:parto_detail", args=[self.object.pk])
 
 
-class PartoUpdateView(PermitsPositionMixin, UpdateView):
+class PartoUpdateView(PermitsPositionMixin, EscrituraCoordinadaMixin, UpdateView):
     # Editar parto: HU-6 Permitir CLINICAL_SUPPORT
     permission_required = ['CLINICAL_FULL', 'CLINICAL_SUPPORT']
     
@@ -306,7 +314,7 @@ class RecienNacidoListView(PermitsPositionMixin, ListView):
         )
 
 
-class RecienNacidoCreateView(PermitsPositionMixin, CreateView):
+class RecienNacidoCreateView(PermitsPositionMixin, EscrituraCoordinadaMixin, CreateView):
     # Registrar RN: HU-6 Permitir CLINICAL_SUPPORT
     permission_required = ['CLINICAL_FULL', 'CLINICAL_SUPPORT']
     
@@ -352,11 +360,45 @@ class RecienNacidoDetailView(PermitsPositionMixin, DetailView):
         )
 
 
+class BrazaletesView(PermitsPositionMixin, View):
+    # Imprimir brazaletes: Todo el personal clínico
+    permission_required = ['CLINICAL_FULL', 'CLINICAL_SUPPORT']
+
+    def get(self, request):
+        try:
+            partos = [int(v) for v in request.GET.getlist("parto")]
+            recien_nacidos = [int(v) for v in request.GET.getlist("rn")]
+            copias = min(max(int(request.GET.get("copias", 1)), 1), brazaletes.MAX_COPIAS)
+        except ValueError:
+            return HttpResponseBadRequest("Parámetros inválidos")
+        try:
+            # La hoja se genera dentro del request: solo turnos acotados
+            desde, hasta = brazaletes.ventana(
+                request.GET.get("desde"), request.GET.get("hasta"),
+                getattr(settings, "BRAZALETES_MAX_HORAS", 24),
+            )
+        except ValueError as error:
+            return HttpResponseBadRequest(f"Ventana inválida: {error}")
+        formato = request.GET.get("formato", "etiquetas")
+        if formato not in brazaletes.FORMATOS:
+            return HttpResponseBadRequest("Formato desconocido")
+
+        maximo = getattr(settings, "BRAZALETES_MAX_RN", 300)
+        filas = brazaletes.filas(brazaletes.seleccionar(partos, recien_nacidos, desde, hasta), limite=maximo + 1)
+        if not filas:
+            return HttpResponseBadRequest("No hay recién nacidos para imprimir")
+        if len(filas) > maximo:
+            return HttpResponseBadRequest(
+                f"Más de {maximo} recién nacidos: acote la selección o use el comando imprimir_brazaletes"
+            )
+        return brazaletes.respuesta(filas, formato, copias)
+
+
 # -----------------------------------------------------------------------------
 # VISTAS DE ALTA
 # -----------------------------------------------------------------------------
 
-class AltaCreateView(PermitsPositionMixin, CreateView):
+class AltaCreateView(PermitsPositionMixin, EscrituraCoordinadaMixin, CreateView):
     # Dar de alta: Responsabilidad Médico-Legal exclusiva (CLINICAL_FULL)
     permission_required = ['CLINICAL_FULL']
     
@@ -408,7 +450,7 @@ class AltaCreateView(PermitsPositionMixin, CreateView):
         return reverse("clinica:paciente_trazabilidad", args=[self.object.parto.paciente_id])
 
 
-class AltaUpdateView(PermitsPositionMixin, UpdateView):
+class AltaUpdateView(PermitsPositionMixin, EscrituraCoordinadaMixin, UpdateView):
     # Editar alta: Responsabilidad Médico-Legal exclusiva (CLINICAL_FULL)
     permission_required = ['CLINICAL_FULL']
     
@@ -431,4 +473,40 @@ class AltaUpdateView(PermitsPositionMixin, UpdateView):
         return super().form_valid(form)
 
     def get_success_url(self):
-        return reverse("clinica:paciente_trazabilidad", args=[self.object.parto.paciente_id])
\ No newline at end of file
+        return reverse("clinica:paciente_trazabilidad", args=[self.object.parto.paciente_id])
+
+
+class EpicrisisView(PermitsPositionMixin, View):
+    """
+    Epicrisis en PDF del alta. Se sirve desde el storage (generada al guardar
+    el alta); solo se genera aquí si los datos cambiaron y el documento en
+    segundo plano todavía no está. El ETag es la versión de los datos.
+    """
+
+    # Ver epicrisis: Todo el personal clínico
+    permission_required = ['CLINICAL_FULL', 'CLINICAL_SUPPORT']
+
+    def get(self, request, pk):
+        # La versión sale de una consulta: una revalidación no genera el PDF
+        version = epicrisis.version(pk)
+        if version is None:
+            raise Http404
+        etag = f'"{version}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            nombre = epicrisis.obtener(pk)
+            try:
+                archivo = default_storage.open(nombre, "rb") if nombre else None
+            except FileNotFoundError:
+                # Lo borró la limpieza de una versión concurrente: se vuelve a generar
+                nombre = epicrisis.generar(pk)
+                archivo = default_storage.open(nombre, "rb") if nombre else None
+            if archivo is None:
+                raise Http404
+            etag = f'"{hash_de_nombre(nombre)}"'
+            response = FileResponse(archivo, filename=f"Epicrisis_alta_{pk}.pdf", content_type="application/pdf")
+        response["ETag"] = etag
+        # La URL es fija y el contenido cambia con los datos: siempre se revalida
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core"
+
+    def ready(self):
+        import core.checks  # noqa: F401 (registra los chequeos de sistema)
+        from core.db_profile import aplicar_perfil
+
+        connection_created.connect(aplicar_perfil, dispatch_uid="core_sqlite_perfil")
@@ -0,0 +1,81 @@
+# core/benchmark_arranque.py
+"""
+Benchmark del arranque de un worker: corre `python -X importtime manage.py
+check` en un proceso nuevo y suma el tiempo de importación (columna
+acumulada de los módulos de primer nivel), además del tiempo total del
+proceso. Cada escenario fija variables de entorno; `precarga` importa los
+backends de exportación al arrancar, como antes de `reportes.exportadores`.
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+ESCENARIOS = {
+    "diferido": {"REPORTES_EXPORTADORES_PRECARGA": "0"},
+    "precarga": {"REPORTES_EXPORTADORES_PRECARGA": "1"},
+}
+
+# Librerías de exportación cuyo costo de importación interesa ver por separado
+PESADAS = ("openpyxl", "xhtml2pdf", "reportlab", "numpy", "PIL")
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def analizar(salida):
+    """
+    De la salida de -X importtime: (µs totales, {paquete: µs propios del
+    paquete y sus submódulos}, cantidad de módulos).
+    """
+    total = 0
+    propios = {}
+    modulos = 0
+    for linea in salida.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if not coincidencia:
+            continue
+        modulos += 1
+        propio, acumulado = int(coincidencia.group(1)), int(coincidencia.group(2))
+        sangria, modulo = len(coincidencia.group(3)), coincidencia.group(4)
+        if sangria == 1:
+            total += acumulado
+        paquete = modulo.split(".")[0]
+        propios[paquete] = propios.get(paquete, 0) + propio
+    return total, propios, modulos
+
+
+def medir(entorno=None, comando=("check",)):
+    env = {**os.environ, **(entorno or {})}
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(settings.BASE_DIR, "manage.py"), *comando],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    proceso_ms = (time.perf_counter() - inicio) * 1000
+    total, propios, modulos = analizar(proceso.stderr)
+    return {
+        "proceso_ms": round(proceso_ms, 1),
+        "importacion_ms": round(total / 1000, 1),
+        "modulos": modulos,
+        "pesadas_ms": {nombre: round(propios[nombre] / 1000, 1) for nombre in PESADAS if nombre in propios},
+    }
+
+
+def comparar(escenarios=None, repeticiones=3):
+    resultados = []
+    for nombre in escenarios or ESCENARIOS:
+        medidas = [medir(ESCENARIOS[nombre]) for _ in range(repeticiones)]
+        # La mediana por métrica descarta la primera corrida con disco frío
+        resultados.append({
+            "escenario": nombre,
+            "proceso_ms": statistics.median(m["proceso_ms"] for m in medidas),
+            "importacion_ms": statistics.median(m["importacion_ms"] for m in medidas),
+            "modulos": medidas[-1]["modulos"],
+            "pesadas_ms": medidas[-1]["pesadas_ms"],
+        })
+    return resultados
@@ -0,0 +1,167 @@
+# core/benchmark_concurrencia.py
+"""
+Benchmark de concurrencia de SQLite con varios procesos.
+
+Cada proceso simula un worker de gunicorn: arranca Django por su cuenta,
+abre sus propias conexiones y atiende "requests" en un ciclo cerrado (con
+`close_old_connections()` al inicio y al final, igual que Django entre
+requests, así que CONN_MAX_AGE y CONN_HEALTH_CHECKS se comportan como en
+producción). Cada request es:
+
+- lectura: ficha de una paciente con sus partos y el conteo de RN del
+  último mes;
+- escritura: cambio de teléfono de una paciente dentro de una transacción,
+  con la auditoría de `clinica.signals` (SELECT previo, UPDATE e INSERT en
+  HistorialPaciente).
+
+En los escenarios "coordinados" la escritura usa `core.escrituras` como las
+vistas clínicas (BEGIN IMMEDIATE con reintentos) y la auditoría pasa por la
+cola de escrituras diferidas.
+
+Cada perfil corre sobre su propia copia de la base, tomada con la API de
+backup. Este módulo no importa modelos al nivel superior porque los workers
+se crean con `spawn`.
+"""
+
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from multiprocessing import get_context
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)], 2)
+
+
+def _resumir_latencias(latencias):
+    return {
+        "p50_ms": _percentil(latencias, 50),
+        "p95_ms": _percentil(latencias, 95),
+        "p99_ms": _percentil(latencias, 99),
+        "max_ms": round(max(latencias), 2) if latencias else None,
+    }
+
+
+def trabajador(config, barrera, resultados):
+    """Punto de entrada de cada proceso."""
+    os.environ["DJANGO_SETTINGS_MODULE"] = "core.settings"
+    os.environ["SQLITE_PERFIL"] = config["perfil"]
+    os.environ["DB_CONN_MAX_AGE"] = str(config["conn_max_age"])
+    os.environ["ESCRITURAS_DIFERIDAS"] = "1" if config["coordinado"] else "0"
+    import django
+
+    django.setup()
+
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.db import OperationalError, close_old_connections, connections, transaction
+    from django.utils import timezone
+
+    from clinica.models import Paciente, RecienNacido
+    from core import escrituras
+
+    settings.DATABASES["default"]["NAME"] = config["base"]
+    connections.close_all()
+
+    rng = random.Random(config["semilla"])
+    ids = list(Paciente.objects.values_list("pk", flat=True)[:5000])
+    connections.close_all()
+
+    def leer():
+        paciente = Paciente.objects.get(pk=rng.choice(ids))
+        list(paciente.partos.all())
+        RecienNacido.objects.filter(parto__fecha_hora__gte=timezone.now() - timedelta(days=30)).count()
+
+    def cambiar_telefono():
+        paciente = Paciente.objects.get(pk=rng.choice(ids))
+        paciente.telefono = f"+569{rng.randrange(10**8):08d}"
+        paciente.save()
+
+    def escribir():
+        if config["coordinado"]:
+            escrituras.ejecutar_escritura(cambiar_telefono, operacion="benchmark")
+        else:
+            with transaction.atomic():
+                cambiar_telefono()
+
+    latencias = {"lectura": [], "escritura": []}
+    errores = {"lectura": 0, "escritura": 0}
+    barrera.wait()
+    fin = time.perf_counter() + config["duracion"]
+    while time.perf_counter() < fin:
+        close_old_connections()
+        tipo = "escritura" if rng.random() < config["proporcion_escrituras"] else "lectura"
+        inicio = time.perf_counter()
+        try:
+            (escribir if tipo == "escritura" else leer)()
+            latencias[tipo].append((time.perf_counter() - inicio) * 1000)
+        except OperationalError:
+            # "database is locked": el request habría terminado en un 500
+            errores[tipo] += 1
+        close_old_connections()
+    escrituras.COLA.vaciar(timeout=30)
+    connections.close_all()
+    resultados.put({"latencias": latencias, "errores": errores})
+
+
+def correr_perfil(origen, perfil, procesos, duracion, proporcion_escrituras, conn_max_age, directorio, coordinado=False):
+    """Corre `procesos` workers sobre una copia fresca de `origen`."""
+    from core.db_router import refrescar_copia
+
+    base = os.path.join(directorio, f"bench_{perfil}_{conn_max_age}_{int(coordinado)}.sqlite3")
+    refrescar_copia(origen=origen, destino=base)
+
+    ctx = get_context("spawn")
+    barrera = ctx.Barrier(procesos)
+    resultados = ctx.Queue()
+    config = {
+        "base": base,
+        "perfil": perfil,
+        "conn_max_age": conn_max_age,
+        "coordinado": coordinado,
+        "duracion": duracion,
+        "proporcion_escrituras": proporcion_escrituras,
+    }
+    workers = [
+        ctx.Process(target=trabajador, args=({**config, "semilla": i}, barrera, resultados))
+        for i in range(procesos)
+    ]
+    for worker in workers:
+        worker.start()
+    parciales = [resultados.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    resumen = {"perfil": perfil, "conn_max_age": conn_max_age, "coordinado": coordinado, "procesos": procesos}
+    for tipo in ("lectura", "escritura"):
+        latencias = [ms for parcial in parciales for ms in parcial["latencias"][tipo]]
+        resumen[tipo] = {
+            "ok": len(latencias),
+            "errores": sum(parcial["errores"][tipo] for parcial in parciales),
+            "por_segundo": round(len(latencias) / duracion, 1),
+            "media_ms": round(statistics.fmean(latencias), 2) if latencias else None,
+            **_resumir_latencias(latencias),
+        }
+    return resumen
+
+
+def comparar(escenarios, origen="default", procesos=4, duracion=10.0, proporcion_escrituras=0.2):
+    """
+    Corre cada escenario (perfil, conn_max_age, coordinado) y devuelve la
+    lista de resúmenes en el mismo orden.
+    """
+    directorio = tempfile.mkdtemp(prefix="bench_sqlite_")
+    try:
+        return [
+            correr_perfil(origen, perfil, procesos, duracion, proporcion_escrituras, conn_max_age, directorio, coordinado)
+            for perfil, conn_max_age, coordinado in escenarios
+        ]
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
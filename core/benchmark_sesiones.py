@@ -0,0 +1,102 @@
+# core/benchmark_sesiones.py
+"""
+Benchmark de escrituras por request debidas a la sesión.
+
+Cada escenario hace N requests autenticados a una vista liviana con el
+cliente de pruebas (todo el stack de middleware) y cuenta las escrituras SQL
+hechas en el request, por tabla. En el motor con escritura diferida se suman
+aparte las que persistió la cola (`hospital_session_writes_total`).
+"""
+
+import re
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.escrituras import COLA
+from core.metrics import ESCRITURAS_SESION
+
+USUARIO_BENCHMARK = "benchmark_sesiones"
+
+ESCENARIOS = {
+    # Comportamiento anterior: set_expiry en cada request
+    "db_por_request": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "SESION_UMBRAL_RENOVACION": settings.SESSION_COOKIE_AGE,
+    },
+    "db_umbral": {"SESSION_ENGINE": "django.contrib.sessions.backends.db"},
+    "cache_diferida_por_request": {
+        "SESSION_ENGINE": "core.sesiones",
+        "SESION_UMBRAL_RENOVACION": settings.SESSION_COOKIE_AGE,
+    },
+    "cache_diferida_umbral": {"SESSION_ENGINE": "core.sesiones"},
+}
+
+_ESCRITURA = re.compile(r'^\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+class ContadorEscrituras:
+    def __init__(self):
+        self.por_tabla = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        coincidencia = _ESCRITURA.match(sql)
+        if coincidencia:
+            self.por_tabla[coincidencia.group(2)] += 1
+        return execute(sql, params, many, context)
+
+
+def _usuario():
+    from UsuarioApp.models import Profile
+
+    User = get_user_model()
+    usuario, creado = User.objects.get_or_create(
+        username=USUARIO_BENCHMARK, defaults={"is_superuser": True, "is_staff": True}
+    )
+    if creado:
+        usuario.set_unusable_password()
+        usuario.save()
+    Profile.objects.get_or_create(user_FK=usuario)
+    return usuario
+
+
+def correr(nombre, ajustes, requests=200, url=None):
+    usuario = _usuario()
+    url = url or reverse("metrics")
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], **ajustes):
+        cliente = Client()
+        cliente.force_login(usuario)
+        cliente.get(url)
+        COLA.vaciar(timeout=10)
+
+        persistidas_antes = ESCRITURAS_SESION.valor(tipo="persistida")
+        contador = ContadorEscrituras()
+        tiempos = []
+        with connection.execute_wrapper(contador):
+            for _ in range(requests):
+                inicio = time.perf_counter()
+                cliente.get(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        COLA.vaciar(timeout=10)
+        cliente.logout()
+
+    return {
+        "escenario": nombre,
+        "requests": requests,
+        "escrituras_en_request": dict(contador.por_tabla),
+        "escrituras_por_request": round(sum(contador.por_tabla.values()) / requests, 3),
+        "persistidas_por_cola": ESCRITURAS_SESION.valor(tipo="persistida") - persistidas_antes,
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(sorted(tiempos)[int(len(tiempos) * 0.95) - 1], 2),
+    }
+
+
+def comparar(escenarios=None, requests=200):
+    return [correr(nombre, ESCENARIOS[nombre], requests) for nombre in (escenarios or ESCENARIOS)]
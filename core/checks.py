@@ -0,0 +1,48 @@
+# core/checks.py
+"""
+Chequeos de sistema de la configuración de caché.
+
+Los parciales de reportes y la presencia de usuarios viven en la caché por
+defecto y solo son correctos si todos los workers ven la misma: con
+`locmemcache://` (el valor por defecto de CACHE_URL) cada proceso tiene la
+suya y una invalidación o un latido no llega a los demás.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CACHES_LOCALES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+# incr/add atómicos entre procesos (filecache es compartida pero no atómica)
+CACHES_ATOMICAS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+)
+
+
+def cache_compartida(alias="default", atomica=False):
+    """True si la caché `alias` la ven todos los procesos (y, con `atomica`, si incr/add lo son)."""
+    backend = settings.CACHES[alias]["BACKEND"]
+    if atomica:
+        return backend in CACHES_ATOMICAS
+    return backend not in CACHES_LOCALES
+
+
+@register(Tags.caches)
+def revisar_cache_compartida(app_configs, **kwargs):
+    if settings.DEBUG or cache_compartida():
+        return []
+    return [
+        Warning(
+            "La caché por defecto es local a cada proceso.",
+            hint=(
+                "Con varios workers los parciales de reportes duran a lo más 5 minutos y la "
+                "presencia se calcula desde la base. Configure CACHE_URL con Redis o Memcached."
+            ),
+            id="core.W001",
+        )
+    ]
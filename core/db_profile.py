@@ -0,0 +1,84 @@
+# core/db_profile.py
+"""
+Perfiles de SQLite por alias de base de datos.
+
+Al abrir cada conexión (`connection_created`) se aplican los PRAGMA del perfil
+configurado en SQLITE_PERFILES_POR_ALIAS:
+
+- `basico`: los valores por defecto de SQLite (journal DELETE, synchronous
+  FULL). Los lectores bloquean el commit de los escritores y viceversa.
+- `produccion`: WAL (lectores y un escritor en paralelo), synchronous NORMAL
+  (seguro en WAL: ante un corte se pierde a lo sumo la última transacción,
+  sin corromper), mmap, caché de páginas más grande, temporales en memoria y
+  busy_timeout para esperar al escritor en vez de fallar con "database is
+  locked".
+- `lectura`: para la copia de reportes abierta en solo lectura; no cambia el
+  modo de journal.
+
+La reutilización de conexiones (CONN_MAX_AGE + CONN_HEALTH_CHECKS) se
+configura en DATABASES; ver `core/settings.py`.
+"""
+
+from django.conf import settings
+
+BASICO = "basico"
+PRODUCCION = "produccion"
+LECTURA = "lectura"
+
+MMAP_BYTES = 256 * 1024 * 1024
+CACHE_KIB = 64 * 1024
+
+# El orden importa: busy_timeout primero, para que el cambio a WAL espere si
+# otro proceso tiene la base tomada
+PERFILES = {
+    BASICO: {},
+    PRODUCCION: {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": MMAP_BYTES,
+        "cache_size": -CACHE_KIB,  # negativo = KiB
+        "temp_store": "MEMORY",
+    },
+    LECTURA: {
+        "busy_timeout": 5000,
+        "mmap_size": MMAP_BYTES,
+        "cache_size": -CACHE_KIB,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def perfil_de(alias):
+    return getattr(settings, "SQLITE_PERFILES_POR_ALIAS", {}).get(alias, BASICO)
+
+
+def pragmas_de(alias):
+    perfil = perfil_de(alias)
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil SQLite desconocido para '{alias}': {perfil}")
+    return PERFILES[perfil]
+
+
+def aplicar_perfil(sender, connection, **kwargs):
+    """Receptor de `connection_created`."""
+    if connection.vendor != "sqlite" or connection.is_in_memory_db():
+        return
+    pragmas = pragmas_de(connection.alias)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+
+
+def pragmas_actuales(connection, nombres=None):
+    """Valores vigentes en la conexión (para diagnóstico y tests)."""
+    nombres = nombres or list(PERFILES[PRODUCCION])
+    valores = {}
+    with connection.cursor() as cursor:
+        for nombre in nombres:
+            cursor.execute(f"PRAGMA {nombre}")
+            fila = cursor.fetchone()
+            valores[nombre] = fila[0] if fila else None
+    return valores
@@ -0,0 +1,149 @@
+# core/db_router.py
+"""
+Base de solo lectura para los reportes.
+
+Los reportes pesados y las escrituras clínicas compiten por el mismo archivo
+SQLite. El alias `reporting` apunta a una copia de `db.sqlite3` que se
+refresca periódicamente con la API de backup en línea de SQLite
+(`refrescar_copia`, comando `refrescar_base_reportes`) y se abre en modo
+solo lectura con `mmap_size`.
+
+Solo se enrutan las lecturas hechas dentro de `lecturas_de_reportes()` (las
+vistas de `reportes` lo activan con `LecturaReportesMixin`) y solo de los
+modelos de REPORTES_DB_APPS; sesiones, usuarios y permisos siempre se leen de
+la base principal. Si la copia no existe o tiene más de
+REPORTES_DB_MAX_DESFASE segundos, las lecturas vuelven a la principal.
+"""
+
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.metrics import EDAD_COPIA_REPORTES, LECTURAS_REPORTES
+from core.respaldos import copiar_en_linea
+
+logger = logging.getLogger(__name__)
+
+ALIAS = "reporting"
+
+_alias_activo = ContextVar("alias_lectura_reportes", default=None)
+
+
+def archivo_copia():
+    return getattr(settings, "REPORTES_DB_ARCHIVO", None)
+
+
+def edad_copia():
+    """Segundos desde que se tomó la copia, o None si no existe."""
+    archivo = archivo_copia()
+    try:
+        return max(time.time() - os.stat(archivo).st_mtime, 0.0)
+    except (OSError, TypeError):
+        return None
+
+
+def marca_copia(alias):
+    """Momento (aware) de los datos que ve `alias`; None para la base principal."""
+    if alias != ALIAS:
+        return None
+    try:
+        return datetime.fromtimestamp(os.stat(archivo_copia()).st_mtime, tz=dt_timezone.utc)
+    except (OSError, TypeError):
+        return None
+
+
+def alias_disponible():
+    """ALIAS si la copia está dentro del desfase permitido; si no, None."""
+    max_desfase = getattr(settings, "REPORTES_DB_MAX_DESFASE", 0)
+    if not max_desfase or ALIAS not in settings.DATABASES:
+        return None
+    edad = edad_copia()
+    if edad is None:
+        return None
+    EDAD_COPIA_REPORTES.set(round(edad, 1))
+    return ALIAS if edad <= max_desfase else None
+
+
+@contextmanager
+def lecturas_de_reportes():
+    """Enruta a la copia las lecturas del bloque (si está vigente)."""
+    alias = alias_disponible()
+    LECTURAS_REPORTES.inc(base=alias or DEFAULT_DB_ALIAS)
+    token = _alias_activo.set(alias)
+    try:
+        yield alias or DEFAULT_DB_ALIAS
+    finally:
+        _alias_activo.reset(token)
+
+
+class LecturaReportesMixin:
+    """Ejecuta la vista (y el render de su plantilla) contra la copia de reportes."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with lecturas_de_reportes():
+            response = super().dispatch(request, *args, **kwargs)
+            # TemplateResponse se renderiza después de dispatch: los querysets
+            # perezosos del contexto deben evaluarse todavía dentro del bloque
+            if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                response.render()
+            return response
+
+
+class ReportesRouter:
+    def _enrutable(self, model):
+        return model._meta.app_label in getattr(settings, "REPORTES_DB_APPS", ())
+
+    def db_for_read(self, model, **hints):
+        alias = _alias_activo.get()
+        if alias and self._enrutable(model):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sin esto Django escribiría en la base de la que se leyó la instancia
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Misma base lógica: la copia es una réplica de la principal
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ALIAS:
+            return False
+        return None
+
+
+# --- REFRESCO DE LA COPIA ---
+
+def refrescar_copia(origen=DEFAULT_DB_ALIAS, destino=None, paginas=1024, pausa=0.005):
+    """
+    Copia la base `origen` a `destino` con la API de backup en línea, de a
+    `paginas` páginas con una `pausa` entre pasos para no bloquear a los
+    escritores. La copia se arma en un archivo temporal y se publica con un
+    reemplazo atómico; su mtime queda en el momento de inicio del backup.
+    Devuelve la duración en segundos.
+    """
+    destino = destino or archivo_copia()
+    inicio = time.time()
+    temporal = f"{destino}.{uuid.uuid4().hex[:8]}.tmp"
+    # En journal_mode=DELETE: una copia en WAL necesitaría -wal/-shm para
+    # abrirse en solo lectura
+    copiar_en_linea(str(settings.DATABASES[origen]["NAME"]), temporal, paginas, pausa)
+
+    try:
+        os.utime(temporal, (inicio, inicio))
+        os.replace(temporal, destino)
+    except OSError:
+        # En Windows no se puede reemplazar un archivo abierto por un lector
+        logger.exception("No se pudo publicar la copia de reportes en %s", destino)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return time.time() - inicio
@@ -0,0 +1,264 @@
+# core/escrituras.py
+"""
+Coordinación de escrituras en SQLite.
+
+SQLite admite un solo escritor. Con varios workers guardando a la vez
+(cambio de turno) aparecen dos problemas:
+
+- Una transacción diferida (`BEGIN`) que primero lee y después escribe
+  necesita subir su lock a mitad de camino; si otro escritor se adelantó,
+  SQLite devuelve "database is locked" de inmediato, sin pasar por
+  busy_timeout. `transaccion_inmediata()` abre con `BEGIN IMMEDIATE`: el lock
+  de escritura se toma al comienzo y la espera sí respeta busy_timeout.
+- Si aun así la base sigue bloqueada, `con_reintentos()` repite la operación
+  completa con backoff exponencial y jitter.
+
+Las escrituras no urgentes (auditoría, marcas de actividad, mantenimiento)
+pueden pasar por `diferir()`: con ESCRITURAS_DIFERIDAS activo se encolan al
+confirmarse la transacción que las originó y un único hilo escritor por
+proceso las aplica por lotes. Sin la opción, se ejecutan en el momento.
+
+Las métricas de contención quedan en /metrics (`hospital_db_write_*`,
+`hospital_db_lock_failures_total`, `hospital_write_queue_*`).
+"""
+
+import atexit
+import functools
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+
+from core.metrics import (
+    ESPERA_LOCK_ESCRITURA,
+    FALLOS_BLOQUEO,
+    PROFUNDIDAD_COLA,
+    REINTENTOS_ESCRITURA,
+    RETRASO_COLA_ESCRITURAS,
+)
+
+logger = logging.getLogger(__name__)
+
+MENSAJES_BLOQUEO = ("database is locked", "database table is locked", "database is busy")
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def es_bloqueo(error):
+    return isinstance(error, OperationalError) and any(m in str(error).lower() for m in MENSAJES_BLOQUEO)
+
+
+# --- TRANSACCIONES Y REINTENTOS ---
+
+@contextmanager
+def transaccion_inmediata(using=None, operacion="escritura"):
+    """
+    `transaction.atomic` que en SQLite abre con BEGIN IMMEDIATE. Dentro de
+    un bloque atómico ya abierto (o en otro motor) es un atomic normal.
+    """
+    alias = using or DEFAULT_DB_ALIAS
+    conexion = connections[alias]
+    if conexion.vendor != "sqlite" or conexion.in_atomic_block:
+        with transaction.atomic(using=alias):
+            yield
+        return
+
+    # transaction_mode se fija al conectar: primero la conexión, después el modo
+    conexion.ensure_connection()
+    anterior = conexion.transaction_mode
+    bloque = transaction.atomic(using=alias)
+    conexion.transaction_mode = "IMMEDIATE"
+    inicio = time.perf_counter()
+    try:
+        bloque.__enter__()
+    finally:
+        conexion.transaction_mode = anterior
+        ESPERA_LOCK_ESCRITURA.observe(time.perf_counter() - inicio, operacion=operacion)
+
+    try:
+        yield
+    except BaseException as error:
+        bloque.__exit__(type(error), error, error.__traceback__)
+        raise
+    else:
+        bloque.__exit__(None, None, None)
+
+
+def ejecutar_escritura(funcion, *args, using=None, operacion="escritura", al_reintentar=None, **kwargs):
+    """
+    Ejecuta `funcion` en una transacción inmediata, reintentando si la base
+    está bloqueada. Dentro de una transacción externa no se reintenta (no se
+    puede repetir solo una parte): el error sube a quien la abrió.
+    """
+    alias = using or DEFAULT_DB_ALIAS
+    intentos = _config("ESCRITURAS_REINTENTOS", 5)
+    base = _config("ESCRITURAS_ESPERA_BASE", 0.05)
+    maximo = _config("ESCRITURAS_ESPERA_MAX", 1.0)
+    reintentable = not connections[alias].in_atomic_block
+
+    for intento in range(intentos + 1):
+        try:
+            with transaccion_inmediata(alias, operacion):
+                return funcion(*args, **kwargs)
+        except OperationalError as error:
+            if not es_bloqueo(error) or not reintentable or intento == intentos:
+                if es_bloqueo(error):
+                    FALLOS_BLOQUEO.inc(operacion=operacion)
+                raise
+            REINTENTOS_ESCRITURA.inc(operacion=operacion)
+            # Full jitter: evita que los workers que chocaron reintenten juntos
+            time.sleep(random.uniform(0, min(maximo, base * 2 ** intento)))
+            if al_reintentar:
+                al_reintentar()
+
+
+def con_reintentos(operacion="escritura", using=None):
+    """Decorador: la función completa corre con `ejecutar_escritura`."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            return ejecutar_escritura(funcion, *args, using=using, operacion=operacion, **kwargs)
+        return envoltura
+    return decorador
+
+
+class EscrituraCoordinadaMixin:
+    """
+    Para CreateView/UpdateView: `form.save()` (guardado, m2m y señales de
+    auditoría) corre en una transacción inmediata con reintentos. Lo demás de
+    `form_valid` (mensajes, redirección) corre una sola vez.
+    """
+
+    operacion_escritura = None
+
+    def form_valid(self, form):
+        operacion = self.operacion_escritura or type(self).__name__
+        guardar = form.save
+        instancia = form.instance
+        campos = dict(instancia.__dict__)
+        adding, db = instancia._state.adding, instancia._state.db
+
+        def restaurar():
+            # El intento fallido pudo asignar pk o campos generados en save()
+            # (p.ej. RecienNacido.identificador) antes del rollback
+            instancia.__dict__.clear()
+            instancia.__dict__.update(campos)
+            instancia._state.adding, instancia._state.db = adding, db
+
+        def guardar_con_reintentos(commit=True):
+            if not commit:
+                return guardar(commit=False)
+            return ejecutar_escritura(guardar, operacion=operacion, al_reintentar=restaurar)
+
+        form.save = guardar_con_reintentos
+        return super().form_valid(form)
+
+
+# --- COLA DE ESCRITURAS DIFERIDAS ---
+
+class ColaEscrituras:
+    """Un hilo escritor por proceso que aplica las escrituras encoladas por lotes."""
+
+    def __init__(self, maximo=10000, lote=100):
+        self.lote = lote
+        self._cola = queue.Queue(maxsize=maximo)
+        self._hilo = None
+        self._lock = threading.Lock()
+        PROFUNDIDAD_COLA.set_funcion(self._cola.qsize, cola="escrituras")
+
+    def _asegurar_hilo(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ciclo, name="cola-escrituras", daemon=True)
+                self._hilo.start()
+
+    def encolar(self, funcion, args=(), kwargs=None, operacion="diferida"):
+        item = (time.monotonic(), funcion, args, kwargs or {}, operacion)
+        try:
+            self._cola.put_nowait(item)
+        except queue.Full:
+            # Contrapresión: mejor una escritura en línea que perderla
+            logger.warning("Cola de escrituras llena; se ejecuta en línea (%s)", operacion)
+            self._aplicar([item])
+            return
+        self._asegurar_hilo()
+
+    def vaciar(self, timeout=None):
+        """Espera a que se apliquen las escrituras pendientes. True si terminó."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ciclo(self):
+        while True:
+            items = [self._cola.get()]
+            while len(items) < self.lote:
+                try:
+                    items.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                close_old_connections()
+                with _perfilar_lote(items):
+                    self._aplicar(items)
+            finally:
+                for _ in items:
+                    self._cola.task_done()
+
+    def _aplicar(self, items):
+        def todas():
+            for _, funcion, args, kwargs, _ in items:
+                funcion(*args, **kwargs)
+
+        try:
+            ejecutar_escritura(todas, operacion="cola")
+        except Exception:
+            if len(items) == 1:
+                logger.exception("Escritura diferida fallida (%s)", items[0][4])
+                return
+            # Un elemento defectuoso no debe arrastrar al resto del lote
+            for item in items:
+                self._aplicar([item])
+            return
+        ahora = time.monotonic()
+        for encolado, _, _, _, operacion in items:
+            RETRASO_COLA_ESCRITURAS.observe(ahora - encolado, operacion=operacion)
+
+
+def _perfilar_lote(items):
+    from reportes.profiling import perfilar_trabajo
+
+    operaciones = sorted({item[4] for item in items})
+    # Guardar un perfil difiere su retención: perfilar ese lote no terminaría nunca
+    if operaciones == ["retencion_perfiles"]:
+        return nullcontext()
+    return perfilar_trabajo(f"cola_escrituras:{','.join(operaciones)}")
+
+
+COLA = ColaEscrituras()
+atexit.register(COLA.vaciar, 5)
+
+
+def diferir(funcion, *args, operacion="diferida", using=None, **kwargs):
+    """
+    Escritura no urgente. Con ESCRITURAS_DIFERIDAS se encola para el hilo
+    escritor una vez confirmada la transacción actual (si se revierte, no se
+    escribe); si no, se ejecuta de inmediato.
+    """
+    if not _config("ESCRITURAS_DIFERIDAS", False):
+        return funcion(*args, **kwargs)
+    transaction.on_commit(
+        lambda: COLA.encolar(funcion, args, kwargs, operacion),
+        using=using or DEFAULT_DB_ALIAS,
+    )
+    return None
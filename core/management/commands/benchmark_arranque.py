@@ -0,0 +1,34 @@
+# core/management/commands/benchmark_arranque.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark_arranque import ESCENARIOS, comparar
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de un worker (python -X importtime manage.py check) con exportadores diferidos y precargados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escenarios", help=f"Separados por comas; disponibles: {', '.join(ESCENARIOS)}.")
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--salida", help="Guarda los resultados en JSON.")
+
+    def handle(self, *args, **options):
+        escenarios = options["escenarios"].split(",") if options["escenarios"] else None
+        for nombre in escenarios or ():
+            if nombre not in ESCENARIOS:
+                raise CommandError(f"Escenario desconocido: {nombre}")
+
+        resultados = comparar(escenarios, repeticiones=options["repeticiones"])
+        for r in resultados:
+            pesadas = ", ".join(f"{modulo}={ms}ms" for modulo, ms in r["pesadas_ms"].items()) or "-"
+            self.stdout.write(
+                f"{r['escenario']:<10} importación={r['importacion_ms']:>7}ms  proceso={r['proceso_ms']:>7}ms  "
+                f"módulos={r['modulos']:<5} [{pesadas}]"
+            )
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(resultados, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
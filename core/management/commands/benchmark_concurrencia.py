@@ -0,0 +1,55 @@
+# core/management/commands/benchmark_concurrencia.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark_concurrencia import comparar
+from core.db_profile import PERFILES
+
+
+class Command(BaseCommand):
+    help = "Compara perfiles de SQLite con varios procesos leyendo y escribiendo a la vez (como workers de gunicorn)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--escenarios", default="basico:0,produccion:600,produccion:600:coordinado",
+            help="Lista perfil:CONN_MAX_AGE[:coordinado] separada por comas.",
+        )
+        parser.add_argument("--procesos", type=int, default=4)
+        parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por escenario.")
+        parser.add_argument("--escrituras", type=float, default=0.2, help="Fracción de requests que escriben.")
+        parser.add_argument("--salida", help="Guarda los resultados en JSON.")
+
+    def handle(self, *args, **options):
+        escenarios = []
+        for item in options["escenarios"].split(","):
+            perfil, _, resto = item.strip().partition(":")
+            edad, _, modo = resto.partition(":")
+            if perfil not in PERFILES:
+                raise CommandError(f"Perfil desconocido: {perfil}")
+            if modo not in ("", "coordinado"):
+                raise CommandError(f"Modo desconocido: {modo}")
+            escenarios.append((perfil, int(edad or 0), modo == "coordinado"))
+
+        resultados = comparar(
+            escenarios,
+            procesos=options["procesos"],
+            duracion=options["duracion"],
+            proporcion_escrituras=options["escrituras"],
+        )
+        for resumen in resultados:
+            modo = ", coordinado" if resumen["coordinado"] else ""
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{resumen['perfil']} (CONN_MAX_AGE={resumen['conn_max_age']}, {resumen['procesos']} procesos{modo})"
+            ))
+            for tipo in ("lectura", "escritura"):
+                r = resumen[tipo]
+                self.stdout.write(
+                    f"  {tipo:<10} {r['por_segundo']:>8}/s  p50={r['p50_ms']}ms  p95={r['p95_ms']}ms  "
+                    f"p99={r['p99_ms']}ms  max={r['max_ms']}ms  errores={r['errores']}"
+                )
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(resultados, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
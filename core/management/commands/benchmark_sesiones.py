@@ -0,0 +1,34 @@
+# core/management/commands/benchmark_sesiones.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark_sesiones import ESCENARIOS, comparar
+
+
+class Command(BaseCommand):
+    help = "Compara escrituras por request de la sesión (motor db vs caché con escritura diferida, con y sin umbral)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escenarios", help=f"Separados por comas; disponibles: {', '.join(ESCENARIOS)}.")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--salida", help="Guarda los resultados en JSON.")
+
+    def handle(self, *args, **options):
+        escenarios = options["escenarios"].split(",") if options["escenarios"] else None
+        for nombre in escenarios or ():
+            if nombre not in ESCENARIOS:
+                raise CommandError(f"Escenario desconocido: {nombre}")
+
+        resultados = comparar(escenarios, requests=options["requests"])
+        for r in resultados:
+            tablas = ", ".join(f"{tabla}={n}" for tabla, n in sorted(r["escrituras_en_request"].items())) or "-"
+            self.stdout.write(
+                f"{r['escenario']:<28} {r['escrituras_por_request']:>6} escrituras/request  "
+                f"cola={r['persistidas_por_cola']:<4} p50={r['p50_ms']}ms p95={r['p95_ms']}ms  [{tablas}]"
+            )
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(resultados, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
@@ -0,0 +1,30 @@
+# core/management/commands/limpiar_almacen.py
+
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+
+from core.storage import limpiar, recontar
+
+
+class Command(BaseCommand):
+    help = "Recuenta referencias del almacén por contenido y borra los archivos que nadie usa."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--storage", default="contenido", help="Alias en STORAGES.")
+        parser.add_argument(
+            "--antiguedad", type=int, default=3600,
+            help="Solo borra archivos sin referencias con más de N segundos.",
+        )
+        parser.add_argument("--recontar", action="store_true", help="Recalcula las referencias desde los modelos.")
+        parser.add_argument("--simular", action="store_true", help="Lista lo que se borraría sin borrar.")
+
+    def handle(self, *args, **options):
+        storage = storages[options["storage"]]
+        if options["recontar"]:
+            conteos = recontar(storage)
+            self.stdout.write(f"Referencias recalculadas: {len(conteos)} archivos en uso.")
+        borrados = limpiar(storage, antiguedad=options["antiguedad"], simular=options["simular"])
+        for nombre in borrados:
+            self.stdout.write(f"  {nombre}")
+        accion = "Se borrarían" if options["simular"] else "Borrados"
+        self.stdout.write(self.style.SUCCESS(f"{accion} {len(borrados)} archivos sin referencias."))
@@ -0,0 +1,44 @@
+# core/management/commands/respaldar_base.py
+
+from django.core.management.base import BaseCommand
+
+from core import respaldos
+from reportes.profiling import perfilar_trabajo
+
+
+class Command(BaseCommand):
+    help = "Respalda la base en línea (backup incremental de SQLite), comprimida, con suma SHA-256 y rotación."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--directorio", help="Por defecto RESPALDOS_DIR.")
+        parser.add_argument("--paginas", type=int, help="Páginas por paso (RESPALDOS_PAGINAS).")
+        parser.add_argument("--pausa", type=float, help="Segundos entre pasos (RESPALDOS_PAUSA).")
+        parser.add_argument("--retener", type=int, help="Respaldos a conservar (RESPALDOS_RETENIDOS).")
+        parser.add_argument(
+            "--si-mayor-a", type=int, default=0,
+            help="Solo respalda si el último respaldo tiene más de N segundos (para cron).",
+        )
+
+    def handle(self, *args, **options):
+        edad = respaldos.edad_ultimo(options["directorio"])
+        if edad is not None and edad < options["si_mayor_a"]:
+            self.stdout.write(f"El último respaldo tiene {edad:.0f}s; no se respalda.")
+            return
+
+        with perfilar_trabajo("respaldar_base"):
+            resultado = respaldos.respaldar(
+                alias=options["database"],
+                directorio=options["directorio"],
+                paginas=options["paginas"],
+                pausa=options["pausa"],
+                retener=options["retener"],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Respaldo en {resultado['archivo']} ({resultado['bytes_base'] / 1e6:.1f} MB -> "
+            f"{resultado['bytes_respaldo'] / 1e6:.1f} MB, {resultado['duracion_s']}s, "
+            f"{resultado['reinicios']} reinicios)"
+        ))
+        self.stdout.write(f"sha256 {resultado['sha256']}")
+        for archivo in resultado["rotados"]:
+            self.stdout.write(f"Rotado: {archivo}")
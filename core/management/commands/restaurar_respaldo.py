@@ -0,0 +1,60 @@
+# core/management/commands/restaurar_respaldo.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import respaldos
+from reportes.ejecutor import invalidar_todo
+
+
+class Command(BaseCommand):
+    help = "Verifica un respaldo (suma e integrity_check en solo lectura) y opcionalmente lo restaura."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", nargs="?", help="Por defecto, el respaldo más reciente.")
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--directorio", help="Por defecto RESPALDOS_DIR.")
+        parser.add_argument("--solo-verificar", action="store_true", help="Verifica sin restaurar.")
+        parser.add_argument(
+            "--sin-suma", action="store_true",
+            help="Acepta un respaldo sin archivo .sha256 (solo se comprueba la integridad).",
+        )
+        parser.add_argument(
+            "--noinput", "--no-input", action="store_false", dest="interactive",
+            help="No pide confirmación antes de restaurar.",
+        )
+
+    def handle(self, *args, **options):
+        archivo = options["archivo"]
+        if not archivo:
+            disponibles = respaldos.listar(options["directorio"])
+            if not disponibles:
+                raise CommandError("No hay respaldos.")
+            archivo = disponibles[0]
+
+        if options["solo_verificar"]:
+            resultado = respaldos.verificar(archivo, sin_suma=options["sin_suma"])
+        else:
+            if options["interactive"]:
+                respuesta = input(
+                    f"Se reemplazará la base '{options['database']}' con {archivo}. Escriba 'si' para continuar: "
+                )
+                if respuesta.strip().lower() not in ("si", "sí"):
+                    raise CommandError("Restauración cancelada.")
+            resultado = respaldos.restaurar(archivo, alias=options["database"], sin_suma=options["sin_suma"])
+            if resultado["ok"]:
+                # La base cambió por completo sin pasar por señales
+                invalidar_todo()
+
+        if resultado["sha256_ok"] is None and options["sin_suma"]:
+            self.stdout.write(self.style.WARNING("Sin archivo .sha256: no se comprobó la suma."))
+        if not resultado["ok"]:
+            if resultado["sha256_ok"] is None and not options["sin_suma"]:
+                detalle = "falta el archivo .sha256 (use --sin-suma para aceptarlo)"
+            elif resultado["sha256_ok"] is False:
+                detalle = "suma SHA-256 distinta"
+            else:
+                detalle = "; ".join(resultado["integridad"][:5])
+            raise CommandError(f"Respaldo inválido ({archivo}): {detalle}")
+
+        accion = "verificado" if options["solo_verificar"] else "verificado y restaurado"
+        self.stdout.write(self.style.SUCCESS(f"Respaldo {accion}: {archivo} ({resultado['tablas']} tablas)"))
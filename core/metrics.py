@@ -0,0 +1,265 @@
+# core/metrics.py
+"""
+Registro de métricas en memoria con exposición en formato de texto de
+Prometheus.
+
+Cada proceso (worker) mantiene su propio registro; el endpoint /metrics
+expone los valores del worker que atiende la petición, igual que el cliente
+oficial de Prometheus en modo sin multiproceso.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_labels(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    tipo = ""
+
+    def __init__(self, nombre, ayuda, labels=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.labels = tuple(labels)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.nombre} espera labels {self.labels}, recibió {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def encabezado(self):
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, cantidad=1, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **labels):
+        return self._valores.get(self._clave(labels), 0)
+
+    def exponer(self):
+        lineas = self.encabezado()
+        with self._lock:
+            for clave, valor in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_formatear_labels(self.labels, clave)} {_formatear_numero(valor)}")
+        return lineas
+
+
+class Medidor(Metrica):
+    """Gauge. Admite funciones de lectura para valores calculados al exponer."""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, labels=()):
+        super().__init__(nombre, ayuda, labels)
+        self._funciones = {}
+
+    def set(self, valor, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._valores[clave] = valor
+
+    def set_funcion(self, funcion, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._funciones[clave] = funcion
+
+    def exponer(self):
+        lineas = self.encabezado()
+        with self._lock:
+            valores = dict(self._valores)
+            funciones = dict(self._funciones)
+        for clave, funcion in funciones.items():
+            try:
+                valores[clave] = funcion()
+            except Exception:
+                continue
+        for clave, valor in sorted(valores.items()):
+            lineas.append(f"{self.nombre}{_formatear_labels(self.labels, clave)} {_formatear_numero(valor)}")
+        return lineas
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, labels=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **labels):
+        clave = self._clave(labels)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._valores.get(clave)
+            if serie is None:
+                serie = self._valores[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def conteo(self, **labels):
+        serie = self._valores.get(self._clave(labels))
+        return serie[2] if serie else 0
+
+    def exponer(self):
+        lineas = self.encabezado()
+        with self._lock:
+            series = {clave: (list(s[0]), s[1], s[2]) for clave, s in self._valores.items()}
+        for clave, (cuentas, suma, total) in sorted(series.items()):
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), cuentas):
+                acumulado += cuenta
+                le = f'le="{_formatear_numero(float(limite))}"'
+                lineas.append(f"{self.nombre}_bucket{_formatear_labels(self.labels, clave, le)} {acumulado}")
+            etiquetas = _formatear_labels(self.labels, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, clase, nombre, *args, **kwargs):
+        with self._lock:
+            if nombre not in self._metricas:
+                self._metricas[nombre] = clase(nombre, *args, **kwargs)
+            return self._metricas[nombre]
+
+    def contador(self, nombre, ayuda, labels=()):
+        return self._registrar(Contador, nombre, ayuda, labels)
+
+    def medidor(self, nombre, ayuda, labels=()):
+        return self._registrar(Medidor, nombre, ayuda, labels)
+
+    def histograma(self, nombre, ayuda, labels=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma, nombre, ayuda, labels, buckets=buckets)
+
+    def exponer(self):
+        lineas = []
+        for metrica in list(self._metricas.values()):
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+
+# --- MÉTRICAS DEL SISTEMA ---
+LATENCIA_REQUEST = REGISTRO.histograma(
+    "hospital_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por nombre de URL.",
+    labels=("url_name", "method", "status"),
+)
+CONSULTAS_REQUEST = REGISTRO.histograma(
+    "hospital_http_request_db_queries",
+    "Consultas SQL ejecutadas por petición.",
+    labels=("url_name",),
+    buckets=BUCKETS_CONSULTAS,
+)
+TIEMPO_DB_REQUEST = REGISTRO.histograma(
+    "hospital_http_request_db_seconds",
+    "Tiempo total en base de datos por petición.",
+    labels=("url_name",),
+)
+RENDER_PLANTILLA = REGISTRO.histograma(
+    "hospital_template_render_seconds",
+    "Tiempo de render de TemplateResponse por plantilla.",
+    labels=("template",),
+)
+OPERACIONES_CACHE = REGISTRO.contador(
+    "hospital_cache_requests_total",
+    "Lecturas de caché por resultado (hit/miss).",
+    labels=("cache", "resultado"),
+)
+DURACION_EXPORTACION = REGISTRO.histograma(
+    "hospital_export_duration_seconds",
+    "Duración de la generación de exportaciones.",
+    labels=("formato",),
+)
+PROFUNDIDAD_COLA = REGISTRO.medidor(
+    "hospital_background_queue_depth",
+    "Trabajos pendientes en colas de segundo plano.",
+    labels=("cola",),
+)
+LECTURAS_REPORTES = REGISTRO.contador(
+    "hospital_reporting_requests_total",
+    "Requests de reportes por base usada (copia de reportes o principal).",
+    labels=("base",),
+)
+EDAD_COPIA_REPORTES = REGISTRO.medidor(
+    "hospital_reporting_copy_age_seconds",
+    "Antigüedad de la copia de solo lectura de reportes.",
+)
+ESPERA_LOCK_ESCRITURA = REGISTRO.histograma(
+    "hospital_db_write_lock_wait_seconds",
+    "Espera para obtener el lock de escritura (BEGIN IMMEDIATE).",
+    labels=("operacion",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+REINTENTOS_ESCRITURA = REGISTRO.contador(
+    "hospital_db_write_retries_total",
+    "Reintentos de escritura por base bloqueada.",
+    labels=("operacion",),
+)
+FALLOS_BLOQUEO = REGISTRO.contador(
+    "hospital_db_lock_failures_total",
+    "Escrituras que fallaron por base bloqueada tras agotar los reintentos.",
+    labels=("operacion",),
+)
+RETRASO_COLA_ESCRITURAS = REGISTRO.histograma(
+    "hospital_write_queue_delay_seconds",
+    "Tiempo entre encolar una escritura diferida y confirmarla.",
+    labels=("operacion",),
+)
+ESCRITURAS_SESION = REGISTRO.contador(
+    "hospital_session_writes_total",
+    "Guardados de sesión: inmediatos en la base, diferidos y persistidos por la cola.",
+    labels=("tipo",),
+)
+USUARIOS_EN_LINEA = REGISTRO.medidor(
+    "hospital_online_users",
+    "Usuarios con latidos dentro de la ventana de presencia.",
+)
+
+
+def registrar_cache(nombre, acierto):
+    """Registra una lectura de caché para el ratio de aciertos."""
+    OPERACIONES_CACHE.inc(cache=nombre, resultado="hit" if acierto else "miss")
+
+
+@contextmanager
+def medir_exportacion(formato):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        DURACION_EXPORTACION.observe(time.perf_counter() - inicio, formato=formato)
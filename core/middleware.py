@@ -0,0 +1,71 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics
+
+
+class MedidorConsultas:
+    """execute_wrapper que acumula cantidad y tiempo de las consultas SQL."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.cantidad += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+class MetricasMiddleware:
+    """
+    Registra latencia, consultas SQL y tiempo de render de plantillas de cada
+    petición en el registro de `core.metrics`.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICAS_ACTIVAS", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        medidor = MedidorConsultas()
+        with ExitStack() as stack:
+            for conexion in connections.all():
+                stack.enter_context(conexion.execute_wrapper(medidor))
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match and match.view_name else "sin_ruta"
+        metrics.LATENCIA_REQUEST.observe(
+            time.perf_counter() - inicio,
+            url_name=url_name,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.CONSULTAS_REQUEST.observe(medidor.cantidad, url_name=url_name)
+        metrics.TIEMPO_DB_REQUEST.observe(medidor.segundos, url_name=url_name)
+        return response
+
+    def process_template_response(self, request, response):
+        # El render ocurre justo después de los process_template_response
+        inicio = time.perf_counter()
+        plantilla = response.template_name
+        if isinstance(plantilla, (list, tuple)):
+            plantilla = plantilla[0] if plantilla else ""
+        if not isinstance(plantilla, str):
+            plantilla = getattr(getattr(plantilla, "origin", None), "template_name", None) or "desconocida"
+
+        def registrar_render(rendered):
+            metrics.RENDER_PLANTILLA.observe(time.perf_counter() - inicio, template=plantilla)
+
+        response.add_post_render_callback(registrar_render)
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ObjetoAlmacenado",
+            fields=[
+                (
+                    "nombre",
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Nombre",
+                    ),
+                ),
+                (
+                    "tamano",
+                    models.PositiveBigIntegerField(verbose_name="Tamaño (bytes)"),
+                ),
+                (
+                    "referencias",
+                    models.PositiveIntegerField(default=0, verbose_name="Referencias"),
+                ),
+                (
+                    "fecha",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Fecha"),
+                ),
+            ],
+            options={
+                "verbose_name": "Objeto almacenado",
+                "verbose_name_plural": "Objetos almacenados",
+            },
+        ),
+    ]
@@ -3,6 +3,18 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 from django.core.exceptions import PermissionDenied
 
+
+def tiene_acceso_total(user):
+    """True para superusuarios y cargos con permission_code 'TOTAL_ACCESS'."""
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    profile = getattr(user, "profile", None)
+    position = getattr(profile, "position_FK", None) if profile else None
+    return bool(position and position.permission_code == 'TOTAL_ACCESS')
+
+
 class PermitsPositionMixin:
     """
     Mixin inteligente que verifica si el 'permission_code' del usuario 
@@ -0,0 +1,18 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ObjetoAlmacenado(models.Model):
+    """Archivo del almacén por contenido (core.storage) y cuántos campos lo usan."""
+
+    nombre = models.CharField(_("Nombre"), max_length=255, primary_key=True)
+    tamano = models.PositiveBigIntegerField(_("Tamaño (bytes)"))
+    referencias = models.PositiveIntegerField(_("Referencias"), default=0)
+    fecha = models.DateTimeField(_("Fecha"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Objeto almacenado")
+        verbose_name_plural = _("Objetos almacenados")
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} ref.)"
@@ -0,0 +1,153 @@
+# core/presencia.py
+"""
+Presencia de usuarios ("en línea") en la caché compartida.
+
+Cada request autenticado es un latido. Una clave por usuario y minuto
+creada con `cache.add` hace que cada usuario se registre a lo más una vez
+por minuto; el resto de los latidos cuesta una sola operación de caché. El
+registro toma un casillero del minuto con `cache.incr` sobre
+`presencia:<minuto>:n` y guarda ahí el id (`presencia:<minuto>:<casillero>`):
+dos workers nunca escriben el mismo casillero, así que no se pierden
+latidos. "Quién está en línea" son los casilleros de los últimos
+PRESENCIA_VENTANA_MINUTOS minutos (dos `get_many`), sin consultar la base.
+
+Para el historial, el primer latido de cada minuto vuelca a
+`Profile.last_activity` todos los minutos anteriores que siguen en la caché
+con `diferir` (en la cola de escrituras si ESCRITURAS_DIFERIDAS está
+activo): unos pocos UPDATE por minuto para todos los usuarios, en lugar de
+uno por request. `volcar` es idempotente, así que repetir un minuto no
+cuesta más que la consulta.
+
+Todo esto necesita una caché compartida con incr/add atómicos (Redis o
+Memcached, ver `core.checks`). Con otra, la presencia sigue en la base como
+antes: cada proceso actualiza `last_activity` a lo más una vez por minuto y
+por usuario, y `en_linea` la consulta.
+"""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.checks import cache_compartida
+from core.escrituras import diferir
+from core.metrics import USUARIOS_EN_LINEA
+
+PREFIJO = "presencia"
+REINTENTOS = 3
+
+
+def _ventana():
+    return getattr(settings, "PRESENCIA_VENTANA_MINUTOS", 2)
+
+
+def _ttl():
+    return (_ventana() + 2) * 60
+
+
+def en_cache():
+    return cache_compartida(atomica=True)
+
+
+def minuto_actual():
+    return int(time.time() // 60)
+
+
+def _momento(minuto):
+    return datetime.fromtimestamp(minuto * 60, tz=dt_timezone.utc)
+
+
+def clave_contador(minuto):
+    return f"{PREFIJO}:{minuto}:n"
+
+
+def clave_casillero(minuto, casillero):
+    return f"{PREFIJO}:{minuto}:{casillero}"
+
+
+def _agregar(minuto, usuario_id):
+    contador = clave_contador(minuto)
+    for _ in range(REINTENTOS):
+        cache.add(contador, 0, _ttl())
+        try:
+            casillero = cache.incr(contador)
+        except ValueError:
+            # El contador venció entre add e incr
+            continue
+        if cache.add(clave_casillero(minuto, casillero), usuario_id, _ttl()):
+            return
+
+
+def latido(usuario_id, minuto=None):
+    """Registra actividad del usuario en el minuto actual."""
+    minuto = minuto_actual() if minuto is None else minuto
+    if not cache.add(f"{PREFIJO}:visto:{minuto}:{usuario_id}", 1, _ttl()):
+        return
+    if not en_cache():
+        diferir(_registrar_en_base, usuario_id, minuto, operacion="presencia")
+        return
+    _agregar(minuto, usuario_id)
+    if cache.add(f"{PREFIJO}:volcado:{minuto}", 1, _ttl()):
+        # Todos los minutos anteriores que siguen en la caché: si en el minuto
+        # siguiente a la última actividad nadie tuvo latidos, igual se vuelcan
+        diferir(volcar_pendientes, minuto, operacion="presencia")
+
+
+def usuarios(minutos):
+    """Ids con latidos en cualquiera de `minutos`, como {id: último minuto}."""
+    minutos = list(minutos)
+    contadores = cache.get_many([clave_contador(m) for m in minutos])
+    casilleros = {
+        clave_casillero(m, c): m
+        for m in minutos
+        for c in range(1, contadores.get(clave_contador(m), 0) + 1)
+    }
+    vistos = {}
+    for clave, usuario_id in cache.get_many(list(casilleros)).items():
+        vistos[usuario_id] = max(vistos.get(usuario_id, casilleros[clave]), casilleros[clave])
+    return vistos
+
+
+def en_linea(ventana=None, minuto=None):
+    """Ids de los usuarios con latidos en los últimos `ventana` minutos."""
+    minuto = minuto_actual() if minuto is None else minuto
+    ventana = _ventana() if ventana is None else ventana
+    if not en_cache():
+        from UsuarioApp.models import Profile
+
+        desde = _momento(minuto - ventana)
+        return set(Profile.objects.filter(last_activity__gte=desde).values_list("user_FK_id", flat=True))
+    return set(usuarios(range(minuto - ventana, minuto + 1)))
+
+
+def _actualizar(usuarios_, minuto):
+    from UsuarioApp.models import Profile
+
+    momento = _momento(minuto)
+    return (
+        Profile.objects.filter(user_FK_id__in=usuarios_)
+        .exclude(last_activity__gte=momento)
+        .update(last_activity=momento)
+    )
+
+
+def _registrar_en_base(usuario_id, minuto):
+    return _actualizar([usuario_id], minuto)
+
+
+def volcar(minuto):
+    """Guarda en Profile.last_activity el minuto en que se vio a cada usuario. Devuelve filas."""
+    vistos = usuarios([minuto])
+    return _actualizar(list(vistos), minuto) if vistos else 0
+
+
+def volcar_pendientes(minuto):
+    """Vuelca los minutos anteriores a `minuto` que siguen en la caché: un UPDATE por minuto con usuarios."""
+    por_minuto = {}
+    for usuario_id, visto in usuarios(range(minuto - _ventana() - 1, minuto)).items():
+        por_minuto.setdefault(visto, []).append(usuario_id)
+    return sum(_actualizar(usuarios_, visto) for visto, usuarios_ in sorted(por_minuto.items()))
+
+
+USUARIOS_EN_LINEA.set_funcion(lambda: len(en_linea()))
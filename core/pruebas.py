@@ -0,0 +1,64 @@
+# core/pruebas.py
+"""
+Utilidades compartidas por los tests de las apps.
+
+`DatosSinteticosMixin` reúne la preparación que repetían las clases de
+reportes y clínica: el generador sintético una vez por clase, una caché
+local limpia por test y un superusuario con sesión iniciada.
+"""
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+HASTA = "2024-06-30"
+
+
+def generar_datos(madres, anios, semilla, hasta=HASTA):
+    """Ejecuta `generar_datos_sinteticos` sin salida por consola."""
+    call_command(
+        "generar_datos_sinteticos", "--madres", str(madres), "--anios", str(anios),
+        "--semilla", str(semilla), "--hasta", hasta, stdout=StringIO(),
+    )
+
+
+class DatosSinteticosMixin:
+    """
+    Mixin para TestCase. La clase define:
+
+    - `datos`: argumentos de `generar_datos` (None para no generar).
+    - `cache_local`: caché locmem propia de la clase, vaciada antes de cada test.
+    - `nombre_usuario`: crea `cls.usuario` como superusuario e inicia su sesión.
+    """
+
+    datos = {"madres": 80, "anios": 2, "semilla": 3}
+    cache_local = False
+    nombre_usuario = None
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.cache_local:
+            cls.enterClassContext(override_settings(CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": cls.__name__}
+            }))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        if cls.datos:
+            generar_datos(**cls.datos)
+        if cls.nombre_usuario:
+            cls.usuario = get_user_model().objects.create_superuser(
+                username=cls.nombre_usuario, password="segura123"
+            )
+
+    def setUp(self):
+        super().setUp()
+        if self.cache_local:
+            cache.clear()
+        if self.nombre_usuario:
+            self.client.force_login(self.usuario)
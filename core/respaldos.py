@@ -0,0 +1,246 @@
+# core/respaldos.py
+"""
+Respaldos en línea de la base SQLite.
+
+`respaldar()` copia la base con la API de backup incremental de SQLite: de a
+RESPALDOS_PAGINAS páginas por paso y con una pausa entre pasos, así un
+guardado clínico nunca espera más que un paso. Si otra conexión escribe
+durante la copia, SQLite reinicia el backup; el resultado es siempre una
+foto consistente de un instante (el del último reinicio).
+
+Cada respaldo queda en RESPALDOS_DIR como `hospital-<fecha>.sqlite3.gz` con
+un `.sha256` al lado (formato de `sha256sum -c`). Se conservan los últimos
+RESPALDOS_RETENIDOS.
+
+`verificar()` comprueba la suma (un respaldo sin `.sha256` no pasa, salvo con
+`sin_suma=True`), descomprime en un temporal, lo abre en solo lectura y corre
+`PRAGMA integrity_check`. `restaurar()` verifica y luego
+escribe el respaldo sobre la base con la misma API de backup, que respeta los
+locks (y el WAL) de las conexiones abiertas.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PREFIJO = "hospital-"
+EXTENSION = ".sqlite3.gz"
+BLOQUE = 1024 * 1024
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def directorio_respaldos(directorio=None):
+    return str(directorio or _config("RESPALDOS_DIR", os.path.join(settings.BASE_DIR, "respaldos")))
+
+
+def archivo_base(alias=DEFAULT_DB_ALIAS):
+    return str(settings.DATABASES[alias]["NAME"])
+
+
+# --- COPIA EN LÍNEA ---
+
+def copiar_en_linea(origen, destino, paginas=1024, pausa=0.005):
+    """
+    Copia el archivo SQLite `origen` a `destino` con la API de backup,
+    `paginas` por paso y `pausa` segundos entre pasos. La copia queda en
+    journal_mode=DELETE (un archivo autocontenido). Devuelve la cantidad de
+    reinicios provocados por escrituras concurrentes.
+    """
+    reinicios = 0
+    restantes_previas = None
+
+    def progreso(estado, restantes, total):
+        nonlocal reinicios, restantes_previas
+        if restantes_previas is not None and restantes > restantes_previas:
+            reinicios += 1
+        restantes_previas = restantes
+        # `sleep` de Connection.backup solo se aplica si el paso devolvió
+        # BUSY/LOCKED: la pausa entre pasos hay que hacerla aquí
+        if restantes > 0 and pausa:
+            time.sleep(pausa)
+
+    fuente = sqlite3.connect(origen, uri=True)
+    try:
+        copia = sqlite3.connect(destino)
+        try:
+            fuente.backup(copia, pages=paginas, progress=progreso, sleep=pausa)
+            copia.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            copia.close()
+    finally:
+        fuente.close()
+    return reinicios
+
+
+def sha256_de(archivo):
+    digest = hashlib.sha256()
+    with open(archivo, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _archivo_suma(archivo):
+    return f"{archivo}.sha256"
+
+
+def listar(directorio=None):
+    """Respaldos del directorio, del más reciente al más antiguo."""
+    directorio = directorio_respaldos(directorio)
+    if not os.path.isdir(directorio):
+        return []
+    nombres = [n for n in os.listdir(directorio) if n.startswith(PREFIJO) and n.endswith(EXTENSION)]
+    return [os.path.join(directorio, n) for n in sorted(nombres, reverse=True)]
+
+
+def edad_ultimo(directorio=None):
+    """Segundos desde el último respaldo, o None si no hay."""
+    respaldos = listar(directorio)
+    if not respaldos:
+        return None
+    return max(time.time() - os.stat(respaldos[0]).st_mtime, 0.0)
+
+
+def rotar(directorio=None, retener=None):
+    """Borra los respaldos más antiguos que los `retener` más recientes."""
+    retener = retener if retener is not None else _config("RESPALDOS_RETENIDOS", 14)
+    borrados = []
+    for archivo in listar(directorio)[max(retener, 1):]:
+        for ruta in (archivo, _archivo_suma(archivo)):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        borrados.append(archivo)
+    return borrados
+
+
+# --- RESPALDO ---
+
+def respaldar(alias=DEFAULT_DB_ALIAS, directorio=None, paginas=None, pausa=None, retener=None):
+    """
+    Respalda la base `alias` en el directorio de respaldos, comprimida y con
+    su suma SHA-256, y aplica la rotación. Devuelve un dict con archivo,
+    sha256, tamaños, reinicios y duración.
+    """
+    directorio = directorio_respaldos(directorio)
+    os.makedirs(directorio, exist_ok=True)
+    paginas = paginas or _config("RESPALDOS_PAGINAS", 256)
+    pausa = _config("RESPALDOS_PAUSA", 0.01) if pausa is None else pausa
+
+    inicio = time.time()
+    nombre = f"{PREFIJO}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{EXTENSION}"
+    archivo = os.path.join(directorio, nombre)
+    temporal = os.path.join(directorio, f".{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        reinicios = copiar_en_linea(archivo_base(alias), temporal, paginas, pausa)
+        tamano_base = os.path.getsize(temporal)
+        with open(temporal, "rb") as crudo, gzip.open(f"{temporal}.gz", "wb", compresslevel=6) as comprimido:
+            shutil.copyfileobj(crudo, comprimido, BLOQUE)
+        suma = sha256_de(f"{temporal}.gz")
+        # La suma se publica primero: un .gz visible siempre tiene su .sha256
+        with open(_archivo_suma(archivo), "w", encoding="ascii") as f:
+            f.write(f"{suma}  {nombre}\n")
+        os.replace(f"{temporal}.gz", archivo)
+    finally:
+        for ruta in (temporal, f"{temporal}.gz"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    return {
+        "archivo": archivo,
+        "sha256": suma,
+        "bytes_base": tamano_base,
+        "bytes_respaldo": os.path.getsize(archivo),
+        "reinicios": reinicios,
+        "duracion_s": round(time.time() - inicio, 2),
+        "rotados": rotar(directorio, retener),
+    }
+
+
+# --- VERIFICACIÓN Y RESTAURACIÓN ---
+
+def _descomprimir(archivo, directorio):
+    fd, destino = tempfile.mkstemp(suffix=".sqlite3", dir=directorio)
+    with os.fdopen(fd, "wb") as salida, gzip.open(archivo, "rb") as entrada:
+        shutil.copyfileobj(entrada, salida, BLOQUE)
+    return destino
+
+
+def _comprobar(descomprimido):
+    uri = f"file:{descomprimido}?mode=ro"
+    conexion = sqlite3.connect(uri, uri=True)
+    try:
+        integridad = [fila[0] for fila in conexion.execute("PRAGMA integrity_check")]
+        tablas = conexion.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+    finally:
+        conexion.close()
+    return integridad, tablas
+
+
+def verificar(archivo, conservar=False, sin_suma=False):
+    """
+    Verifica suma e integridad de un respaldo. Devuelve un dict con `ok`,
+    `sha256_ok` (None si no hay `.sha256`), `integridad` (lista de mensajes;
+    ["ok"] si está sano) y `tablas`. Sin `.sha256` el respaldo no es válido,
+    salvo con `sin_suma`. Con `conservar` incluye en `descomprimido` la ruta
+    del archivo ya verificado (queda a cargo de quien llama).
+    """
+    resultado = {"archivo": archivo, "sha256_ok": None, "integridad": [], "tablas": 0}
+    suma_archivo = _archivo_suma(archivo)
+    if os.path.exists(suma_archivo):
+        with open(suma_archivo, encoding="ascii") as f:
+            esperada = f.read().split()[0]
+        resultado["sha256_ok"] = sha256_de(archivo) == esperada
+
+    descomprimido = None
+    if resultado["sha256_ok"] is not False:
+        try:
+            descomprimido = _descomprimir(archivo, os.path.dirname(os.path.abspath(archivo)))
+            resultado["integridad"], resultado["tablas"] = _comprobar(descomprimido)
+        except (OSError, EOFError, sqlite3.DatabaseError) as error:
+            resultado["integridad"] = [str(error)]
+
+    suma_ok = resultado["sha256_ok"] or (resultado["sha256_ok"] is None and sin_suma)
+    resultado["ok"] = bool(suma_ok) and resultado["integridad"] == ["ok"]
+    if conservar and resultado["ok"]:
+        resultado["descomprimido"] = descomprimido
+    elif descomprimido and os.path.exists(descomprimido):
+        os.remove(descomprimido)
+    return resultado
+
+
+def restaurar(archivo, alias=DEFAULT_DB_ALIAS, sin_suma=False):
+    """
+    Verifica `archivo` y, si está sano, lo copia sobre la base `alias`.
+    Devuelve el resultado de la verificación; no toca la base si falla.
+    """
+    resultado = verificar(archivo, conservar=True, sin_suma=sin_suma)
+    if not resultado["ok"]:
+        return resultado
+
+    descomprimido = resultado.pop("descomprimido")
+    try:
+        connections[alias].close()
+        fuente = sqlite3.connect(f"file:{descomprimido}?mode=ro", uri=True)
+        try:
+            destino = sqlite3.connect(archivo_base(alias), timeout=30)
+            try:
+                fuente.backup(destino)
+            finally:
+                destino.close()
+        finally:
+            fuente.close()
+    finally:
+        os.remove(descomprimido)
+    return resultado
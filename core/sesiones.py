@@ -0,0 +1,79 @@
+# core/sesiones.py
+"""
+Sesiones: política de renovación y motor con escritura diferida.
+
+`renovar_expiracion()` reemplaza al `set_expiry()` por request: la expiración
+solo se extiende cuando a la sesión le quedan menos de
+SESION_UMBRAL_RENOVACION segundos, así que un usuario activo genera una
+escritura de sesión cada (SESSION_COOKIE_AGE - umbral) segundos y no una por
+página o llamada AJAX.
+
+SESSION_ENGINE = "core.sesiones" es `cached_db` con escritura diferida: las
+lecturas salen de la caché (y de la base si no está), la creación y el
+borrado van a la base en el momento, y las actualizaciones se guardan en la
+caché y se persisten desde la cola de escrituras (`core.escrituras.COLA`),
+una por sesión aunque se acumulen varias. Necesita una caché compartida
+entre workers (CACHE_URL con Redis o Memcached): con locmem otro worker
+leería de la base una versión con hasta unos milisegundos de atraso.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+
+from core.escrituras import COLA
+from core.metrics import ESCRITURAS_SESION
+
+CLAVE_RENOVACION = "_renovada"
+
+_pendientes = {}
+_lock = threading.Lock()
+
+
+def renovar_expiracion(session, edad=None, umbral=None):
+    """Extiende la expiración solo si quedan menos de `umbral` segundos. True si renovó."""
+    edad = edad or settings.SESSION_COOKIE_AGE
+    umbral = getattr(settings, "SESION_UMBRAL_RENOVACION", edad) if umbral is None else umbral
+    ahora = time.time()
+    renovada = session.get(CLAVE_RENOVACION)
+    if renovada is not None and edad - (ahora - renovada) > umbral:
+        return False
+    session.set_expiry(edad)
+    session[CLAVE_RENOVACION] = int(ahora)
+    return True
+
+
+def _persistir(session_key):
+    with _lock:
+        pendiente = _pendientes.pop(session_key, None)
+    if pendiente is None:
+        return
+    session_data, expire_date = pendiente
+    # UPDATE y no save(): una sesión borrada mientras esperaba no debe revivir
+    Session.objects.filter(session_key=session_key).update(session_data=session_data, expire_date=expire_date)
+    ESCRITURAS_SESION.inc(tipo="persistida")
+
+
+class SessionStore(CachedDBStore):
+    def save(self, must_create=False):
+        if must_create or self.session_key is None:
+            ESCRITURAS_SESION.inc(tipo="inmediata")
+            return super().save(must_create=must_create)
+
+        datos = self._get_session()
+        self._cache.set(self.cache_key, datos, self.get_expiry_age())
+        instancia = self.create_model_instance(datos)
+        with _lock:
+            encolar = self.session_key not in _pendientes
+            _pendientes[self.session_key] = (instancia.session_data, instancia.expire_date)
+        if encolar:
+            COLA.encolar(_persistir, (self.session_key,), operacion="sesion")
+        ESCRITURAS_SESION.inc(tipo="diferida")
+
+    def delete(self, session_key=None):
+        with _lock:
+            _pendientes.pop(session_key or self.session_key, None)
+        super().delete(session_key)
@@ -31,6 +31,7 @@ DEFAULT_DJANGO_APPS = [
 ]
 
 LOCAL_APPS = [
+    "core",
     "homeApp",
     "UsuarioApp",
     "clinica",
@@ -65,6 +66,8 @@ CRISPY_TEMPLATE_PACK = "tailwind"
 
 
 MIDDLEWARE = [
+    "core.middleware.MetricasMiddleware",
+    "core.slow_queries.ConsultasLentasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,6 +79,7 @@ MIDDLEWARE = [
     "preventconcurrentlogins.middleware.PreventConcurrentLoginsMiddleware",
     "axes.middleware.AxesMiddleware",
     "homeApp.middleware.UpdateLastActivityMiddleware",
+    "reportes.profiling.ProfilingMiddleware",
 ]
 
 
@@ -119,13 +123,55 @@ SITE_ID = 1
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Copia de solo lectura para reportes (core.db_router). Se refresca con
+# `python manage.py refrescar_base_reportes`; si tiene más de MAX_DESFASE
+# segundos (o no existe) los reportes leen de la principal. 0 lo desactiva.
+REPORTES_DB_ARCHIVO = env.str("REPORTES_DB_ARCHIVO", default=os.path.join(BASE_DIR, "reporting.sqlite3"))
+REPORTES_DB_MAX_DESFASE = env.int("REPORTES_DB_MAX_DESFASE", default=300)
+REPORTES_DB_APPS = ("clinica",)
+
+# Perfil de SQLite (core.db_profile): "produccion" (WAL, synchronous=NORMAL,
+# mmap, busy_timeout) o "basico" (valores por defecto de SQLite).
+SQLITE_PERFIL = env.str("SQLITE_PERFIL", default="produccion")
+SQLITE_PERFILES_POR_ALIAS = {"default": SQLITE_PERFIL, "reporting": "lectura"}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+        # Conexiones persistentes por worker, verificadas antes de reutilizarse
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=600),
+        "CONN_HEALTH_CHECKS": True,
+    },
+    "reporting": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{Path(REPORTES_DB_ARCHIVO).as_posix()}?mode=ro",
+        # Sin persistencia: una conexión abierta seguiría viendo la copia
+        # reemplazada por el último refresco
+        "CONN_MAX_AGE": 0,
+        # En los tests la copia es la misma base de prueba
+        "TEST": {"MIRROR": "default"},
+    },
 }
 
+DATABASE_ROUTERS = ["core.db_router.ReportesRouter"]
+
+# Coordinación de escrituras (core.escrituras): los guardados de las vistas
+# clínicas abren con BEGIN IMMEDIATE y reintentan con backoff si la base está
+# bloqueada. Con ESCRITURAS_DIFERIDAS, auditoría, última actividad y
+# retención de perfiles pasan a un hilo escritor por proceso.
+ESCRITURAS_REINTENTOS = env.int("ESCRITURAS_REINTENTOS", default=5)
+ESCRITURAS_ESPERA_BASE = env.float("ESCRITURAS_ESPERA_BASE", default=0.05)
+ESCRITURAS_ESPERA_MAX = env.float("ESCRITURAS_ESPERA_MAX", default=1.0)
+ESCRITURAS_DIFERIDAS = env.bool("ESCRITURAS_DIFERIDAS", default=False)
+
+# Respaldos en línea (core.respaldos, comandos respaldar_base y
+# restaurar_respaldo): páginas por paso y pausa entre pasos del backup.
+RESPALDOS_DIR = env.str("RESPALDOS_DIR", default=os.path.join(BASE_DIR, "respaldos"))
+RESPALDOS_RETENIDOS = env.int("RESPALDOS_RETENIDOS", default=14)
+RESPALDOS_PAGINAS = env.int("RESPALDOS_PAGINAS", default=256)
+RESPALDOS_PAUSA = env.float("RESPALDOS_PAUSA", default=0.01)
+
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.Argon2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
@@ -179,6 +225,20 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# "contenido": almacén por hash SHA-256 con conteo de referencias
+# (core.storage) para archivos subidos por usuarios; se sirven desde
+# MEDIA_URL/cas/ con Cache-Control inmutable y ETag.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "contenido": {"BACKEND": "core.storage.AlmacenContenido"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+ARCHIVOS_INMUTABLES_MAX_AGE = env.int("ARCHIVOS_INMUTABLES_MAX_AGE", default=365 * 24 * 3600)
+
+# Variantes de fotos de perfil (UsuarioApp.avatares): hilos del pool que las
+# genera fuera del request; 0 las genera en línea al confirmar el guardado.
+AVATARES_HILOS = env.int("AVATARES_HILOS", default=2)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -204,6 +264,16 @@ ACCOUNT_LOGOUT_ON_GET = True
 
 SESSION_COOKIE_AGE = 1800  # 20 minutes in seconds
 
+# Renovación de sesión (core.sesiones): se extiende solo cuando quedan menos de
+# UMBRAL segundos, es decir, a lo más una escritura cada 5 minutos por usuario.
+SESION_UMBRAL_RENOVACION = env.int("SESION_UMBRAL_RENOVACION", default=SESSION_COOKIE_AGE - 300)
+# "core.sesiones": sesiones en caché con escritura diferida (requiere CACHE_URL compartida)
+SESSION_ENGINE = env.str("SESSION_ENGINE", default="django.contrib.sessions.backends.db")
+# Presencia (core.presencia): minutos sin latidos tras los que un usuario deja
+# de figurar en línea. Profile.last_activity se vuelca una vez por minuto
+# (requiere CACHE_URL con Redis o Memcached; si no, se usa la base).
+PRESENCIA_VENTANA_MINUTOS = env.int("PRESENCIA_VENTANA_MINUTOS", default=2)
+
 LOGIN_URL = "account_login"
 
 # -----------------------------------------------
@@ -227,6 +297,62 @@ AXES_RESET_ON_SUCCESS = True  # restablecerá el número de inicios de sesión f
 AXES_ENABLE_ACCESS_FAILURE_LOG = True
 AXES_LOCK_OUT_AT_FAILURE = True  # bloquea al usuario
 
+# ------------------------------------------
+# Métricas de rendimiento expuestas en /metrics (solo ACCESO TOTAL)
+METRICAS_ACTIVAS = env.bool("METRICAS_ACTIVAS", default=True)
+
+# Perfilado cProfile (reportes.profiling). Fracción de peticiones/trabajos
+# perfilados; ACCESO TOTAL puede forzarlo con la cabecera "X-Profile: 1".
+PROFILING_TASA_MUESTREO = env.float("PROFILING_TASA_MUESTREO", default=0.0)
+PROFILING_TASA_TRABAJOS = env.float("PROFILING_TASA_TRABAJOS", default=0.0)
+PROFILING_APPS = ["clinica", "reportes", "homeApp"]
+PROFILING_MAX_PERFILES = env.int("PROFILING_MAX_PERFILES", default=200)
+PROFILING_RETENCION_DIAS = env.int("PROFILING_RETENCION_DIAS", default=7)
+PROFILING_TOP_N = 40
+
+# Caché (parciales mensuales de reportes, entre otros). En producción con
+# varios workers conviene una caché compartida, p.ej. CACHE_URL=filecache:///var/tmp/hospital
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Procesos del ejecutor de reportes por mes (reportes.ejecutor); 1 = sin pool
+REPORTES_EJECUTOR_PROCESOS = env.int("REPORTES_EJECUTOR_PROCESOS", default=os.cpu_count() or 1)
+# Vigencia (segundos) de cada parcial mensual: respaldo para las escrituras que
+# no pasan por señales ni por reportes.ejecutor.invalidar_todo (p.ej. .update())
+REPORTES_PARCIAL_TIMEOUT = env.int("REPORTES_PARCIAL_TIMEOUT", default=86400)
+
+# Snapshot columnar para analítica (reportes.snapshot, comando construir_snapshot).
+# Los reportes lo usan mientras tenga menos de MAX_EDAD segundos; 0 lo desactiva.
+REPORTES_SNAPSHOT_DIR = env.str("REPORTES_SNAPSHOT_DIR", default=os.path.join(BASE_DIR, "snapshots"))
+REPORTES_SNAPSHOT_MAX_EDAD = env.int("REPORTES_SNAPSHOT_MAX_EDAD", default=900)
+
+# Exportadores de reportes (reportes.exportadores): sus librerías se importan en
+# la primera exportación. PRECARGA=1 las importa al arrancar (p.ej. en el
+# proceso maestro de gunicorn con --preload, para compartirlas entre workers).
+REPORTES_EXPORTADORES_PRECARGA = env.bool("REPORTES_EXPORTADORES_PRECARGA", default=False)
+
+# Brazaletes y etiquetas de RN (clinica.brazaletes): códigos QR guardados en
+# memoria por proceso (LRU) y, sobre UMBRAL códigos nuevos, generados en un
+# pool de PROCESOS procesos; 1 = siempre en el proceso actual.
+BRAZALETES_CACHE_QR = env.int("BRAZALETES_CACHE_QR", default=2048)
+BRAZALETES_PROCESOS = env.int("BRAZALETES_PROCESOS", default=min(os.cpu_count() or 1, 4))
+BRAZALETES_UMBRAL_PROCESOS = env.int("BRAZALETES_UMBRAL_PROCESOS", default=200)
+# Límites de la vista web (la hoja se genera en el request): turno de a lo más
+# MAX_HORAS y MAX_RN recién nacidos; lotes mayores con imprimir_brazaletes.
+BRAZALETES_MAX_HORAS = env.int("BRAZALETES_MAX_HORAS", default=24)
+BRAZALETES_MAX_RN = env.int("BRAZALETES_MAX_RN", default=300)
+
+# Epicrisis en PDF por alta (clinica.epicrisis): hilos que las generan al
+# confirmarse el guardado; 0 las genera en línea tras el commit.
+EPICRISIS_HILOS = env.int("EPICRISIS_HILOS", default=2)
+
+# Registro de consultas lentas (core.slow_queries). 0 lo desactiva.
+CONSULTAS_LENTAS_UMBRAL_MS = env.float("CONSULTAS_LENTAS_UMBRAL_MS", default=200)
+CONSULTAS_LENTAS_ARCHIVO = env.str(
+    "CONSULTAS_LENTAS_ARCHIVO", default=os.path.join(BASE_DIR, "logs", "consultas_lentas.log")
+)
+CONSULTAS_LENTAS_MAX_BYTES = 5 * 1024 * 1024
+CONSULTAS_LENTAS_RESPALDOS = 5
+
 # ------------------------------------------
 if not DEBUG:
     LOGGING = {
@@ -0,0 +1,211 @@
+# core/slow_queries.py
+"""
+Registro de consultas SQL lentas.
+
+Un `execute_wrapper` mide cada consulta; las que superan
+CONSULTAS_LENTAS_UMBRAL_MS se escriben (una línea JSON por ocurrencia) en un
+archivo rotativo junto con su huella normalizada, el plan de ejecución
+(EXPLAIN QUERY PLAN en SQLite), la vista de origen y un resumen del stack.
+Los planes con recorridos completos de tabla (SCAN) quedan marcados.
+
+`python manage.py consultas_lentas` agrega el archivo por huella.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from core import metrics
+
+logger = logging.getLogger("hospital.consultas_lentas")
+
+CONSULTAS_LENTAS = metrics.REGISTRO.contador(
+    "hospital_slow_queries_total",
+    "Consultas SQL sobre el umbral de lentitud.",
+    labels=("origen",),
+)
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"%s|\?")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+_estado = threading.local()
+_planes = {}
+_agregados = {}
+_lock = threading.Lock()
+
+
+def normalizar_sql(sql):
+    """Reemplaza literales y parámetros por `?` y colapsa listas IN (...)."""
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_PARAM.sub("?", sql)
+    sql = _RE_LISTA.sub("(...)", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+def huella(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode("utf-8")).hexdigest()[:12]
+
+
+def resumen_stack(limite=6):
+    """Frames del proyecto (sin librerías ni este módulo), del más interno al externo."""
+    base = str(settings.BASE_DIR)
+    frames = [
+        f"{os.path.relpath(f.filename, base)}:{f.lineno} {f.name}"
+        for f in traceback.extract_stack()
+        if f.filename.startswith(base)
+        and "site-packages" not in f.filename
+        and f.filename != __file__
+    ]
+    return frames[-limite:][::-1]
+
+
+def _obtener_logger():
+    archivo = os.path.abspath(settings.CONSULTAS_LENTAS_ARCHIVO)
+    for handler in list(logger.handlers):
+        if handler.baseFilename != archivo:
+            logger.removeHandler(handler)
+            handler.close()
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        handler = RotatingFileHandler(
+            archivo,
+            maxBytes=settings.CONSULTAS_LENTAS_MAX_BYTES,
+            backupCount=settings.CONSULTAS_LENTAS_RESPALDOS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def explicar(connection, sql, params):
+    """Plan de ejecución de un SELECT (lista de líneas) o None si no aplica."""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    prefijo = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    _estado.explicando = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefijo + sql, params)
+            filas = cursor.fetchall()
+        if connection.vendor == "sqlite":
+            return [fila[-1] for fila in filas]
+        return [" ".join(str(c) for c in fila) for fila in filas]
+    except Exception as exc:
+        return [f"EXPLAIN falló: {exc}"]
+    finally:
+        _estado.explicando = False
+
+
+def usa_scan_completo(plan):
+    """
+    True si algún paso del plan recorre una tabla o un índice completo.
+
+    Un SCAN "USING COVERING INDEX" también cuenta: es lo que produce
+    `fecha_hora__date__range`, que envuelve la columna en una función y
+    obliga a leer el índice entero en vez de buscar un rango (SEARCH).
+    """
+    return any(
+        linea.strip().startswith("SCAN") and "CONSTANT ROW" not in linea
+        for linea in plan or []
+    )
+
+
+def registrar(connection, sql, params, duracion_ms, origen):
+    normalizado = normalizar_sql(sql)
+    clave = huella(normalizado)
+
+    with _lock:
+        plan_conocido = clave in _planes
+    if not plan_conocido:
+        plan = explicar(connection, sql, params)
+        with _lock:
+            _planes[clave] = plan
+    plan = _planes[clave]
+
+    with _lock:
+        veces, total, maximo = _agregados.get(clave, (0, 0.0, 0.0))
+        _agregados[clave] = agregado = (veces + 1, total + duracion_ms, max(maximo, duracion_ms))
+
+    CONSULTAS_LENTAS.inc(origen=origen)
+    _obtener_logger().info(json.dumps({
+        "fecha": timezone.now().isoformat(),
+        "huella": clave,
+        "ms": round(duracion_ms, 2),
+        "origen": origen,
+        "sql": normalizado,
+        "plan": plan,
+        "scan_completo": usa_scan_completo(plan),
+        "stack": resumen_stack(),
+        "veces": agregado[0],
+        "total_ms": round(agregado[1], 2),
+        "max_ms": round(agregado[2], 2),
+    }, ensure_ascii=False))
+
+
+class CapturaConsultasLentas:
+    """execute_wrapper que registra las consultas más lentas que el umbral."""
+
+    def __init__(self, umbral_ms, origen):
+        self.umbral_ms = umbral_ms
+        self.origen = origen
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_estado, "explicando", False):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            if duracion_ms >= self.umbral_ms and not many:
+                origen = self.origen() if callable(self.origen) else self.origen
+                try:
+                    registrar(context["connection"], sql, params, duracion_ms, origen)
+                except Exception:
+                    # El registro nunca debe romper la petición clínica
+                    logging.getLogger(__name__).exception("No se pudo registrar la consulta lenta")
+
+
+@contextmanager
+def capturar_consultas_lentas(origen, umbral_ms=None):
+    """Activa el registro en todas las conexiones (comandos y trabajos)."""
+    umbral_ms = umbral_ms or settings.CONSULTAS_LENTAS_UMBRAL_MS
+    captura = CapturaConsultasLentas(umbral_ms, origen)
+    with ExitStack() as stack:
+        for conexion in connections.all():
+            stack.enter_context(conexion.execute_wrapper(captura))
+        yield
+
+
+class ConsultasLentasMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "CONSULTAS_LENTAS_UMBRAL_MS", 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def origen():
+            match = getattr(request, "resolver_match", None)
+            return match.view_name if match and match.view_name else request.path
+
+        with capturar_consultas_lentas(origen):
+            return self.get_response(request)
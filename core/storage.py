@@ -0,0 +1,187 @@
+# core/storage.py
+"""
+Almacenamiento de archivos por contenido.
+
+`ContenidoDireccionadoMixin` guarda cada archivo con el SHA-256 de su
+contenido como nombre (`cas/ab/cd/abcd…ef.jpg`), así que dos subidas
+idénticas ocupan un solo archivo. Cada `save()` suma una referencia en
+`ObjetoAlmacenado` y cada `delete()` resta una; el archivo se borra al
+confirmarse la transacción que deja el conteo en cero. Los nombres que no
+son del almacén (la imagen por defecto, archivos anteriores) se leen y
+borran como en el storage base.
+
+El mixin solo usa la API de `Storage` (`exists`, `_save`, `delete`), por lo
+que sirve sobre cualquier backend: `AlmacenContenido` es la versión en disco
+local y un backend S3 compatible sería `class AlmacenContenidoS3(
+ContenidoDireccionadoMixin, S3Storage)`.
+
+Como un nombre nunca cambia de contenido, `servir_contenido` responde con
+Cache-Control inmutable y ETag (el propio hash).
+"""
+
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F
+
+from core.escrituras import transaccion_inmediata
+
+PREFIJO = "cas/"
+BLOQUE = 64 * 1024
+
+
+def es_contenido(nombre):
+    return bool(nombre) and nombre.replace("\\", "/").startswith(PREFIJO)
+
+
+def hash_de_nombre(nombre):
+    return posixpath.splitext(posixpath.basename(nombre))[0]
+
+
+class ContenidoDireccionadoMixin:
+    def nombre_para(self, digest, nombre_original):
+        extension = os.path.splitext(nombre_original)[1].lower()
+        return f"{PREFIJO}{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def _digest(self, content):
+        digest = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for bloque in content.chunks(BLOQUE):
+            digest.update(bloque)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        from core.models import ObjetoAlmacenado
+
+        nombre = self.nombre_para(self._digest(content), name)
+        # El archivo se escribe antes (y fuera) de la transacción del conteo.
+        # Si dos subidas iguales coinciden, el backend guarda una copia con
+        # sufijo que nadie referencia y que `limpiar_almacen` elimina.
+        if not self.exists(nombre):
+            super()._save(nombre, content)
+        with transaccion_inmediata(operacion="almacen"):
+            # Un borrado concurrente (`_borrar_si_sin_referencias`) pudo quitar
+            # el archivo después de la comprobación: con el lock tomado ya no
+            # puede, así que se vuelve a escribir si falta.
+            if not self.exists(nombre):
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                super()._save(nombre, content)
+            _, creado = ObjetoAlmacenado.objects.get_or_create(
+                nombre=nombre, defaults={"tamano": content.size, "referencias": 1}
+            )
+            if not creado:
+                ObjetoAlmacenado.objects.filter(pk=nombre).update(referencias=F("referencias") + 1)
+        return nombre
+
+    def delete(self, name):
+        from core.models import ObjetoAlmacenado
+
+        if not es_contenido(name):
+            return super().delete(name)
+        with transaccion_inmediata(operacion="almacen"):
+            ObjetoAlmacenado.objects.filter(pk=name, referencias__gt=0).update(referencias=F("referencias") - 1)
+            huerfano = ObjetoAlmacenado.objects.filter(pk=name, referencias=0).delete()[0]
+            if huerfano:
+                transaction.on_commit(lambda: self._borrar_si_sin_referencias(name))
+
+    def borrar_archivo(self, name):
+        """Borra el archivo en el backend sin tocar el conteo de referencias."""
+        super().delete(name)
+
+    def _borrar_si_sin_referencias(self, name):
+        from core.models import ObjetoAlmacenado
+
+        # Entre el commit y este punto otra subida pudo volver a usarlo; con el
+        # lock, ninguna puede registrarlo entre la comprobación y el borrado
+        with transaccion_inmediata(operacion="almacen"):
+            if not ObjetoAlmacenado.objects.filter(pk=name).exists():
+                self.borrar_archivo(name)
+
+    def referencias(self, name):
+        from core.models import ObjetoAlmacenado
+
+        return ObjetoAlmacenado.objects.filter(pk=name).values_list("referencias", flat=True).first() or 0
+
+
+class AlmacenContenido(ContenidoDireccionadoMixin, FileSystemStorage):
+    """Almacén por contenido en disco local (por defecto en MEDIA_ROOT/cas/)."""
+
+
+def almacen_contenido():
+    """Storage de los campos de archivo subidos por usuarios (STORAGES["contenido"])."""
+    return storages["contenido"]
+
+
+# --- MANTENIMIENTO ---
+
+def _recorrer(storage, directorio):
+    carpetas, archivos = storage.listdir(directorio)
+    for archivo in archivos:
+        yield f"{directorio}{archivo}"
+    for carpeta in carpetas:
+        yield from _recorrer(storage, f"{directorio}{carpeta}/")
+
+
+def recontar(storage):
+    """
+    Recalcula las referencias desde los campos de archivo que usan `storage`
+    (corrige desvíos por transacciones revertidas). Devuelve {nombre: refs}.
+    """
+    from django.apps import apps
+    from django.db.models import Count, FileField
+
+    from core.models import ObjetoAlmacenado
+
+    conteos = {}
+    for modelo in apps.get_models():
+        for campo in modelo._meta.get_fields():
+            if isinstance(campo, FileField) and campo.storage is storage:
+                filas = (
+                    modelo._default_manager.filter(**{f"{campo.attname}__startswith": PREFIJO})
+                    .values(campo.attname).annotate(n=Count("pk")).order_by()
+                )
+                for fila in filas:
+                    conteos[fila[campo.attname]] = conteos.get(fila[campo.attname], 0) + fila["n"]
+
+    with transaccion_inmediata(operacion="almacen"):
+        for objeto in ObjetoAlmacenado.objects.all():
+            referencias = conteos.get(objeto.nombre, 0)
+            if objeto.referencias != referencias:
+                ObjetoAlmacenado.objects.filter(pk=objeto.pk).update(referencias=referencias)
+        for nombre, referencias in conteos.items():
+            if storage.exists(nombre):
+                ObjetoAlmacenado.objects.get_or_create(
+                    nombre=nombre, defaults={"tamano": storage.size(nombre), "referencias": referencias}
+                )
+    return conteos
+
+
+def limpiar(storage, antiguedad=3600, simular=False):
+    """
+    Borra archivos de `cas/` sin referencias (y sus filas) con más de
+    `antiguedad` segundos; los recientes pueden ser de una subida en curso.
+    Devuelve los nombres borrados.
+    """
+    from django.utils import timezone
+
+    from core.models import ObjetoAlmacenado
+
+    referenciados = set(ObjetoAlmacenado.objects.filter(referencias__gt=0).values_list("nombre", flat=True))
+    limite = timezone.now().timestamp() - antiguedad
+    borrados = []
+    if storage.exists(PREFIJO):
+        for nombre in _recorrer(storage, PREFIJO):
+            if nombre not in referenciados and storage.get_modified_time(nombre).timestamp() < limite:
+                borrados.append(nombre)
+    if not simular:
+        ObjetoAlmacenado.objects.filter(referencias=0).delete()
+        for nombre in borrados:
+            storage.borrar_archivo(nombre)
+    return borrados
@@ -0,0 +1,487 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+from unittest import mock
+
+from django import forms
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import OperationalError, connection, router, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views.generic import CreateView
+
+from clinica.models import Parto, TipoParto
+from core import checks, db_profile, db_router, escrituras, metrics, presencia, respaldos, sesiones, slow_queries
+from core.metrics import Registro
+from core.storage import hash_de_nombre, limpiar
+from UsuarioApp.models import Profile
+
+
+class RegistroMetricasTests(TestCase):
+    def test_histograma_en_formato_prometheus(self):
+        registro = Registro()
+        latencia = registro.histograma("latencia_segundos", "Latencia.", labels=("url_name",), buckets=(0.1, 1.0))
+        latencia.observe(0.05, url_name="Home")
+        latencia.observe(0.5, url_name="Home")
+        texto = registro.exponer()
+        self.assertIn("# TYPE latencia_segundos histogram", texto)
+        self.assertIn('latencia_segundos_bucket{url_name="Home",le="0.1"} 1', texto)
+        self.assertIn('latencia_segundos_bucket{url_name="Home",le="+Inf"} 2', texto)
+        self.assertIn('latencia_segundos_count{url_name="Home"} 2', texto)
+
+    def test_labels_invalidos(self):
+        contador = Registro().contador("total", "Total.", labels=("cache",))
+        with self.assertRaises(ValueError):
+            contador.inc(otra="x")
+
+
+class MetricasEndpointTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser(username="director", password="segura123")
+        self.usuario = User.objects.create_user(username="lectura", password="segura123")
+
+    def test_solo_acceso_total(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_expone_latencia_por_url(self):
+        self.client.force_login(self.admin)
+        antes = metrics.LATENCIA_REQUEST.conteo(url_name="metrics", method="GET", status="200")
+        self.client.get(reverse("metrics"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hospital_http_request_duration_seconds_bucket", response.content.decode())
+        self.assertEqual(metrics.LATENCIA_REQUEST.conteo(url_name="metrics", method="GET", status="200"), antes + 2)
+
+
+class ConsultasLentasTests(TestCase):
+    def test_normalizar_colapsa_literales_y_listas(self):
+        a = slow_queries.normalizar_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND nombre = 'Ana'")
+        b = slow_queries.normalizar_sql("SELECT * FROM t  WHERE id IN (%s) AND nombre = 'Luis'")
+        self.assertEqual(a, "SELECT * FROM t WHERE id IN (...) AND nombre = ?")
+        self.assertEqual(slow_queries.huella(a), slow_queries.huella(b))
+
+    def test_registra_plan_con_scan_de_rango_por_fecha(self):
+        archivo = os.path.join(tempfile.mkdtemp(), "lentas.log")
+        consulta = Parto.objects.filter(fecha_hora__date__range=(date(2024, 1, 1), date(2024, 12, 31)))
+        with override_settings(CONSULTAS_LENTAS_ARCHIVO=archivo):
+            with slow_queries.capturar_consultas_lentas("prueba", umbral_ms=0.000001):
+                consulta.count()
+
+        with open(archivo, encoding="utf-8") as f:
+            registros = [json.loads(linea) for linea in f]
+        registro = next(r for r in registros if "clinica_parto" in r["sql"])
+        self.assertEqual(registro["origen"], "prueba")
+        if connection.vendor == "sqlite":
+            self.assertTrue(registro["scan_completo"])
+            self.assertTrue(any(paso.startswith("SCAN") for paso in registro["plan"]))
+
+
+class BaseReportesRouterTests(TestCase):
+    databases = {"default", "reporting"}
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.archivo = os.path.join(directorio, "reporting.sqlite3")
+        ajustes = override_settings(REPORTES_DB_ARCHIVO=self.archivo, REPORTES_DB_MAX_DESFASE=300)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_sin_copia_lee_de_la_principal(self):
+        with db_router.lecturas_de_reportes() as alias:
+            self.assertEqual(alias, "default")
+            self.assertEqual(router.db_for_read(Parto), "default")
+
+    def test_copia_vigente_solo_para_modelos_clinicos(self):
+        db_router.refrescar_copia(destino=self.archivo)
+        self.assertLess(db_router.edad_copia(), 60)
+        self.assertEqual(router.db_for_read(Parto), "default")
+        with db_router.lecturas_de_reportes() as alias:
+            self.assertEqual(alias, "reporting")
+            self.assertEqual(router.db_for_read(Parto), "reporting")
+            self.assertEqual(router.db_for_read(get_user_model()), "default")
+            self.assertEqual(router.db_for_write(Parto), "default")
+        self.assertEqual(router.db_for_read(Parto), "default")
+        self.assertFalse(router.allow_migrate("reporting", "clinica"))
+
+    def test_copia_desfasada_vuelve_a_la_principal(self):
+        db_router.refrescar_copia(destino=self.archivo)
+        antiguo = time.time() - 301
+        os.utime(self.archivo, (antiguo, antiguo))
+        self.assertIsNone(db_router.alias_disponible())
+        with self.settings(REPORTES_DB_MAX_DESFASE=0):
+            os.utime(self.archivo)
+            self.assertIsNone(db_router.alias_disponible())
+
+
+
+class PerfilSqliteTests(TestCase):
+    databases = {"default", "reporting"}
+
+    def conectar(self, alias="default"):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": os.path.join(directorio, "perfil.sqlite3")}, alias=alias)
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    @override_settings(SQLITE_PERFILES_POR_ALIAS={"default": "produccion"})
+    def test_perfil_produccion_al_conectar(self):
+        valores = db_profile.pragmas_actuales(self.conectar())
+        self.assertEqual(valores["journal_mode"], "wal")
+        self.assertEqual(valores["synchronous"], 1)  # NORMAL
+        self.assertEqual(valores["busy_timeout"], 5000)
+        self.assertEqual(valores["temp_store"], 2)  # MEMORY
+        self.assertEqual(valores["cache_size"], -db_profile.CACHE_KIB)
+
+    @override_settings(SQLITE_PERFILES_POR_ALIAS={"default": "basico", "reporting": "lectura"})
+    def test_perfiles_basico_y_lectura_no_cambian_el_journal(self):
+        self.assertEqual(db_profile.pragmas_actuales(self.conectar())["journal_mode"], "delete")
+        lectura = db_profile.pragmas_actuales(self.conectar("reporting"))
+        self.assertEqual(lectura["journal_mode"], "delete")
+        self.assertEqual(lectura["temp_store"], 2)
+
+    @override_settings(SQLITE_PERFILES_POR_ALIAS={"default": "turbo"})
+    def test_perfil_desconocido(self):
+        with self.assertRaises(ValueError):
+            self.conectar()
+
+
+class CacheCompartidaTests(SimpleTestCase):
+    def test_avisa_con_cache_local_al_proceso(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://x"}}
+        archivo = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp"}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([a.id for a in checks.revisar_cache_compartida(None)], ["core.W001"])
+            self.assertFalse(checks.cache_compartida())
+        with override_settings(CACHES=redis):
+            self.assertEqual(checks.revisar_cache_compartida(None), [])
+            self.assertTrue(checks.cache_compartida(atomica=True))
+        with override_settings(CACHES=archivo):
+            self.assertTrue(checks.cache_compartida())
+            self.assertFalse(checks.cache_compartida(atomica=True))
+
+
+class EscriturasCoordinadasTests(TransactionTestCase):
+    def test_transaccion_inmediata_abre_con_begin_immediate(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with escrituras.transaccion_inmediata(operacion="prueba"):
+                self.assertTrue(connection.in_atomic_block)
+        self.assertIn("BEGIN IMMEDIATE", [c["sql"] for c in consultas.captured_queries])
+        # El modo se restaura: las demás transacciones siguen siendo diferidas
+        self.assertIsNone(connection.transaction_mode)
+
+    @override_settings(ESCRITURAS_ESPERA_BASE=0)
+    def test_reintenta_si_la_base_esta_bloqueada(self):
+        intentos = []
+
+        def escribir():
+            intentos.append(1)
+            if len(intentos) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        antes = metrics.REINTENTOS_ESCRITURA.valor(operacion="prueba")
+        self.assertEqual(escrituras.ejecutar_escritura(escribir, operacion="prueba"), "ok")
+        self.assertEqual(len(intentos), 3)
+        self.assertEqual(metrics.REINTENTOS_ESCRITURA.valor(operacion="prueba") - antes, 2)
+
+    @override_settings(ESCRITURAS_ESPERA_BASE=0, ESCRITURAS_REINTENTOS=1)
+    def test_no_reintenta_otros_errores_ni_dentro_de_una_transaccion(self):
+        intentos = []
+
+        def fallar(mensaje):
+            intentos.append(1)
+            raise OperationalError(mensaje)
+
+        with self.assertRaises(OperationalError):
+            escrituras.ejecutar_escritura(fallar, "no such table: x")
+        with self.assertRaises(OperationalError), transaction.atomic():
+            escrituras.ejecutar_escritura(fallar, "database is locked")
+        self.assertEqual(len(intentos), 2)
+
+    @override_settings(ESCRITURAS_ESPERA_BASE=0)
+    def test_vista_reintenta_solo_el_guardado(self):
+        class FormularioBloqueado(forms.ModelForm):
+            intentos = 0
+
+            class Meta:
+                model = TipoParto
+                fields = ["nombre"]
+
+            def save(self, commit=True):
+                FormularioBloqueado.intentos += 1
+                self.instance.descripcion = f"intento {FormularioBloqueado.intentos}"
+                objeto = super().save(commit)
+                if FormularioBloqueado.intentos == 1:
+                    raise OperationalError("database is locked")
+                return objeto
+
+        class AvisoMixin:
+            def form_valid(self, form):
+                messages.success(self.request, "Tipo de parto creado.")
+                return super().form_valid(form)
+
+        class Vista(escrituras.EscrituraCoordinadaMixin, AvisoMixin, CreateView):
+            form_class = FormularioBloqueado
+            success_url = "/"
+
+        request = RequestFactory().post("/", {"nombre": "Parto en agua"})
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        response = Vista.as_view()(request)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(FormularioBloqueado.intentos, 2)
+        tipo = TipoParto.objects.get(nombre="Parto en agua")
+        self.assertEqual(tipo.descripcion, "intento 2")
+        self.assertEqual([str(m) for m in request._messages], ["Tipo de parto creado."])
+
+    @override_settings(ESCRITURAS_DIFERIDAS=True)
+    def test_cola_aplica_solo_lo_confirmado(self):
+        aplicadas = []
+        with transaction.atomic():
+            escrituras.diferir(aplicadas.append, "confirmada")
+            self.assertEqual(aplicadas, [])
+        with self.assertRaises(ValueError), transaction.atomic():
+            escrituras.diferir(aplicadas.append, "revertida")
+            raise ValueError
+        self.assertTrue(escrituras.COLA.vaciar(timeout=5))
+        self.assertEqual(aplicadas, ["confirmada"])
+
+
+class RespaldosTests(TransactionTestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        get_user_model().objects.create_user("respaldada", password="x")
+
+    def test_respaldo_comprimido_verificable_y_rotado(self):
+        for _ in range(3):
+            resultado = respaldos.respaldar(directorio=self.directorio, paginas=2, pausa=0, retener=2)
+        self.assertEqual(len(respaldos.listar(self.directorio)), 2)
+        self.assertEqual(len(resultado["rotados"]), 1)
+        self.assertEqual(respaldos.sha256_de(resultado["archivo"]), resultado["sha256"])
+
+        verificacion = respaldos.verificar(resultado["archivo"])
+        self.assertTrue(verificacion["ok"])
+        self.assertEqual(verificacion["integridad"], ["ok"])
+
+        with open(resultado["archivo"], "r+b") as f:
+            f.seek(-8, os.SEEK_END)
+            f.write(b"\0" * 8)
+        verificacion = respaldos.verificar(resultado["archivo"])
+        self.assertFalse(verificacion["ok"])
+        self.assertFalse(verificacion["sha256_ok"])
+
+    def test_copia_en_linea_pausa_entre_pasos(self):
+        origen = os.path.join(self.directorio, "origen.sqlite3")
+        conexion = sqlite3.connect(origen)
+        conexion.execute("CREATE TABLE datos (texto TEXT)")
+        conexion.executemany("INSERT INTO datos VALUES (?)", [("x" * 2000,)] * 40)
+        conexion.commit()
+        paginas = conexion.execute("PRAGMA page_count").fetchone()[0]
+        conexion.close()
+
+        pasos = -(-paginas // 4)
+        inicio = time.perf_counter()
+        respaldos.copiar_en_linea(origen, os.path.join(self.directorio, "copia.sqlite3"), paginas=4, pausa=0.02)
+        self.assertGreaterEqual(time.perf_counter() - inicio, (pasos - 1) * 0.02)
+
+    def test_restaurar_vuelve_al_estado_del_respaldo(self):
+        archivo = respaldos.respaldar(directorio=self.directorio, pausa=0)["archivo"]
+        get_user_model().objects.create_user("posterior", password="x")
+        self.assertTrue(respaldos.restaurar(archivo)["ok"])
+        nombres = set(get_user_model().objects.values_list("username", flat=True))
+        self.assertIn("respaldada", nombres)
+        self.assertNotIn("posterior", nombres)
+
+    def test_sin_suma_no_es_valido_salvo_que_se_acepte(self):
+        archivo = respaldos.respaldar(directorio=self.directorio, pausa=0)["archivo"]
+        os.remove(f"{archivo}.sha256")
+        verificacion = respaldos.verificar(archivo)
+        self.assertFalse(verificacion["ok"])
+        self.assertIsNone(verificacion["sha256_ok"])
+        self.assertEqual(verificacion["integridad"], ["ok"])
+        self.assertTrue(respaldos.verificar(archivo, sin_suma=True)["ok"])
+
+        get_user_model().objects.create_user("posterior", password="x")
+        self.assertFalse(respaldos.restaurar(archivo)["ok"])
+        self.assertTrue(get_user_model().objects.filter(username="posterior").exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AlmacenContenidoTests(TestCase):
+    def setUp(self):
+        self.almacen = storages["contenido"]
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_mismo_contenido_un_archivo_y_se_borra_sin_referencias(self):
+        nombre = self.almacen.save("users/ana/foto.JPG", ContentFile(b"radiografia"))
+        self.assertRegex(nombre, r"^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(self.almacen.save("users/bea/otra.jpg", ContentFile(b"radiografia")), nombre)
+        self.assertEqual(self.almacen.referencias(nombre), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.almacen.delete(nombre)
+        self.assertTrue(self.almacen.exists(nombre))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.almacen.delete(nombre)
+        self.assertFalse(self.almacen.exists(nombre))
+        self.assertEqual(self.almacen.referencias(nombre), 0)
+
+    def test_reescribe_si_un_borrado_concurrente_quito_el_archivo(self):
+        nombre = self.almacen.save("a.txt", ContentFile(b"compartido"))
+        exists = self.almacen.exists
+        llamadas = []
+
+        def exists_con_borrado(nombre_):
+            resultado = exists(nombre_)
+            if not llamadas:
+                # El borrado del último dueño se confirma justo después de la comprobación
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.almacen.delete(nombre)
+            llamadas.append(nombre_)
+            return resultado
+
+        with mock.patch.object(self.almacen, "exists", side_effect=exists_con_borrado):
+            self.assertEqual(self.almacen.save("b.txt", ContentFile(b"compartido")), nombre)
+        self.assertEqual(self.almacen.referencias(nombre), 1)
+        with self.almacen.open(nombre) as archivo:
+            self.assertEqual(archivo.read(), b"compartido")
+
+    def test_limpiar_borra_archivos_sin_referencias(self):
+        en_uso = self.almacen.save("a.txt", ContentFile(b"en uso"))
+        huerfano = self.almacen.nombre_para("f" * 64, "b.txt")
+        FileSystemStorage._save(self.almacen, huerfano, ContentFile(b"huerfano"))
+        self.assertEqual(limpiar(self.almacen, antiguedad=-1), [huerfano])
+        self.assertTrue(self.almacen.exists(en_uso))
+
+    def test_sirve_con_cache_inmutable_y_etag(self):
+        nombre = self.almacen.save("foto.png", ContentFile(b"\x89PNG datos"))
+        url = self.almacen.url(nombre)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(get_user_model().objects.create_user("ana", password="x"))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"\x89PNG datos")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["ETag"], f'"{hash_de_nombre(nombre)}"')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+class SesionesTests(TransactionTestCase):
+    def test_renueva_solo_bajo_el_umbral(self):
+        sesion = SessionStore()
+        self.assertTrue(sesiones.renovar_expiracion(sesion, edad=1800, umbral=1500))
+        self.assertFalse(sesiones.renovar_expiracion(sesion, edad=1800, umbral=1500))
+        sesion[sesiones.CLAVE_RENOVACION] -= 301
+        self.assertTrue(sesiones.renovar_expiracion(sesion, edad=1800, umbral=1500))
+
+    def test_requests_seguidos_no_escriben_la_sesion(self):
+        usuario = get_user_model().objects.create_superuser("ana", password="x")
+        Profile.objects.create(user_FK=usuario)
+        self.client.force_login(usuario)
+        self.client.get(reverse("metrics"))
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse("metrics"))
+        escrituras = [c["sql"] for c in consultas.captured_queries if c["sql"].startswith(("UPDATE", "INSERT"))]
+        self.assertEqual(escrituras, [])
+
+    def test_motor_diferido_persiste_desde_la_cola(self):
+        sesion = sesiones.SessionStore()
+        sesion["a"] = 1
+        sesion.save(must_create=True)
+        sesion["a"] = 2
+        with CaptureQueriesContext(connection) as consultas:
+            sesion.save()
+        # El hilo del request no escribe: la actualización va a la caché y a la cola
+        self.assertEqual(consultas.captured_queries, [])
+        self.assertEqual(sesiones.SessionStore(sesion.session_key).load()["a"], 2)
+        self.assertTrue(escrituras.COLA.vaciar(timeout=5))
+        self.assertEqual(SessionStore(sesion.session_key).load()["a"], 2)
+
+
+class PresenciaTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        # locmem tiene incr/add atómicos dentro del proceso: sirve como caché compartida de prueba
+        en_cache = mock.patch.object(presencia, "en_cache", return_value=True)
+        en_cache.start()
+        self.addCleanup(en_cache.stop)
+
+    def perfil(self, username):
+        usuario = get_user_model().objects.create_superuser(username, password="x")
+        Profile.objects.create(user_FK=usuario)
+        return usuario
+
+    def test_en_linea_une_los_minutos_de_la_ventana(self):
+        presencia.latido(1, minuto=100)
+        presencia.latido(2, minuto=101)
+        presencia.latido(1, minuto=102)
+        self.assertEqual(presencia.en_linea(ventana=2, minuto=102), {1, 2})
+        self.assertEqual(presencia.en_linea(ventana=1, minuto=103), {1})
+        self.assertEqual(presencia.en_linea(ventana=2, minuto=110), set())
+
+    def test_latidos_concurrentes_no_se_pisan(self):
+        hilos = [threading.Thread(target=presencia.latido, args=(uid, 200)) for uid in range(1, 41)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(presencia.en_linea(ventana=0, minuto=200), set(range(1, 41)))
+
+    def test_requests_no_escriben_el_perfil_y_se_vuelca_por_lotes(self):
+        usuario = self.perfil("ana")
+        self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse("metrics"))
+        self.assertFalse([c for c in consultas.captured_queries if "UsuarioApp_profile" in c["sql"]])
+        self.assertIn(usuario.pk, presencia.en_linea())
+        self.assertIsNone(Profile.objects.get(user_FK=usuario).last_activity)
+
+        minuto = presencia.minuto_actual()
+        self.assertEqual(presencia.volcar(minuto), 1)
+        self.assertEqual(Profile.objects.get(user_FK=usuario).last_activity.timestamp(), minuto * 60)
+        # Un volcado repetido o de un minuto anterior no retrocede la fecha
+        self.assertEqual(presencia.volcar(minuto), 0)
+        self.assertTrue(escrituras.COLA.vaciar(timeout=5))
+        self.assertEqual(Profile.objects.get(user_FK=usuario).last_activity.timestamp(), minuto * 60)
+
+    def test_vuelca_el_ultimo_minuto_aunque_el_siguiente_no_tenga_latidos(self):
+        ana, bea = self.perfil("ana"), self.perfil("bea")
+        presencia.latido(ana.pk, minuto=300)
+        presencia.latido(ana.pk, minuto=301)
+        # Nadie en el minuto 302; el primer latido del 303 vuelca 300-302
+        presencia.latido(bea.pk, minuto=303)
+        self.assertEqual(Profile.objects.get(user_FK=ana).last_activity.timestamp(), 301 * 60)
+        self.assertIsNone(Profile.objects.get(user_FK=bea).last_activity)
+
+    def test_sin_cache_compartida_atomica_usa_la_base(self):
+        usuario = self.perfil("ana")
+        with mock.patch.object(presencia, "en_cache", return_value=False):
+            minuto = presencia.minuto_actual()
+            presencia.latido(usuario.pk)
+            self.assertEqual(Profile.objects.get(user_FK=usuario).last_activity.timestamp(), minuto * 60)
+            self.assertEqual(presencia.en_linea(), {usuario.pk})
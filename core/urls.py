@@ -1,8 +1,12 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import ArchivoInmutableView, MetricasView
+
+MEDIA = settings.MEDIA_URL.lstrip("/")
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("allauth.urls")),
@@ -10,6 +14,18 @@ urlpatterns = [
     path("", include("UsuarioApp.urls")),
     path("clinica/", include("clinica.urls")),
     path("reportes/", include("reportes.urls")),
+    path("metrics", MetricasView.as_view(), name="metrics"),
+    # Nombres por hash de contenido: se sirven con caché inmutable (antes que static())
+    re_path(
+        rf"^{MEDIA}cas/(?P<nombre>[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[a-z0-9]{{1,5}})?)$",
+        ArchivoInmutableView.as_view(),
+        name="archivo_contenido",
+    ),
+    re_path(
+        rf"^{MEDIA}avatares/(?P<nombre>[0-9a-f]{{2}}/[0-9a-f]{{32}}-\d+\.webp)$",
+        ArchivoInmutableView.as_view(storage_alias="default", prefijo="avatares/"),
+        name="archivo_avatar",
+    ),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.files.storage import storages
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.generic import View
+
+from core.metrics import REGISTRO
+from core.mixins import PermitsPositionMixin
+from core.storage import hash_de_nombre
+
+
+class MetricasView(PermitsPositionMixin, View):
+    # Solo ACCESO TOTAL (y superusuarios): el mixin no invita a ningún otro cargo
+    permission_required = []
+
+    def get(self, request):
+        return HttpResponse(
+            REGISTRO.exponer(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class ArchivoInmutableView(LoginRequiredMixin, View):
+    """
+    Sirve archivos cuyo nombre es el hash de su contenido (almacén `cas/` y
+    variantes de avatar): nunca cambian, así que el navegador puede
+    guardarlos para siempre y revalidar solo por ETag.
+    """
+
+    storage_alias = "contenido"
+    prefijo = "cas/"
+
+    def get(self, request, nombre):
+        nombre = f"{self.prefijo}{nombre}"
+        etag = f'"{hash_de_nombre(nombre)}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            storage = storages[self.storage_alias]
+            try:
+                response = FileResponse(storage.open(nombre, "rb"), filename=nombre.rsplit("/", 1)[-1])
+            except FileNotFoundError:
+                raise Http404
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, immutable=True, max_age=settings.ARCHIVOS_INMUTABLES_MAX_AGE)
+        return response
@@ -8,8 +8,8 @@ from django.utils import timezone
 from datetime import timedelta
 
 # Importamos modelos de otras apps
-from UsuarioApp.models import Profile
 from clinica.models import Parto, Alta
+from core import presencia
 
 class HomeView(LoginRequiredMixin, ListView):
     model = User
@@ -51,11 +51,7 @@ class HomeView(LoginRequiredMixin, ListView):
         context["total_sala"] = context["col_sala"].count()
         context["total_altas"] = context["col_altas"].count()
 
-        # Mantenemos lógica de usuarios activos (círculo verde de online)
-        recent_activity_cutoff = now - timedelta(minutes=2)
-        active_users = Profile.objects.filter(
-            last_activity__gte=recent_activity_cutoff
-        ).values_list("user_FK_id", flat=True)
-        context["active_users"] = list(active_users)
+        # Usuarios activos (círculo verde de online): presencia en caché, sin consultar Profile
+        context["active_users"] = sorted(presencia.en_linea())
 
         return context
\ No newline at end of file
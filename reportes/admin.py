@@ -1,3 +1,44 @@
 from django.contrib import admin
+from django.utils.html import format_html, format_html_join
 
-# Register your models here.
+from .models import PerfilEjecucion
+from .profiling import tabla_acumulada
+
+
+@admin.register(PerfilEjecucion)
+class PerfilEjecucionAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "tipo", "nombre", "duracion_ms", "disparador", "usuario")
+    list_filter = ("tipo", "disparador", "fecha")
+    search_fields = ("nombre", "ruta")
+    date_hierarchy = "fecha"
+    list_select_related = ("usuario",)
+    readonly_fields = (
+        "fecha", "tipo", "nombre", "ruta", "metodo", "disparador",
+        "duracion_ms", "usuario", "archivo", "tabla_acumulado",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Top funciones por tiempo acumulado")
+    def tabla_acumulado(self, obj):
+        try:
+            filas = tabla_acumulada(obj.archivo)
+        except (OSError, ValueError, EOFError):
+            return "No se pudo leer el archivo de perfil."
+        cuerpo = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            (
+                (f["llamadas"], f"{f['propio_ms']:.1f}", f"{f['acumulado_ms']:.1f}", f["funcion"])
+                for f in filas
+            ),
+        )
+        return format_html(
+            "<table><thead><tr><th>Llamadas</th><th>Propio (ms)</th><th>Acumulado (ms)</th>"
+            "<th>Función</th></tr></thead><tbody>{}</tbody></table>",
+            cuerpo,
+        )
@@ -0,0 +1,211 @@
+# reportes/analitica.py
+"""
+Analítica de crecimiento neonatal con NumPy.
+
+Las mediciones de los RN (peso, talla, APGAR 5', edad gestacional) se cargan
+como arreglos por lotes y todo el cálculo es vectorizado:
+
+- Percentiles P3/P10/P50/P90/P97 de peso por semana de edad gestacional.
+- Tasas de pequeño (PEG, < P10) y grande (GEG, > P90) para la edad
+  gestacional. La referencia es la curva del propio hospital sobre todo el
+  histórico, o una tabla externa en ANALITICA_REFERENCIA_PESO
+  ({semana: (p10, p90)}) si se configura.
+- Histogramas de peso y talla.
+
+Las mediciones salen del snapshot columnar (`reportes.snapshot`) si hay uno
+vigente, o de la base por lotes. Los resultados se guardan en caché por
+versión de datos (la generación del snapshot, o cantidad y última
+actualización de partos y RN), así que cualquier cambio los invalida.
+"""
+
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from clinica.models import Parto, RecienNacido
+from core.metrics import registrar_cache
+
+from .snapshot import Snapshot
+from .time_window import TimeWindow
+
+PERCENTILES = (3, 10, 50, 90, 97)
+MINIMO_POR_SEMANA = 20
+ANCHO_HISTOGRAMA_PESO = 250
+LOTE = 20000
+
+CAMPOS = ("peso_gramos", "talla_cm", "apgar5", "edad_gestacional_semanas")
+
+
+class Mediciones:
+    """Columnas de mediciones de RN como arreglos float (NaN = sin dato)."""
+
+    def __init__(self, peso, talla, apgar5, edad_gestacional):
+        self.peso = peso
+        self.talla = talla
+        self.apgar5 = apgar5
+        self.edad_gestacional = edad_gestacional
+
+    def __len__(self):
+        return len(self.peso)
+
+
+def cargar_mediciones(ventana=None, lote=LOTE):
+    """Lee las mediciones desde la base por lotes (sin materializar filas ORM)."""
+    ventana = ventana or TimeWindow()
+    filas = (
+        ventana.aplicar(RecienNacido.objects.all(), "parto__fecha_hora")
+        .order_by()
+        .values_list(*CAMPOS)
+        .iterator(chunk_size=lote)
+    )
+    bloques, bloque = [], []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == lote:
+            bloques.append(np.array(bloque, dtype=np.float64))
+            bloque = []
+    if bloque:
+        bloques.append(np.array(bloque, dtype=np.float64))
+
+    datos = np.concatenate(bloques) if bloques else np.empty((0, len(CAMPOS)))
+    return Mediciones(*(datos[:, i] for i in range(len(CAMPOS))))
+
+
+def cargador_snapshot(snapshot):
+    """Cargador equivalente a `cargar_mediciones` sobre las columnas memmap."""
+    def cargar(ventana=None):
+        mascara = snapshot.mascara_ventana("rn", ventana or TimeWindow())
+        return Mediciones(*(
+            snapshot.seleccionar("rn", campo, mascara).astype(np.float64) for campo in CAMPOS
+        ))
+    return cargar
+
+
+# --- CÁLCULOS VECTORIZADOS ---
+
+def percentiles_por_semana(peso, edad_gestacional, percentiles=PERCENTILES, minimo=MINIMO_POR_SEMANA):
+    """
+    Percentiles de peso por semana (interpolación lineal, igual que
+    np.percentile) sin iterar por semana: se ordena por (semana, peso) y se
+    indexan las posiciones de todos los grupos a la vez.
+
+    Devuelve (semanas, matriz semanas x percentiles, conteos).
+    """
+    validos = ~np.isnan(peso) & ~np.isnan(edad_gestacional)
+    peso = peso[validos]
+    semanas_rn = edad_gestacional[validos].astype(np.int64)
+    orden = np.lexsort((peso, semanas_rn))
+    peso, semanas_rn = peso[orden], semanas_rn[orden]
+
+    semanas, inicios, conteos = np.unique(semanas_rn, return_index=True, return_counts=True)
+    suficientes = conteos >= minimo
+    semanas, inicios, conteos = semanas[suficientes], inicios[suficientes], conteos[suficientes]
+    if not len(semanas):
+        return semanas, np.empty((0, len(percentiles))), conteos
+
+    fracciones = np.asarray(percentiles, dtype=np.float64) / 100
+    posiciones = inicios[:, None] + (conteos[:, None] - 1) * fracciones[None, :]
+    bajo = np.floor(posiciones).astype(np.int64)
+    alto = np.ceil(posiciones).astype(np.int64)
+    valores = peso[bajo] + (peso[alto] - peso[bajo]) * (posiciones - bajo)
+    return semanas, valores, conteos
+
+
+def tasas_peg_geg(peso, edad_gestacional, semanas_ref, p10_ref, p90_ref):
+    """
+    Fracción de RN bajo P10 (PEG) y sobre P90 (GEG) de la referencia para
+    su semana. Solo cuentan los RN con semana presente en la referencia.
+    """
+    validos = ~np.isnan(peso) & ~np.isnan(edad_gestacional)
+    peso = peso[validos]
+    semanas_rn = edad_gestacional[validos].astype(np.int64)
+    if not len(semanas_ref) or not len(peso):
+        return None, None, 0
+
+    indices = np.clip(np.searchsorted(semanas_ref, semanas_rn), 0, len(semanas_ref) - 1)
+    con_referencia = semanas_ref[indices] == semanas_rn
+    peso, indices = peso[con_referencia], indices[con_referencia]
+    if not len(peso):
+        return None, None, 0
+    peg = float(np.mean(peso < p10_ref[indices]))
+    geg = float(np.mean(peso > p90_ref[indices]))
+    return peg, geg, int(len(peso))
+
+
+def histograma(valores, ancho, minimo=0):
+    valores = valores[~np.isnan(valores)]
+    if not len(valores):
+        return [], []
+    bordes = np.arange(minimo, np.max(valores) + ancho, ancho)
+    conteos, bordes = np.histogram(valores, bins=bordes)
+    return bordes[:-1].astype(int).tolist(), conteos.tolist()
+
+
+# --- RESULTADO CACHEADO ---
+
+def version_datos():
+    """Huella que cambia con cualquier alta, baja o edición de partos/RN."""
+    rn = RecienNacido.objects.aggregate(n=Count("id"), ultima=Max("fecha_actualizacion"))
+    partos = Parto.objects.aggregate(n=Count("id"), ultima=Max("fecha_actualizacion"))
+    crudo = f"{rn['n']}|{rn['ultima']}|{partos['n']}|{partos['ultima']}"
+    return hashlib.sha1(crudo.encode()).hexdigest()[:16]
+
+
+def _referencia(historico):
+    configurada = getattr(settings, "ANALITICA_REFERENCIA_PESO", None)
+    if configurada:
+        semanas = np.array(sorted(configurada), dtype=np.int64)
+        p10 = np.array([configurada[s][0] for s in semanas], dtype=np.float64)
+        p90 = np.array([configurada[s][1] for s in semanas], dtype=np.float64)
+        return "configurada", semanas, p10, p90
+    semanas, valores, _ = percentiles_por_semana(historico.peso, historico.edad_gestacional)
+    return "local", semanas, valores[:, PERCENTILES.index(10)], valores[:, PERCENTILES.index(90)]
+
+
+def crecimiento(ventana=None, cargar=None):
+    """
+    Percentiles por semana, tasas PEG/GEG e histogramas para la ventana,
+    cacheados por versión de datos. `cargar(ventana)` devuelve Mediciones;
+    por defecto el snapshot vigente o, si no hay, la base.
+    """
+    ventana = ventana or TimeWindow()
+    snapshot = Snapshot.vigente() if cargar is None else None
+    if snapshot is not None:
+        version, cargar = snapshot.generacion, cargador_snapshot(snapshot)
+    else:
+        version, cargar = version_datos(), cargar or cargar_mediciones
+    extremos = [m.isoformat() if m else "-" for m in (ventana.inicio, ventana.fin)]
+    clave = f"reportes:crecimiento:{version}:{extremos[0]}:{extremos[1]}"
+    resultado = cache.get(clave)
+    registrar_cache("reportes_crecimiento", resultado is not None)
+    if resultado is not None:
+        return resultado
+
+    mediciones = cargar(ventana)
+    historico = mediciones if not ventana.acotada else cargar(TimeWindow())
+    tipo_referencia, semanas_ref, p10_ref, p90_ref = _referencia(historico)
+
+    semanas, valores, conteos = percentiles_por_semana(mediciones.peso, mediciones.edad_gestacional)
+    peg, geg, evaluados = tasas_peg_geg(
+        mediciones.peso, mediciones.edad_gestacional, semanas_ref, p10_ref, p90_ref
+    )
+    bordes_peso, conteos_peso = histograma(mediciones.peso, ANCHO_HISTOGRAMA_PESO)
+    bordes_talla, conteos_talla = histograma(mediciones.talla, 1, minimo=20)
+
+    resultado = {
+        "semanas": semanas.tolist(),
+        "percentiles": {f"P{p}": np.round(valores[:, i]).astype(int).tolist() for i, p in enumerate(PERCENTILES)},
+        "conteos": conteos.tolist(),
+        "tasa_peg": peg,
+        "tasa_geg": geg,
+        "evaluados": evaluados,
+        "referencia": tipo_referencia,
+        "histograma_peso": {"labels": bordes_peso, "values": conteos_peso},
+        "histograma_talla": {"labels": bordes_talla, "values": conteos_talla},
+        "total": len(mediciones),
+    }
+    cache.set(clave, resultado, timeout=getattr(settings, "ANALITICA_CACHE_SEGUNDOS", 24 * 3600))
+    return resultado
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "reportes"
+
+    def ready(self):
+        import reportes.signals
+        from django.conf import settings
+
+        if settings.REPORTES_EXPORTADORES_PRECARGA:
+            from reportes import exportadores
+
+            exportadores.precargar()
@@ -0,0 +1,203 @@
+# reportes/benchmark.py
+"""
+Suite de benchmarks para las vistas más pesadas (listados, dashboard,
+gráficos, exportaciones y auditoría).
+
+Cada escenario se ejecuta con el cliente de pruebas de Django contra la base
+configurada (idealmente poblada con `generar_datos_sinteticos`) y registra
+tiempo de pared, cantidad de consultas SQL y memoria pico (tracemalloc).
+"""
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clinica.models import HistorialPaciente, Paciente, Parto, RecienNacido
+
+USUARIO_BENCHMARK = "benchmark_runner"
+
+METRICAS_GRAFICOS = [
+    "partos_evolucion",
+    "vitales_peso_evolucion",
+    "complicaciones_distribucion",
+    "sexo_distribucion",
+    "posicion_distribucion",
+    "educacion_distribucion",
+    "estado_civil_distribucion",
+    "tipo_parto_distribucion",
+    "pueblo_distribucion",
+    "nacionalidad_distribucion",
+    "crecimiento_percentiles",
+]
+
+
+def escenarios():
+    """Lista de (nombre, url, parámetros GET) a medir."""
+    hoy = timezone.localdate()
+    ultimo_anio = {
+        "fecha_inicio": (hoy - timedelta(days=365)).isoformat(),
+        "fecha_final": hoy.isoformat(),
+    }
+    lista = [
+        ("pacientes_busqueda", reverse("clinica:paciente_list"), {"q": "Gonz"}),
+        ("home", reverse("Home"), {}),
+        ("dashboard_historico", reverse("reportes:dashboard_obstetricia"), {}),
+        ("dashboard_ultimo_anio", reverse("reportes:dashboard_obstetricia"), ultimo_anio),
+    ]
+    for metrica in METRICAS_GRAFICOS:
+        for dias in ("30", "historic"):
+            lista.append((
+                f"grafico_{metrica}_{dias}",
+                reverse("reportes:api_chart_data"),
+                {"metric": metrica, "days": dias},
+            ))
+    lista += [
+        ("exportar_excel_ultimo_anio", reverse("reportes:exportar_excel"), ultimo_anio),
+        ("exportar_pdf_historico", reverse("reportes:exportar_pdf"), {}),
+        ("auditoria", reverse("reportes:auditoria_list"), {}),
+        ("auditoria_busqueda", reverse("reportes:auditoria_list"), {"q": "Gonz", **ultimo_anio}),
+    ]
+    return lista
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas sin activar el debug cursor."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def _consumir(response):
+    if response.streaming:
+        return sum(len(parte) for parte in response.streaming_content)
+    return len(response.content)
+
+
+def medir(cliente, url, params, repeticiones=5):
+    """Mide un escenario: mediana de tiempo, consultas y memoria pico."""
+    # Calentamiento (plantillas, caché de consultas, imports diferidos)
+    response = cliente.get(url, params)
+    _consumir(response)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        response = cliente.get(url, params)
+        tamano = _consumir(response)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+
+    contador = ContadorConsultas()
+    tracemalloc.start()
+    try:
+        with ExitStack() as stack:
+            # Todas las conexiones: los reportes pueden leer de la copia `reporting`
+            for conexion in connections.all():
+                stack.enter_context(conexion.execute_wrapper(contador))
+            _consumir(cliente.get(url, params))
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": response.status_code,
+        "tiempo_ms": round(statistics.median(tiempos), 2),
+        "tiempo_min_ms": round(min(tiempos), 2),
+        "consultas": contador.total,
+        "memoria_pico_kb": round(pico / 1024, 1),
+        "bytes": tamano,
+    }
+
+
+def ejecutar(repeticiones=5, filtro=None, salida=None):
+    """Corre la suite completa (o los escenarios que contienen `filtro`)."""
+    User = get_user_model()
+    usuario, creado = User.objects.get_or_create(
+        username=USUARIO_BENCHMARK, defaults={"is_superuser": True, "is_staff": True}
+    )
+    if creado:
+        usuario.set_unusable_password()
+        usuario.save()
+
+    resultados = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        cliente = Client()
+        cliente.force_login(usuario)
+        for nombre, url, params in escenarios():
+            if filtro and filtro not in nombre:
+                continue
+            resultados[nombre] = medir(cliente, url, params, repeticiones)
+            if salida:
+                r = resultados[nombre]
+                salida(
+                    f"{nombre:<45} {r['tiempo_ms']:>10.1f} ms {r['consultas']:>5} q "
+                    f"{r['memoria_pico_kb']:>10.0f} KB  [{r['status']}]"
+                )
+
+    return {
+        "meta": {
+            "fecha": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "repeticiones": repeticiones,
+            "volumen": {
+                "pacientes": Paciente.objects.count(),
+                "partos": Parto.objects.count(),
+                "recien_nacidos": RecienNacido.objects.count(),
+                "historial": HistorialPaciente.objects.count(),
+            },
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(base, actual, umbral=0.15, piso_ms=5.0):
+    """
+    Compara dos corridas y devuelve las regresiones.
+
+    Se marca regresión cuando el tiempo o la memoria suben más que `umbral`
+    (fracción, 0.15 = 15 %) y, en el caso del tiempo, más de `piso_ms`
+    absolutos para no reaccionar al ruido. Cualquier aumento de consultas
+    también es regresión.
+    """
+    regresiones = []
+    for nombre, previo in base["resultados"].items():
+        nuevo = actual["resultados"].get(nombre)
+        if nuevo is None:
+            continue
+        if nuevo["status"] != previo["status"]:
+            regresiones.append((nombre, "status", previo["status"], nuevo["status"]))
+        delta_ms = nuevo["tiempo_ms"] - previo["tiempo_ms"]
+        if delta_ms > piso_ms and delta_ms > previo["tiempo_ms"] * umbral:
+            regresiones.append((nombre, "tiempo_ms", previo["tiempo_ms"], nuevo["tiempo_ms"]))
+        if nuevo["consultas"] > previo["consultas"]:
+            regresiones.append((nombre, "consultas", previo["consultas"], nuevo["consultas"]))
+        if nuevo["memoria_pico_kb"] > previo["memoria_pico_kb"] * (1 + umbral):
+            regresiones.append((nombre, "memoria_pico_kb", previo["memoria_pico_kb"], nuevo["memoria_pico_kb"]))
+    return regresiones
+
+
+def cargar(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def guardar(datos, ruta):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False)
@@ -0,0 +1,95 @@
+# reportes/downsampling.py
+"""
+Series de evolución livianas para los gráficos de línea.
+
+1. La granularidad (día, semana o mes) se elige según el largo de la ventana
+   (`TimeWindow.granularidad`), y la agregación se hace en la base de datos.
+2. Si aun así quedan más puntos que PUNTOS_OBJETIVO, se reducen con
+   Largest-Triangle-Three-Buckets (LTTB), que conserva picos y valles mejor
+   que promediar o tomar cada n-ésimo punto.
+
+El resultado es columnar: `labels` y `values` en arreglos paralelos.
+"""
+
+from django.db.models import Max, Min
+
+from clinica.models import Parto
+
+from .time_window import TimeWindow
+
+PUNTOS_OBJETIVO = 200
+
+
+def lttb(puntos, objetivo=PUNTOS_OBJETIVO):
+    """
+    Largest-Triangle-Three-Buckets sobre una lista de (x, y, ...) ordenada
+    por x. Conserva siempre el primer y el último punto; los elementos extra
+    de cada tupla se devuelven intactos.
+    """
+    total = len(puntos)
+    if objetivo >= total or objetivo < 3:
+        return list(puntos)
+
+    muestreados = [puntos[0]]
+    tamano = (total - 2) / (objetivo - 2)
+    anterior = 0
+    for i in range(objetivo - 2):
+        inicio = int(i * tamano) + 1
+        fin = int((i + 1) * tamano) + 1
+
+        # Promedio del bucket siguiente: tercer vértice del triángulo
+        siguiente = puntos[fin:min(int((i + 2) * tamano) + 1, total)] or [puntos[-1]]
+        prom_x = sum(p[0] for p in siguiente) / len(siguiente)
+        prom_y = sum(p[1] for p in siguiente) / len(siguiente)
+
+        ax, ay = puntos[anterior][:2]
+        mayor_area, elegido = -1.0, inicio
+        for j in range(inicio, fin):
+            x, y = puntos[j][:2]
+            area = abs((ax - prom_x) * (y - ay) - (ax - x) * (prom_y - ay))
+            if area > mayor_area:
+                mayor_area, elegido = area, j
+        muestreados.append(puntos[elegido])
+        anterior = elegido
+
+    muestreados.append(puntos[-1])
+    return muestreados
+
+
+def granularidad_para(ventana):
+    """
+    Granularidad de la ventana. Las ventanas históricas toman el rango real
+    de partos (min/max sobre idx_parto_fecha, sin recorrer la tabla).
+    """
+    if ventana.inicio is not None:
+        return ventana.granularidad()
+    extremos = Parto.objects.aggregate(primero=Min("fecha_hora"), ultimo=Max("fecha_hora"))
+    return ventana.granularidad(extremos["primero"], extremos["ultimo"])
+
+
+def serie_evolucion(queryset, campo_fecha, agregado, granularidad, objetivo=PUNTOS_OBJETIVO, decimales=None):
+    """
+    Agrega `queryset` por bucket de `campo_fecha` y reduce con LTTB.
+    Devuelve {'granularity', 'labels', 'values', 'total_points'}.
+    """
+    filas = (
+        queryset.annotate(bucket=TimeWindow.truncar(campo_fecha, granularidad))
+        .values("bucket")
+        .annotate(valor=agregado)
+        .order_by("bucket")
+    )
+    puntos = []
+    for fila in filas:
+        if fila["bucket"] is None or fila["valor"] is None:
+            continue
+        fecha = TimeWindow.inicio_bucket(fila["bucket"], granularidad)
+        valor = round(fila["valor"], decimales) if decimales is not None else fila["valor"]
+        puntos.append((fecha.toordinal(), valor, fecha))
+
+    reducidos = lttb(puntos, objetivo)
+    return {
+        "granularity": granularidad,
+        "labels": [TimeWindow.etiqueta(p[2], granularidad) for p in reducidos],
+        "values": [p[1] for p in reducidos],
+        "total_points": len(puntos),
+    }
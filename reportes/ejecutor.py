@@ -0,0 +1,311 @@
+# reportes/ejecutor.py
+"""
+Ejecutor de reportes particionado por mes.
+
+El rango del reporte se divide en meses calendario. Cada partición calcula
+agregados parciales combinables (conteos, sumas, sumas de cuadrados e
+histogramas) y luego se combinan en un solo resultado. Así:
+
+- Las particiones pendientes se reparten en un pool de procesos
+  (REPORTES_EJECUTOR_PROCESOS); cada worker abre su propia conexión.
+- Los meses cerrados se guardan en caché: un parto de un mes ya cerrado no
+  cambia salvo corrección, y en ese caso `reportes.signals` invalida el mes.
+  Las escrituras que cambian muchos meses o no emiten señales (restaurar un
+  respaldo, datos sintéticos con bulk_create, renombrar un tipo de parto)
+  llaman a `invalidar_todo`, que cambia la generación de las claves; lo que
+  escape a ambas (`.update()`, SQL directo) vence a los
+  REPORTES_PARCIAL_TIMEOUT segundos. Las invalidaciones se aplican al
+  confirmarse la transacción y un parcial solo se guarda si se empezó a
+  calcular después de la última. Con una caché local al proceso (locmem) la
+  invalidación no llega a los demás workers: ahí el parcial dura a lo más
+  TIMEOUT_PARCIAL_LOCAL segundos (ver `core.checks`).
+
+Las distribuciones demográficas cuentan madres distintas y no se pueden
+sumar entre meses; esas siguen saliendo de `reportes.cohortes`.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from math import sqrt
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, Min, Q, Sum, Value
+from django.utils import timezone
+
+from clinica.models import Parto, RecienNacido
+from core.checks import cache_compartida
+from core.db_router import marca_copia
+from core.metrics import registrar_cache
+
+from . import ejecutor_worker
+from .time_window import MES, TimeWindow, inicio_del_dia
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE = 1
+TIMEOUT_PARCIAL_LOCAL = 300
+ANCHO_HISTOGRAMA_PESO = 250
+CAMPOS_STATS = ("peso_gramos", "talla_cm", "apgar5")
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+# --- AGREGADOS PARCIALES ---
+
+def parcial_vacio():
+    return {
+        "total_partos": 0,
+        "total_recien_nacidos": 0,
+        "total_complicaciones": 0,
+        "tipo_parto": {},
+        "posicion_parto": {},
+        "sexo": {},
+        "stats": {campo: [0, 0, 0] for campo in CAMPOS_STATS},  # n, suma, suma de cuadrados
+        "histograma_peso": {},
+    }
+
+
+def _sumar_conteos(destino, origen):
+    for clave, valor in origen.items():
+        destino[clave] = destino.get(clave, 0) + valor
+
+
+def combinar(parciales):
+    """Combina agregados parciales (el orden no importa)."""
+    total = parcial_vacio()
+    for parcial in parciales:
+        for clave in ("total_partos", "total_recien_nacidos", "total_complicaciones"):
+            total[clave] += parcial[clave]
+        for clave in ("tipo_parto", "posicion_parto", "sexo", "histograma_peso"):
+            _sumar_conteos(total[clave], parcial[clave])
+        for campo in CAMPOS_STATS:
+            total["stats"][campo] = [a + b for a, b in zip(total["stats"][campo], parcial["stats"][campo])]
+    return total
+
+
+def promedio_y_desviacion(n, suma, cuadrados):
+    """Promedio y desviación estándar poblacional a partir de los acumulados."""
+    if not n:
+        return None, None
+    promedio = suma / n
+    varianza = max(cuadrados / n - promedio ** 2, 0) if n > 1 else 0
+    return promedio, sqrt(varianza)
+
+
+def calcular_parcial(inicio, fin, using="default"):
+    """Agregados de los partos con fecha_hora en [inicio, fin)."""
+    parcial = parcial_vacio()
+    rango = {"fecha_hora__gte": inicio, "fecha_hora__lt": fin}
+    complicado = ~Q(complicaciones__isnull=True) & ~Q(complicaciones="")
+
+    partos = (
+        Parto.objects.using(using).filter(**rango).order_by()
+        .values("tipo_parto__nombre", "posicion_parto")
+        .annotate(total=Count("id"), complicados=Count("id", filter=complicado))
+    )
+    for fila in partos:
+        parcial["total_partos"] += fila["total"]
+        parcial["total_complicaciones"] += fila["complicados"]
+        if fila["tipo_parto__nombre"]:
+            _sumar_conteos(parcial["tipo_parto"], {fila["tipo_parto__nombre"]: fila["total"]})
+        if fila["posicion_parto"]:
+            _sumar_conteos(parcial["posicion_parto"], {fila["posicion_parto"]: fila["total"]})
+
+    rn = RecienNacido.objects.using(using).filter(**{f"parto__{k}": v for k, v in rango.items()}).order_by()
+    for fila in rn.values("sexo").annotate(total=Count("id")):
+        parcial["total_recien_nacidos"] += fila["total"]
+        parcial["sexo"][fila["sexo"]] = fila["total"]
+
+    agregados = {}
+    for campo in CAMPOS_STATS:
+        agregados[f"{campo}_n"] = Count(campo)
+        agregados[f"{campo}_s"] = Sum(campo)
+        agregados[f"{campo}_q"] = Sum(F(campo) * F(campo))
+    valores = rn.aggregate(**agregados)
+    for campo in CAMPOS_STATS:
+        parcial["stats"][campo] = [
+            valores[f"{campo}_n"] or 0, valores[f"{campo}_s"] or 0, valores[f"{campo}_q"] or 0,
+        ]
+
+    # División entera en la base: un bin por cada ANCHO_HISTOGRAMA_PESO gramos
+    bin_peso = ExpressionWrapper(F("peso_gramos") / Value(ANCHO_HISTOGRAMA_PESO), output_field=IntegerField())
+    for fila in rn.exclude(peso_gramos__isnull=True).values(bin=bin_peso).annotate(total=Count("id")):
+        parcial["histograma_peso"][str(int(fila["bin"]) * ANCHO_HISTOGRAMA_PESO)] = fila["total"]
+    return parcial
+
+
+# --- PARTICIONES Y CACHÉ ---
+
+def particiones_mensuales(ventana, using=None):
+    """Lista de (inicio, fin, mes) que cubren la ventana, recortadas a sus bordes."""
+    inicio, fin = ventana.inicio, ventana.fin
+    if inicio is None or fin is None:
+        extremos = Parto.objects.db_manager(using).aggregate(primero=Min("fecha_hora"), ultimo=Max("fecha_hora"))
+        if extremos["primero"] is None:
+            return []
+        # Sin datos fuera de [primero, ultimo]: se alinean a meses completos
+        # para que también los bordes de una ventana histórica sean cacheables
+        inicio = inicio or inicio_del_dia(TimeWindow.inicio_bucket(extremos["primero"], MES))
+        fin = fin or inicio_del_dia(TimeWindow.siguiente_bucket(TimeWindow.inicio_bucket(extremos["ultimo"], MES), MES))
+
+    particiones = []
+    for mes in TimeWindow(inicio, fin).buckets(MES):
+        desde = max(inicio_del_dia(mes), inicio)
+        hasta = min(inicio_del_dia(TimeWindow.siguiente_bucket(mes, MES)), fin)
+        if desde < hasta:
+            particiones.append((desde, hasta, mes))
+    return particiones
+
+
+PREFIJO_CACHE = f"reportes:parcial:v{VERSION_CACHE}"
+CLAVE_GENERACION = f"{PREFIJO_CACHE}:generacion"
+CLAVE_INVALIDACION_TOTAL = f"{PREFIJO_CACHE}:invalidado"
+
+
+def generacion():
+    """Marca de la última invalidación completa; si la caché la perdió, se empieza una nueva."""
+    marca = cache.get(CLAVE_GENERACION)
+    if marca is None:
+        cache.add(CLAVE_GENERACION, timezone.now(), timeout=None)
+        marca = cache.get(CLAVE_GENERACION)
+    return marca
+
+
+def clave_cache(mes, generacion_=None):
+    generacion_ = generacion_ or generacion()
+    return f"{PREFIJO_CACHE}:{generacion_:%Y%m%d%H%M%S%f}:{mes:%Y-%m}"
+
+
+def es_cacheable(desde, hasta, mes, ahora):
+    """Solo meses completos y ya cerrados (el mes en curso sigue cambiando)."""
+    inicio_mes = inicio_del_dia(mes)
+    fin_mes = inicio_del_dia(TimeWindow.siguiente_bucket(mes, MES))
+    return desde == inicio_mes and hasta == fin_mes and fin_mes <= ahora
+
+
+def clave_invalidacion(mes):
+    return f"{PREFIJO_CACHE}:{mes:%Y-%m}:invalidado"
+
+
+def _timeout_invalidacion():
+    return _config("REPORTES_DB_MAX_DESFASE", 0) * 2 or 3600
+
+
+def invalidar_mes(momento):
+    """
+    Descarta el parcial del mes que contiene `momento` (datetime aware) y
+    anota cuándo, para no volver a guardarlo desde una copia de reportes
+    tomada antes del cambio.
+    """
+    if momento is not None:
+        mes = TimeWindow.inicio_bucket(momento, MES)
+        cache.delete(clave_cache(mes))
+        cache.set(clave_invalidacion(mes), timezone.now(), timeout=_timeout_invalidacion())
+
+
+def invalidar_todo():
+    """
+    Descarta los parciales de todos los meses: las claves pasan a una nueva
+    generación y las anteriores vencen solas. Para escrituras masivas o que
+    no emiten señales.
+    """
+    ahora = timezone.now()
+    cache.set(CLAVE_GENERACION, ahora, timeout=None)
+    cache.set(CLAVE_INVALIDACION_TOTAL, ahora, timeout=_timeout_invalidacion())
+
+
+def _guardable(mes, copia):
+    """
+    Un parcial calculado sobre una copia (o desde el momento `copia`, en la
+    base principal) solo se guarda si ya incluye la última invalidación.
+    """
+    if copia is None:
+        return True
+    invalidaciones = cache.get_many([clave_invalidacion(mes), CLAVE_INVALIDACION_TOTAL]).values()
+    return all(invalidado < copia for invalidado in invalidaciones)
+
+
+# --- EJECUCIÓN ---
+
+_pool = None
+
+
+def _cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _obtener_pool(procesos):
+    global _pool
+    if _pool is None:
+        bases = {alias: str(conf["NAME"]) for alias, conf in settings.DATABASES.items()}
+        _pool = ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=get_context("spawn"),
+            initializer=ejecutor_worker.inicializar,
+            initargs=(bases,),
+        )
+    return _pool
+
+
+def _usar_pool(pendientes, procesos, using):
+    conexion = connections[using]
+    en_memoria = conexion.vendor == "sqlite" and conexion.is_in_memory_db()
+    return len(pendientes) > 1 and procesos > 1 and not en_memoria
+
+
+def ejecutar(ventana, using=None, procesos=None):
+    """
+    Agregados combinados para la ventana. Reutiliza los meses cerrados en
+    caché y calcula el resto, en paralelo si hay más de una partición.
+    Por defecto lee de la base que indique el router (la copia de reportes
+    dentro de `lecturas_de_reportes`).
+    """
+    using = using or router.db_for_read(Parto)
+    if procesos is None:
+        procesos = _config("REPORTES_EJECUTOR_PROCESOS", os.cpu_count() or 1)
+    ahora = timezone.now()
+    generacion_ = generacion()
+
+    parciales, pendientes = [], []
+    for desde, hasta, mes in particiones_mensuales(ventana, using):
+        cacheable = es_cacheable(desde, hasta, mes, ahora)
+        parcial = cache.get(clave_cache(mes, generacion_)) if cacheable else None
+        if cacheable:
+            registrar_cache("reportes_parcial", parcial is not None)
+        if parcial is not None:
+            parciales.append(parcial)
+        else:
+            pendientes.append((desde, hasta, mes, cacheable))
+
+    calculados = None
+    if _usar_pool(pendientes, procesos, using):
+        try:
+            calculados = list(_obtener_pool(procesos).map(ejecutor_worker.calcular, [(d, h, using) for d, h, _, _ in pendientes]))
+        except BrokenProcessPool:
+            logger.exception("Pool de reportes caído; se calcula en el proceso actual")
+            _cerrar_pool()
+    if calculados is None:
+        calculados = [calcular_parcial(d, h, using) for d, h, _, _ in pendientes]
+
+    # En la base principal vale el inicio del cálculo: un cambio confirmado
+    # mientras tanto pudo no verse en las lecturas
+    copia = marca_copia(using) or ahora
+    timeout = _config("REPORTES_PARCIAL_TIMEOUT", 86400)
+    if not cache_compartida():
+        timeout = min(timeout, TIMEOUT_PARCIAL_LOCAL)
+    for (_, _, mes, cacheable), parcial in zip(pendientes, calculados):
+        if cacheable and _guardable(mes, copia):
+            cache.set(clave_cache(mes, generacion_), parcial, timeout=timeout)
+        parciales.append(parcial)
+
+    return combinar(parciales)
@@ -0,0 +1,33 @@
+# reportes/ejecutor_worker.py
+"""
+Punto de entrada de los procesos del pool de `reportes.ejecutor`.
+
+Los workers se crean con `spawn`: este módulo no importa modelos al nivel
+superior para poder cargarse antes de `django.setup()`.
+"""
+
+import os
+
+
+def inicializar(bases):
+    """Arranca Django en el proceso hijo con las mismas bases que el padre."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connections
+
+    for alias, nombre in bases.items():
+        settings.DATABASES[alias]["NAME"] = nombre
+    connections.close_all()
+
+
+def calcular(args):
+    from reportes.ejecutor import calcular_parcial
+    from reportes.profiling import perfilar_trabajo
+
+    desde, hasta, using = args
+    with perfilar_trabajo("reportes_parcial_mensual"):
+        return calcular_parcial(desde, hasta, using)
@@ -0,0 +1,75 @@
+# reportes/exportadores/__init__.py
+"""
+Registro de exportadores de reportes.
+
+Cada formato se registra con la ruta de su función (`"modulo:funcion"`) y no
+con la función misma: el backend (openpyxl, reportlab, ...) se
+importa recién en la primera exportación de ese formato. Así los workers no
+cargan esas librerías al arrancar (`python manage.py benchmark_arranque`
+mide la diferencia con `-X importtime`).
+
+Una función de exportación recibe la vista (con `ReporteFilterMixin`) y el
+request, y devuelve la respuesta HTTP. Los exportadores `streaming` miden
+su propia duración (`medir_exportacion`) mientras generan el cuerpo.
+"""
+
+from django.utils.module_loading import import_string
+
+
+class Exportador:
+    def __init__(self, formato, ruta, content_type, extension=None, streaming=False):
+        self.formato = formato
+        self.ruta = ruta
+        self.content_type = content_type
+        self.extension = extension or formato
+        self.streaming = streaming
+        self._funcion = None
+
+    @property
+    def cargado(self):
+        return self._funcion is not None
+
+    @property
+    def funcion(self):
+        if self._funcion is None:
+            self._funcion = import_string(self.ruta.replace(":", "."))
+        return self._funcion
+
+    def __call__(self, vista, request):
+        return self.funcion(vista, request)
+
+    def __repr__(self):
+        return f"Exportador({self.formato!r}, {self.ruta!r})"
+
+
+_REGISTRO = {}
+
+
+def registrar(formato, ruta, content_type, extension=None, streaming=False):
+    _REGISTRO[formato] = Exportador(formato, ruta, content_type, extension, streaming)
+    return _REGISTRO[formato]
+
+
+def obtener(formato):
+    """Exportador de `formato`; KeyError si no está registrado."""
+    return _REGISTRO[formato]
+
+
+def formatos():
+    return list(_REGISTRO)
+
+
+def precargar():
+    """Importa todos los backends ahora (REPORTES_EXPORTADORES_PRECARGA)."""
+    for exportador in _REGISTRO.values():
+        exportador.funcion
+
+
+registrar(
+    "xlsx", "reportes.exportadores.xlsx:exportar",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+)
+registrar("pdf", "reportes.exportadores.pdf:exportar", "application/pdf")
+registrar("listado_pdf", "reportes.exportadores.pdf:exportar_listado", "application/pdf", extension="pdf")
+registrar("csv", "reportes.exportadores.texto:exportar_csv", "text/csv; charset=utf-8", streaming=True)
+registrar("ndjson", "reportes.exportadores.texto:exportar_ndjson", "application/x-ndjson", streaming=True)
@@ -0,0 +1,31 @@
+# reportes/exportadores/filas.py
+"""Filas del listado de partos compartidas por los exportadores tabulares."""
+
+from django.utils import timezone
+
+COLUMNAS = ["Fecha", "Paciente", "Edad", "Pueblo", "Educación", "Tipo", "Posición", "Sexo RN", "Peso", "Talla"]
+
+
+def filas_partos(partos_qs):
+    hoy = timezone.now().date()
+    partos = partos_qs.select_related(
+        'paciente', 'tipo_parto', 'paciente__pueblo_originario', 'paciente__nacionalidad'
+    ).prefetch_related('recien_nacidos')
+    for p in partos:
+        rn = p.recien_nacidos.first()
+        edad = "N/A"
+        if p.paciente.fecha_nacimiento:
+            fn = p.paciente.fecha_nacimiento
+            edad = hoy.year - fn.year - ((hoy.month, hoy.day) < (fn.month, fn.day))
+
+        # Nombres seguros de FKs
+        pueblo = p.paciente.pueblo_originario.nombre if p.paciente.pueblo_originario else "-"
+        tipo_p = p.tipo_parto.nombre if p.tipo_parto else "-"
+
+        yield [
+            p.fecha_hora.strftime('%d/%m/%Y %H:%M'),
+            str(p.paciente), edad,
+            pueblo, p.paciente.get_nivel_educacional_display(),
+            tipo_p, p.get_posicion_parto_display(),
+            rn.get_sexo_display() if rn else "-", rn.peso_gramos if rn else "-", rn.talla_cm if rn else "-"
+        ]
@@ -0,0 +1,247 @@
+# reportes/exportadores/pdf.py
+"""
+PDF de reportes generados directamente con platypus (reportlab), sin pasar
+por HTML.
+
+`escribir_pdf` arma el documento desde un iterable de flowables que se
+consume a medida que se pagina, y lo escribe en un archivo temporal que se
+sirve con `FileResponse`. `tabla_paginada` convierte un iterable de filas en
+tablas de FILAS_POR_TABLA filas con el encabezado repetido en cada página:
+las filas de un listado se leen y paginan por bloques, sin armar el listado
+completo ni un HTML intermedio.
+"""
+
+import tempfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.http import FileResponse
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from . import obtener
+
+FILAS_POR_TABLA = 200
+
+_BASE = getSampleStyleSheet()
+ESTILOS = {
+    "titulo": ParagraphStyle("titulo", parent=_BASE["Title"], fontSize=16, textColor=colors.HexColor("#2c3e50")),
+    "meta": ParagraphStyle("meta", parent=_BASE["Normal"], fontSize=8, alignment=TA_CENTER, textColor=colors.HexColor("#7f8c8d")),
+    "seccion": ParagraphStyle(
+        "seccion", parent=_BASE["Heading2"], fontSize=12, textColor=colors.HexColor("#16a085"), spaceBefore=12
+    ),
+    "subseccion": ParagraphStyle("subseccion", parent=_BASE["Heading3"], fontSize=10),
+    "celda": ParagraphStyle("celda", parent=_BASE["Normal"], fontSize=8, leading=10),
+}
+
+ESTILO_TABLA = TableStyle([
+    ("FONT", (0, 0), (-1, -1), "Helvetica", 8),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold", 8),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#ecf0f1")),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#bdc3c7")),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("TOPPADDING", (0, 0), (-1, -1), 2),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+])
+
+
+class _FlowablesPerezosos(list):
+    """
+    Lista que platypus consume desde el frente (`build` solo usa len, [0],
+    del e insert) y que se rellena desde un iterable: mantiene unos pocos
+    flowables por delante para `keepWithNext`.
+    """
+
+    def __init__(self, fuente, reserva=4):
+        super().__init__()
+        self._fuente = iter(fuente)
+        self._reserva = reserva
+
+    def __len__(self):
+        while self._fuente is not None and list.__len__(self) < self._reserva:
+            try:
+                self.append(next(self._fuente))
+            except StopIteration:
+                self._fuente = None
+        return list.__len__(self)
+
+
+def _texto(valor, largo):
+    if valor is None:
+        return ""
+    texto = str(valor)
+    return texto if len(texto) <= largo else f"{texto[:largo - 1]}…"
+
+
+def tabla(encabezados, filas, anchos=None):
+    """Tabla chica (resúmenes), con el encabezado repetido si cruza de página."""
+    return Table([encabezados, *filas], colWidths=anchos, repeatRows=1, style=ESTILO_TABLA, hAlign="LEFT")
+
+
+def tabla_paginada(encabezados, filas, anchos, largos=None):
+    """
+    Tablas sucesivas de FILAS_POR_TABLA filas. `largos` trunca cada columna a
+    esa cantidad de caracteres (las celdas son texto plano, sin ajuste de línea).
+    """
+    largos = largos or [60] * len(encabezados)
+    bloque = []
+    for fila in filas:
+        bloque.append([_texto(valor, largo) for valor, largo in zip(fila, largos)])
+        if len(bloque) == FILAS_POR_TABLA:
+            yield tabla(encabezados, bloque, anchos)
+            bloque = []
+    if bloque:
+        yield tabla(encabezados, bloque, anchos)
+
+
+def _numerar(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 7)
+    canvas.setFillColor(colors.HexColor("#7f8c8d"))
+    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, doc.bottomMargin / 2, f"Página {doc.page}")
+    canvas.restoreState()
+
+
+def escribir_pdf(flowables, titulo="", pagesize=letter):
+    """Escribe el PDF en un archivo temporal y lo devuelve rebobinado."""
+    archivo = tempfile.TemporaryFile(suffix=".pdf")
+    doc = SimpleDocTemplate(
+        archivo, pagesize=pagesize, title=titulo,
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+    )
+    doc.build(_FlowablesPerezosos(flowables), onFirstPage=_numerar, onLaterPages=_numerar)
+    archivo.seek(0)
+    return archivo
+
+
+def respuesta_pdf(flowables, nombre, titulo="", pagesize=letter):
+    return FileResponse(
+        escribir_pdf(flowables, titulo, pagesize), as_attachment=True, filename=nombre,
+        content_type=obtener("pdf").content_type,
+    )
+
+
+def _encabezado(titulo, f_ini, f_fin):
+    yield Paragraph(titulo, ESTILOS["titulo"])
+    yield Paragraph(
+        f"Generado el: {timezone.localtime():%d/%m/%Y %H:%M}<br/>"
+        # Las fechas vienen tal cual del GET: se escapan para que no se lean como marcado
+        f"Periodo: {escape(f_ini or 'Histórico')} - {escape(f_fin or 'Actualidad')}",
+        ESTILOS["meta"],
+    )
+    yield Spacer(1, 0.4 * cm)
+
+
+def _numero(valor, decimales):
+    return "-" if valor is None else f"{valor:.{decimales}f}"
+
+
+def _lado_a_lado(izquierda, derecha, ancho):
+    contenedor = Table([[izquierda, derecha]], colWidths=[ancho / 2, ancho / 2], hAlign="LEFT")
+    contenedor.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP"), ("LEFTPADDING", (0, 0), (-1, -1), 0)]))
+    return contenedor
+
+
+def _distribucion(titulo, columna, items, clave):
+    return [
+        Paragraph(titulo, ESTILOS["subseccion"]),
+        tabla([columna, "Cant."], [[item[clave], item["total"]] for item in items], [5.5 * cm, 2 * cm]),
+    ]
+
+
+def _resumen(c):
+    yield from _encabezado("Reporte de Gestión Obstétrica", c["fecha_inicio"], c["fecha_final"])
+    yield tabla(
+        ["Indicador", "Total"],
+        [
+            ["Total Partos", c["total_partos"]],
+            ["Total Recién Nacidos", c["total_recien_nacidos"]],
+            ["Complicaciones", c["total_complicaciones"]],
+        ],
+        [6 * cm, 3 * cm],
+    )
+
+    yield Paragraph("Estadísticas Vitales (Promedios)", ESTILOS["seccion"])
+    yield tabla(
+        ["Indicador", "Promedio", "Desviación Estándar"],
+        [
+            ["Peso Recién Nacido", f"{_numero(c['promedio_peso_rn'], 0)} g", f"± {_numero(c['stddev_peso_rn'], 0)}"],
+            ["Talla", f"{_numero(c['promedio_talla_rn'], 1)} cm", f"± {_numero(c['stddev_talla_rn'], 1)}"],
+            ["APGAR (5 min)", _numero(c["promedio_apgar_rn"], 1), f"± {_numero(c['stddev_apgar_rn'], 1)}"],
+        ],
+        [6 * cm, 4 * cm, 4 * cm],
+    )
+
+    ancho = letter[0] - 3 * cm
+    yield Paragraph("Datos del Parto", ESTILOS["seccion"])
+    yield _lado_a_lado(
+        _distribucion("Tipo de Parto", "Tipo", c["distribucion_tipo_parto"], "tipo_display"),
+        _distribucion("Posición del Parto", "Posición", c["distribucion_posicion_parto"], "posicion_display"),
+        ancho,
+    )
+    yield Paragraph("Perfil Demográfico", ESTILOS["seccion"])
+    yield _lado_a_lado(
+        _distribucion("Pueblo Originario", "Pueblo", c["distribucion_pueblos"], "display"),
+        _distribucion("Nivel Educacional", "Nivel", c["distribucion_educacion"], "display"),
+        ancho,
+    )
+
+
+def exportar(vista, request):
+    from reportes.views import ReportesObstetriciaView
+
+    view = ReportesObstetriciaView()
+    view.request = request
+    return respuesta_pdf(_resumen(view.get_context_data()), "Reporte.pdf", "Reporte Obstétrico")
+
+
+# --- LISTADO COMPLETO ---
+
+# (encabezado, ruta de values_list desde Parto, ancho, caracteres)
+COLUMNAS_LISTADO = (
+    ("Fecha", "fecha_hora", 2.6 * cm, 16),
+    ("RUT", "paciente__rut", 2.2 * cm, 12),
+    ("Madre", "paciente__nombre_completo", 5.4 * cm, 34),
+    ("Edad", "edad_materna_parto", 1.1 * cm, 3),
+    ("Tipo parto", "tipo_parto__nombre", 3 * cm, 18),
+    ("RN", "recien_nacidos__identificador", 2.4 * cm, 14),
+    ("Sexo", "recien_nacidos__sexo", 1.1 * cm, 2),
+    ("Peso (g)", "recien_nacidos__peso_gramos", 1.5 * cm, 5),
+    ("Talla", "recien_nacidos__talla_cm", 1.2 * cm, 4),
+    ("APGAR 5", "recien_nacidos__apgar5", 1.4 * cm, 3),
+    ("EG", "recien_nacidos__edad_gestacional_semanas", 1 * cm, 3),
+    ("Alta", "alta__fecha_alta", 2.6 * cm, 16),
+)
+
+
+def filas_listado(partos_qs):
+    for fila in (
+        partos_qs.order_by("fecha_hora", "id", "recien_nacidos__id")
+        .values_list(*(ruta for _, ruta, _, _ in COLUMNAS_LISTADO))
+        .iterator(chunk_size=FILAS_POR_TABLA * 10)
+    ):
+        yield [
+            f"{timezone.localtime(valor):%d/%m/%Y %H:%M}" if isinstance(valor, datetime) else valor
+            for valor in fila
+        ]
+
+
+def exportar_listado(vista, request):
+    partos_qs, _, _, f_ini, f_fin = vista.get_filtered_querysets(request)
+
+    def flowables():
+        yield from _encabezado("Listado de Partos y Recién Nacidos", f_ini, f_fin)
+        yield from tabla_paginada(
+            [titulo for titulo, _, _, _ in COLUMNAS_LISTADO],
+            filas_listado(partos_qs),
+            [ancho for _, _, ancho, _ in COLUMNAS_LISTADO],
+            [largo for _, _, _, largo in COLUMNAS_LISTADO],
+        )
+
+    nombre = f"Listado_Partos_{timezone.localdate():%Y%m%d}.pdf"
+    return respuesta_pdf(flowables(), nombre, "Listado de Partos", landscape(letter))
@@ -0,0 +1,142 @@
+# reportes/exportadores/texto.py
+"""
+Exportaciones en streaming (CSV y NDJSON) de partos con la madre, los recién
+nacidos y el alta, para estadística e integraciones.
+
+Una fila por recién nacido (o una sola por parto sin recién nacidos), con
+los códigos tal como están en la base y fechas ISO 8601. Se leen con
+`values_list().iterator()` y se envían en lotes por `StreamingHttpResponse`,
+así que la memoria no crece con la cantidad de filas. Con `?gzip=1` la
+salida se comprime al vuelo (`.csv.gz` / `.ndjson.gz`).
+
+La base (copia de reportes o principal) se fija al crear la respuesta: el
+cuerpo se genera después de que la vista devuelve, fuera de
+`lecturas_de_reportes()`.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from django.db import DEFAULT_DB_ALIAS, router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from clinica.models import Parto
+from core.metrics import medir_exportacion
+
+from . import obtener
+
+# (columna, ruta de values_list desde Parto)
+COLUMNAS = (
+    ("parto_id", "id"),
+    ("fecha_hora", "fecha_hora"),
+    ("fecha_ingreso", "fecha_ingreso"),
+    ("rut_madre", "paciente__rut"),
+    ("nombre_madre", "paciente__nombre_completo"),
+    ("fecha_nacimiento_madre", "paciente__fecha_nacimiento"),
+    ("edad_materna", "edad_materna_parto"),
+    ("nacionalidad", "paciente__nacionalidad__nombre"),
+    ("pueblo_originario", "paciente__pueblo_originario__nombre"),
+    ("nivel_educacional", "paciente__nivel_educacional"),
+    ("estado_civil", "paciente__estado_civil"),
+    ("paridad", "paridad"),
+    ("control_prenatal", "control_prenatal"),
+    ("tipo_parto", "tipo_parto__nombre"),
+    ("posicion_parto", "posicion_parto"),
+    ("duracion_trabajo_parto_min", "duracion_trabajo_parto_min"),
+    ("rn_identificador", "recien_nacidos__identificador"),
+    ("rn_sexo", "recien_nacidos__sexo"),
+    ("rn_peso_gramos", "recien_nacidos__peso_gramos"),
+    ("rn_talla_cm", "recien_nacidos__talla_cm"),
+    ("rn_apgar1", "recien_nacidos__apgar1"),
+    ("rn_apgar5", "recien_nacidos__apgar5"),
+    ("rn_edad_gestacional_semanas", "recien_nacidos__edad_gestacional_semanas"),
+    ("alta_fecha", "alta__fecha_alta"),
+    ("alta_tipo", "alta__tipo_alta"),
+    ("alta_requiere_seguimiento", "alta__requiere_seguimiento"),
+)
+ENCABEZADOS = [columna for columna, _ in COLUMNAS]
+
+FILAS_POR_LOTE = 2000
+
+
+def filas(partos_qs, using=DEFAULT_DB_ALIAS):
+    """Tuplas de COLUMNAS en orden de fecha, leídas por lotes."""
+    return (
+        partos_qs.using(using)
+        .order_by("fecha_hora", "id", "recien_nacidos__id")
+        .values_list(*(ruta for _, ruta in COLUMNAS))
+        .iterator(chunk_size=FILAS_POR_LOTE)
+    )
+
+
+def _iso(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def _lotes_csv(filas_):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(ENCABEZADOS)
+    for n, fila in enumerate(filas_, 1):
+        escritor.writerow([_iso(valor) for valor in fila])
+        if n % FILAS_POR_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _lotes_ndjson(filas_):
+    lote = []
+    for fila in filas_:
+        lote.append(json.dumps(dict(zip(ENCABEZADOS, map(_iso, fila))), ensure_ascii=False))
+        if len(lote) == FILAS_POR_LOTE:
+            yield "\n".join(lote) + "\n"
+            lote = []
+    if lote:
+        yield "\n".join(lote) + "\n"
+
+
+def _gzip(trozos):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: cabecera gzip
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def _exportar(vista, request, formato, lotes):
+    exportador = obtener(formato)
+    partos_qs, *_ = vista.get_filtered_querysets(request)
+    using = router.db_for_read(Parto) or DEFAULT_DB_ALIAS
+    comprimir = request.GET.get("gzip") in ("1", "true", "si")
+
+    def cuerpo():
+        # La duración abarca toda la generación, no solo la creación de la respuesta
+        with medir_exportacion(formato):
+            trozos = (lote.encode("utf-8") for lote in lotes(filas(partos_qs, using)))
+            yield from _gzip(trozos) if comprimir else trozos
+
+    nombre = f'Partos_{timezone.localdate().strftime("%Y%m%d")}.{exportador.extension}'
+    response = StreamingHttpResponse(
+        cuerpo(), content_type="application/gzip" if comprimir else exportador.content_type
+    )
+    response["Content-Disposition"] = f'attachment; filename={nombre}{".gz" if comprimir else ""}'
+    return response
+
+
+def exportar_csv(vista, request):
+    return _exportar(vista, request, "csv", _lotes_csv)
+
+
+def exportar_ndjson(vista, request):
+    return _exportar(vista, request, "ndjson", _lotes_ndjson)
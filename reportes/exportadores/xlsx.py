@@ -0,0 +1,35 @@
+# reportes/exportadores/xlsx.py
+
+from datetime import datetime
+
+import openpyxl
+from django.http import HttpResponse
+from openpyxl.styles import Font, PatternFill
+
+from . import obtener
+from .filas import COLUMNAS, filas_partos
+
+
+def exportar(vista, request):
+    partos_qs, _, _, f_ini, f_fin = vista.get_filtered_querysets(request)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Resumen Obstétrico"
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill("solid", fgColor="4F81BD")
+
+    ws['A1'] = f"Reporte: {f_ini or 'Histórico'} - {f_fin or 'Hoy'}"
+    ws['A3'] = "Total Partos"; ws['B3'] = partos_qs.count()
+
+    for idx, title in enumerate(COLUMNAS, 1):
+        c = ws.cell(row=6, column=idx, value=title)
+        c.font = header_font; c.fill = header_fill
+
+    for fila in filas_partos(partos_qs):
+        ws.append(fila)
+
+    response = HttpResponse(content_type=obtener("xlsx").content_type)
+    response['Content-Disposition'] = f'attachment; filename=Reporte_{datetime.now().strftime("%Y%m%d")}.xlsx'
+    wb.save(response)
+    return response
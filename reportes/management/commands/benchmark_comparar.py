@@ -0,0 +1,45 @@
+# reportes/management/commands/benchmark_comparar.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reportes import benchmark
+
+
+class Command(BaseCommand):
+    help = "Compara una corrida de benchmark contra la línea base y marca regresiones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("base", help="JSON de línea base.")
+        parser.add_argument("actual", help="JSON de la corrida a evaluar.")
+        parser.add_argument(
+            "--umbral",
+            type=float,
+            default=0.15,
+            help="Aumento relativo tolerado en tiempo y memoria (0.15 = 15%%).",
+        )
+        parser.add_argument(
+            "--piso-ms",
+            type=float,
+            default=5.0,
+            help="Diferencia mínima de tiempo (ms) para considerar regresión.",
+        )
+
+    def handle(self, *args, **options):
+        base = benchmark.cargar(options["base"])
+        actual = benchmark.cargar(options["actual"])
+
+        for nombre, nuevo in actual["resultados"].items():
+            previo = base["resultados"].get(nombre)
+            if previo:
+                cambio = (nuevo["tiempo_ms"] - previo["tiempo_ms"]) / (previo["tiempo_ms"] or 1) * 100
+                self.stdout.write(
+                    f"{nombre:<45} {previo['tiempo_ms']:>9.1f} -> {nuevo['tiempo_ms']:>9.1f} ms "
+                    f"({cambio:+.0f}%)  {previo['consultas']} -> {nuevo['consultas']} q"
+                )
+
+        regresiones = benchmark.comparar(base, actual, options["umbral"], options["piso_ms"])
+        if regresiones:
+            for nombre, metrica, antes, despues in regresiones:
+                self.stderr.write(f"REGRESIÓN {nombre}: {metrica} {antes} -> {despues}")
+            raise CommandError(f"{len(regresiones)} regresiones sobre el umbral.")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones."))
@@ -0,0 +1,43 @@
+# reportes/management/commands/benchmark_reportes.py
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reportes import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempo, consultas SQL y memoria pico de las vistas pesadas "
+        "(pacientes, home, dashboard, gráficos, exportaciones, auditoría) "
+        "y guarda el resultado en un archivo JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--salida",
+            default=str(Path(settings.BASE_DIR) / "benchmarks" / "actual.json"),
+            help="Ruta del JSON de resultados.",
+        )
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--solo", default=None, help="Ejecuta solo escenarios que contengan este texto.")
+
+    def handle(self, *args, **options):
+        datos = benchmark.ejecutar(
+            repeticiones=options["repeticiones"],
+            filtro=options["solo"],
+            salida=self.stdout.write,
+        )
+        volumen = datos["meta"]["volumen"]
+        if volumen["partos"] < 10_000:
+            self.stdout.write(self.style.WARNING(
+                f"Solo hay {volumen['partos']} partos: considera `generar_datos_sinteticos` "
+                "antes de tomar una línea base."
+            ))
+
+        salida = Path(options["salida"])
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        benchmark.guardar(datos, salida)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {salida}"))
@@ -0,0 +1,28 @@
+# reportes/management/commands/construir_snapshot.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes.profiling import perfilar_trabajo
+from reportes.snapshot import construir
+
+
+class Command(BaseCommand):
+    help = "Construye (incremental) el snapshot columnar de partos, RN y pacientes para la analítica."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--completo", action="store_true", help="Ignora la generación anterior y exporta todo.")
+        parser.add_argument("--directorio", help="Por defecto REPORTES_SNAPSHOT_DIR.")
+        parser.add_argument("--database", default=None, help="Alias de base de datos de origen.")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        with perfilar_trabajo("construir_snapshot"):
+            manifiesto = construir(options["directorio"], using=options["database"], completo=options["completo"])
+        for tabla, estadistica in manifiesto["construccion"].items():
+            detalle = ", ".join(f"{k}={v}" for k, v in estadistica.items())
+            self.stdout.write(f"{tabla}: {manifiesto['tablas'][tabla]['filas']} filas ({detalle})")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generación {manifiesto['generacion']} publicada en {time.perf_counter() - inicio:.2f}s"
+        ))
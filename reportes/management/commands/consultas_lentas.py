@@ -0,0 +1,51 @@
+# reportes/management/commands/consultas_lentas.py
+
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Agrega el registro de consultas lentas por huella SQL y muestra las más costosas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--solo-scan", action="store_true", help="Solo consultas con recorrido completo de tabla.")
+
+    def handle(self, *args, **options):
+        agregados = {}
+        archivos = sorted(glob.glob(settings.CONSULTAS_LENTAS_ARCHIVO + "*"))
+        for archivo in archivos:
+            with open(archivo, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        continue
+                    item = agregados.setdefault(registro["huella"], {
+                        "sql": registro["sql"], "plan": registro["plan"], "scan": registro["scan_completo"],
+                        "origenes": set(), "veces": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    })
+                    item["veces"] += 1
+                    item["total_ms"] += registro["ms"]
+                    item["max_ms"] = max(item["max_ms"], registro["ms"])
+                    item["origenes"].add(registro["origen"])
+
+        if not agregados:
+            self.stdout.write("No hay consultas lentas registradas.")
+            return
+
+        items = sorted(agregados.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        if options["solo_scan"]:
+            items = [kv for kv in items if kv[1]["scan"]]
+        for clave, item in items[:options["top"]]:
+            marca = self.style.WARNING(" [SCAN]") if item["scan"] else ""
+            self.stdout.write(
+                f"{clave}{marca} veces={item['veces']} total={item['total_ms']:.0f}ms "
+                f"max={item['max_ms']:.0f}ms origen={', '.join(sorted(item['origenes']))}"
+            )
+            self.stdout.write(f"  {item['sql'][:300]}")
+            for paso in item["plan"] or []:
+                self.stdout.write(f"    {paso}")
@@ -0,0 +1,27 @@
+# reportes/management/commands/refrescar_base_reportes.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db_router import edad_copia, refrescar_copia
+
+
+class Command(BaseCommand):
+    help = "Refresca la copia de solo lectura que usan los reportes (backup en línea de SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--si-mayor-a", type=int, default=0,
+            help="Solo refresca si la copia actual tiene más de N segundos.",
+        )
+        parser.add_argument("--paginas", type=int, default=1024, help="Páginas copiadas por paso del backup.")
+
+    def handle(self, *args, **options):
+        edad = edad_copia()
+        if edad is not None and edad < options["si_mayor_a"]:
+            self.stdout.write(f"La copia tiene {edad:.0f}s; no se refresca.")
+            return
+        duracion = refrescar_copia(paginas=options["paginas"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Copia de reportes actualizada en {settings.REPORTES_DB_ARCHIVO} ({duracion:.2f}s)"
+        ))
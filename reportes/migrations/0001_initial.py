@@ -0,0 +1,91 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PerfilEjecucion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("request", "Petición HTTP"),
+                            ("trabajo", "Trabajo en segundo plano"),
+                        ],
+                        max_length=10,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                (
+                    "nombre",
+                    models.CharField(max_length=150, verbose_name="Vista o trabajo"),
+                ),
+                (
+                    "ruta",
+                    models.CharField(blank=True, max_length=255, verbose_name="Ruta"),
+                ),
+                (
+                    "metodo",
+                    models.CharField(blank=True, max_length=10, verbose_name="Método"),
+                ),
+                (
+                    "disparador",
+                    models.CharField(
+                        choices=[
+                            ("muestreo", "Muestreo aleatorio"),
+                            ("cabecera", "Solicitado por cabecera"),
+                            ("manual", "Manual"),
+                        ],
+                        max_length=10,
+                        verbose_name="Disparador",
+                    ),
+                ),
+                ("duracion_ms", models.FloatField(verbose_name="Duración (ms)")),
+                (
+                    "archivo",
+                    models.CharField(max_length=255, verbose_name="Archivo de perfil"),
+                ),
+                (
+                    "fecha",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Fecha"),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Perfil de ejecución",
+                "verbose_name_plural": "Perfiles de ejecución",
+                "ordering": ["-fecha"],
+                "indexes": [models.Index(fields=["fecha"], name="idx_perfil_fecha")],
+            },
+        ),
+    ]
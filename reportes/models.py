@@ -1,3 +1,48 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class PerfilEjecucion(models.Model):
+    """Perfil cProfile capturado para una petición o un trabajo en segundo plano."""
+
+    class TipoChoices(models.TextChoices):
+        REQUEST = "request", _("Petición HTTP")
+        TRABAJO = "trabajo", _("Trabajo en segundo plano")
+
+    class DisparadorChoices(models.TextChoices):
+        MUESTREO = "muestreo", _("Muestreo aleatorio")
+        CABECERA = "cabecera", _("Solicitado por cabecera")
+        MANUAL = "manual", _("Manual")
+
+    tipo = models.CharField(_("Tipo"), max_length=10, choices=TipoChoices.choices)
+    nombre = models.CharField(_("Vista o trabajo"), max_length=150)
+    ruta = models.CharField(_("Ruta"), max_length=255, blank=True)
+    metodo = models.CharField(_("Método"), max_length=10, blank=True)
+    disparador = models.CharField(_("Disparador"), max_length=10, choices=DisparadorChoices.choices)
+    duracion_ms = models.FloatField(_("Duración (ms)"))
+    archivo = models.CharField(_("Archivo de perfil"), max_length=255)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("Usuario"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    fecha = models.DateTimeField(_("Fecha"), auto_now_add=True)
+
+    class Meta:
+        ordering = ["-fecha"]
+        verbose_name = _("Perfil de ejecución")
+        verbose_name_plural = _("Perfiles de ejecución")
+        indexes = [
+            models.Index(fields=["fecha"], name="idx_perfil_fecha"),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.duracion_ms:.0f} ms)"
+
+    def delete(self, *args, **kwargs):
+        default_storage.delete(self.archivo)
+        return super().delete(*args, **kwargs)
@@ -0,0 +1,192 @@
+# reportes/profiling.py
+"""
+Perfilado opcional con cProfile para vistas y trabajos en segundo plano.
+
+- Un porcentaje configurable de peticiones (PROFILING_TASA_MUESTREO) se
+  perfila automáticamente.
+- Usuarios con ACCESO TOTAL pueden pedir un perfil enviando la cabecera
+  `X-Profile: 1`.
+- Los trabajos en segundo plano usan `perfilar_trabajo(nombre)`.
+
+Los perfiles se guardan en MEDIA_ROOT/perfiles/ y se consultan desde el
+admin (PerfilEjecucion) como tablas de tiempo acumulado.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from core.escrituras import diferir
+from core.mixins import tiene_acceso_total
+
+CABECERA = "X-Profile"
+
+# cProfile no admite dos perfiladores activos en el mismo hilo: un trabajo que
+# corre en línea dentro de una petición perfilada queda incluido en ese perfil
+_hilo = threading.local()
+
+
+def _perfilando():
+    return getattr(_hilo, "activo", False)
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def guardar_perfil(perfil, duracion_ms, **datos):
+    """Persiste las estadísticas de un cProfile.Profile y aplica la retención."""
+    from reportes.models import PerfilEjecucion
+
+    perfil.create_stats()
+    nombre_archivo = timezone.now().strftime("perfiles/%Y/%m/") + f"{uuid.uuid4().hex}.prof"
+    nombre_archivo = default_storage.save(nombre_archivo, ContentFile(marshal.dumps(perfil.stats)))
+    registro = PerfilEjecucion.objects.create(archivo=nombre_archivo, duracion_ms=duracion_ms, **datos)
+    diferir(aplicar_retencion, operacion="retencion_perfiles")
+    return registro
+
+
+def aplicar_retencion():
+    from reportes.models import PerfilEjecucion
+
+    limite_fecha = timezone.now() - timedelta(days=_config("PROFILING_RETENCION_DIAS", 7))
+    vencidos = list(PerfilEjecucion.objects.filter(fecha__lt=limite_fecha))
+    vencidos += list(PerfilEjecucion.objects.all()[_config("PROFILING_MAX_PERFILES", 200):])
+    for perfil in {p.pk: p for p in vencidos}.values():
+        perfil.delete()
+
+
+def tabla_acumulada(archivo, top=None):
+    """Top-N de funciones por tiempo acumulado: lista de dicts."""
+    top = top or _config("PROFILING_TOP_N", 40)
+    with default_storage.open(archivo, "rb") as f:
+        datos = marshal.loads(f.read())
+
+    stats = pstats.Stats(_PerfilCargado(datos), stream=io.StringIO())
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    filas = []
+    for funcion in stats.fcn_list[:top]:
+        primitivas, llamadas, propio, acumulado, _ = stats.stats[funcion]
+        archivo_fuente, linea, nombre = funcion
+        filas.append({
+            "llamadas": llamadas if llamadas == primitivas else f"{llamadas}/{primitivas}",
+            "propio_ms": propio * 1000,
+            "acumulado_ms": acumulado * 1000,
+            "funcion": f"{archivo_fuente}:{linea}({nombre})",
+        })
+    return filas
+
+
+class _PerfilCargado:
+    """Adaptador mínimo para que pstats.Stats acepte estadísticas ya cargadas."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# --- PETICIONES ---
+
+class ProfilingMiddleware:
+    """
+    Debe ir al final de MIDDLEWARE. `process_view` decide si se perfila y
+    enciende el perfilador; la vista corre por el camino normal de Django
+    (ATOMIC_REQUESTS, process_exception, render de TemplateResponse) y el
+    perfil se cierra al volver `get_response`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._perfilado = None
+        try:
+            response = self.get_response(request)
+        finally:
+            perfilado = request._perfilado
+            if perfilado is not None:
+                perfilado[0].disable()
+                _hilo.activo = False
+        if perfilado is not None:
+            self.guardar(request, response, *perfilado)
+        return response
+
+    def disparador(self, request, view_func):
+        apps = _config("PROFILING_APPS", ["clinica", "reportes", "homeApp"])
+        if view_func.__module__.split(".")[0] not in apps:
+            return None
+        if request.headers.get(CABECERA) and tiene_acceso_total(request.user):
+            return "cabecera"
+        tasa = _config("PROFILING_TASA_MUESTREO", 0.0)
+        if tasa and random.random() < tasa:
+            return "muestreo"
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        disparador = None if _perfilando() else self.disparador(request, view_func)
+        if disparador is not None:
+            perfil = cProfile.Profile()
+            request._perfilado = (perfil, time.perf_counter(), disparador, view_func.__name__)
+            _hilo.activo = True
+            perfil.enable()
+        return None
+
+    def guardar(self, request, response, perfil, inicio, disparador, nombre_vista):
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        match = request.resolver_match
+        registro = guardar_perfil(
+            perfil,
+            duracion_ms,
+            tipo="request",
+            nombre=(match.view_name if match and match.view_name else nombre_vista)[:150],
+            ruta=request.path[:255],
+            metodo=request.method,
+            disparador=disparador,
+            usuario=request.user if request.user.is_authenticated else None,
+        )
+        response["X-Profile-Id"] = str(registro.pk)
+
+
+# --- TRABAJOS EN SEGUNDO PLANO ---
+
+@contextmanager
+def perfilar_trabajo(nombre, forzar=False):
+    """
+    Perfila un trabajo en segundo plano según PROFILING_TASA_TRABAJOS
+    (o siempre, con forzar=True). También sirve como decorador.
+    """
+    tasa = _config("PROFILING_TASA_TRABAJOS", 0.0)
+    if _perfilando() or not (forzar or (tasa and random.random() < tasa)):
+        yield
+        return
+
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    _hilo.activo = True
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        _hilo.activo = False
+        guardar_perfil(
+            perfil,
+            (time.perf_counter() - inicio) * 1000,
+            tipo="trabajo",
+            nombre=nombre[:150],
+            disparador="manual" if forzar else "muestreo",
+        )
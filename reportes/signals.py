@@ -0,0 +1,41 @@
+# reportes/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clinica.models import Parto, RecienNacido, TipoParto
+
+from .ejecutor import invalidar_mes, invalidar_todo
+
+
+# --- INVALIDACIÓN DE PARCIALES MENSUALES ---
+# Al confirmarse la transacción: antes, un reporte concurrente todavía lee
+# las filas anteriores y volvería a guardar el mes recién invalidado.
+
+def _invalidar_meses(*momentos):
+    transaction.on_commit(lambda: [invalidar_mes(momento) for momento in momentos])
+
+
+@receiver(post_save, sender=Parto)
+@receiver(post_delete, sender=Parto)
+def invalidar_parcial_parto(sender, instance, **kwargs):
+    # Si se corrigió la fecha, también cambia el mes anterior
+    estado_antiguo = getattr(instance, "_estado_antiguo", None) or {}
+    _invalidar_meses(instance.fecha_hora, estado_antiguo.get("fecha_hora"))
+
+
+@receiver(post_save, sender=RecienNacido)
+@receiver(post_delete, sender=RecienNacido)
+def invalidar_parcial_rn(sender, instance, **kwargs):
+    parto = Parto.objects.filter(pk=instance.parto_id).only("fecha_hora").first()
+    if parto:
+        _invalidar_meses(parto.fecha_hora)
+
+
+@receiver(post_save, sender=TipoParto)
+@receiver(post_delete, sender=TipoParto)
+def invalidar_parciales_tipo_parto(sender, instance, created=False, **kwargs):
+    # Los parciales agrupan por nombre: renombrar un tipo cambia todos los meses
+    if not created:
+        transaction.on_commit(invalidar_todo)
@@ -0,0 +1,416 @@
+# reportes/snapshot.py
+"""
+Snapshot columnar de partos, RN y pacientes para la analítica.
+
+`construir()` exporta las columnas que usan los reportes a un directorio de
+arreglos NumPy tipados (un `.npy` por columna). Los lectores los abren con
+`np.load(mmap_mode="r")`, que devuelve un `np.memmap`: el sistema operativo
+pagina solo lo que se toca y varios procesos comparten las mismas páginas.
+Filtros por ventana y agrupaciones son operaciones vectorizadas sobre esas
+columnas, sin pasar por la base OLTP.
+
+Formato:
+- Fechas como segundos UTC (int64), medidas como float32 (NaN = sin dato) y
+  categorías codificadas con diccionario (int32, -1 = vacío). Los
+  diccionarios van en `manifiesto.json`.
+- Cada construcción escribe una generación nueva (`g<marca>/`) y luego
+  reemplaza el archivo `ACTUAL` de forma atómica; un lector nunca ve una
+  generación a medio escribir.
+
+La construcción es incremental: se agregan las filas con pk mayor al último
+exportado y se reescriben las que tienen `fecha_actualizacion` posterior a
+la marca anterior (con un margen para transacciones que confirmaron tarde).
+Si la cantidad de filas ya exportadas no calza (hubo borrados) la tabla se
+reconstruye completa. Renombrar un catálogo (tipo de parto, pueblo,
+nacionalidad) no toca `fecha_actualizacion` de las filas: en ese caso
+conviene `construir_snapshot --completo`.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils import timezone
+
+from clinica.models import Paciente, Parto, RecienNacido
+
+from .cohortes import DISTRIBUCIONES_DEMOGRAFICAS
+
+FORMATO = 1
+ARCHIVO_ACTUAL = "ACTUAL"
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+GENERACIONES_RETENIDAS = 2
+MARGEN_RELECTURA = timedelta(seconds=60)
+LOTE = 20000
+
+ENTERO = "entero"
+FECHA = "fecha"
+MEDIDA = "medida"
+CATEGORIA = "categoria"
+BANDERA = "bandera"
+
+TIPOS = {
+    ENTERO: np.int64,
+    FECHA: np.int64,
+    MEDIDA: np.float32,
+    CATEGORIA: np.int32,
+    BANDERA: np.bool_,
+}
+
+
+class Tabla:
+    """Columnas exportadas de un modelo: [(columna, origen en values_list, tipo)]."""
+
+    def __init__(self, modelo, columnas, anotaciones=None, depende_de=None):
+        self.modelo = modelo
+        self.columnas = columnas
+        self.anotaciones = anotaciones or {}
+        # Relación cuya actualización también cambia filas de esta tabla
+        # (la fecha del parto está desnormalizada en los RN)
+        self.depende_de = depende_de
+
+    def queryset(self, using):
+        return self.modelo.objects.using(using).annotate(**self.anotaciones).order_by("pk")
+
+
+TABLAS = {
+    "partos": Tabla(
+        Parto,
+        [
+            ("id", "id", ENTERO),
+            ("paciente_id", "paciente_id", ENTERO),
+            ("fecha_hora", "fecha_hora", FECHA),
+            ("tipo_parto", "tipo_parto__nombre", CATEGORIA),
+            ("posicion_parto", "posicion_parto", CATEGORIA),
+            ("complicado", "complicado", BANDERA),
+        ],
+        anotaciones={
+            "complicado": ExpressionWrapper(
+                ~Q(complicaciones__isnull=True) & ~Q(complicaciones=""), output_field=BooleanField()
+            ),
+        },
+    ),
+    "rn": Tabla(
+        RecienNacido,
+        [
+            ("id", "id", ENTERO),
+            ("parto_id", "parto_id", ENTERO),
+            ("fecha_hora", "parto__fecha_hora", FECHA),
+            ("sexo", "sexo", CATEGORIA),
+            ("peso_gramos", "peso_gramos", MEDIDA),
+            ("talla_cm", "talla_cm", MEDIDA),
+            ("apgar5", "apgar5", MEDIDA),
+            ("edad_gestacional_semanas", "edad_gestacional_semanas", MEDIDA),
+        ],
+        depende_de="parto",
+    ),
+    "pacientes": Tabla(
+        Paciente,
+        [("id", "id", ENTERO)] + [(campo, campo, CATEGORIA) for campo in DISTRIBUCIONES_DEMOGRAFICAS],
+    ),
+}
+
+
+def _segundos(momento):
+    return int(momento.timestamp())
+
+
+# --- CONSTRUCCIÓN ---
+
+def _leer(tabla, queryset, diccionarios):
+    """Lee el queryset por lotes y devuelve {columna: arreglo tipado}."""
+    nombres = [c for c, _, _ in tabla.columnas]
+    origenes = [o for _, o, _ in tabla.columnas]
+    tipos = [t for _, _, t in tabla.columnas]
+    codigos = {c: {v: i for i, v in enumerate(diccionarios.setdefault(c, []))} for c, _, t in tabla.columnas if t == CATEGORIA}
+
+    partes = {c: [] for c in nombres}
+    crudos = {c: [] for c in nombres}
+
+    def volcar():
+        for nombre, tipo in zip(nombres, tipos):
+            valores = crudos[nombre]
+            if tipo == FECHA:
+                valores = [_segundos(v) for v in valores]
+            elif tipo == MEDIDA:
+                valores = [np.nan if v is None else v for v in valores]
+            elif tipo == CATEGORIA:
+                mapa, lista = codigos[nombre], diccionarios[nombre]
+                convertidos = []
+                for v in valores:
+                    if v in (None, ""):
+                        convertidos.append(-1)
+                        continue
+                    if v not in mapa:
+                        mapa[v] = len(lista)
+                        lista.append(v)
+                    convertidos.append(mapa[v])
+                valores = convertidos
+            partes[nombre].append(np.array(valores, dtype=TIPOS[tipo]))
+            crudos[nombre] = []
+
+    pendientes = 0
+    for fila in queryset.values_list(*origenes).iterator(chunk_size=LOTE):
+        for nombre, valor in zip(nombres, fila):
+            crudos[nombre].append(valor)
+        pendientes += 1
+        if pendientes == LOTE:
+            volcar()
+            pendientes = 0
+    volcar()
+    return {
+        nombre: np.concatenate(partes[nombre]) if partes[nombre] else np.empty(0, dtype=TIPOS[tipo])
+        for nombre, tipo in zip(nombres, tipos)
+    }
+
+
+def _construir_tabla(nombre, tabla, using, anterior, marca_anterior):
+    """Devuelve (columnas, diccionarios, estadística) de la tabla."""
+    qs = tabla.queryset(using)
+    previa = anterior.manifiesto["tablas"].get(nombre) if anterior else None
+
+    if previa is not None:
+        ids = anterior.columna(nombre, "id")
+        max_id = int(ids[-1]) if len(ids) else 0
+        if qs.filter(pk__lte=max_id).count() != len(ids):
+            previa = None  # hubo borrados: se reconstruye la tabla
+
+    if previa is None:
+        diccionarios = {}
+        columnas = _leer(tabla, qs, diccionarios)
+        return columnas, diccionarios, {"modo": "completo", "leidas": len(columnas["id"])}
+
+    diccionarios = {c: list(v) for c, v in previa["diccionarios"].items()}
+    desde = marca_anterior - MARGEN_RELECTURA
+    cambios = Q(pk__gt=max_id) | Q(fecha_actualizacion__gte=desde)
+    if tabla.depende_de:
+        cambios |= Q(**{f"{tabla.depende_de}__fecha_actualizacion__gte": desde})
+    leidas = _leer(tabla, qs.filter(cambios), diccionarios)
+
+    nuevas = leidas["id"] > max_id
+    actualizadas = ~nuevas
+    posiciones = np.searchsorted(ids, leidas["id"][actualizadas])
+    columnas = {}
+    for columna, _, _ in tabla.columnas:
+        valores = np.array(anterior.columna(nombre, columna))
+        valores[posiciones] = leidas[columna][actualizadas]
+        columnas[columna] = np.concatenate([valores, leidas[columna][nuevas]])
+    return columnas, diccionarios, {
+        "modo": "incremental",
+        "leidas": len(leidas["id"]),
+        "nuevas": int(nuevas.sum()),
+        "actualizadas": int(actualizadas.sum()),
+    }
+
+
+def _escribir_actual(directorio, generacion):
+    temporal = directorio / f".{ARCHIVO_ACTUAL}.{uuid.uuid4().hex[:8]}"
+    temporal.write_text(generacion, encoding="utf-8")
+    os.replace(temporal, directorio / ARCHIVO_ACTUAL)
+
+
+def _podar(directorio, vigente):
+    generaciones = sorted(p for p in directorio.iterdir() if p.is_dir() and p.name.startswith("g"))
+    for ruta in generaciones[:-GENERACIONES_RETENIDAS]:
+        if ruta.name != vigente:
+            # En Windows un lector con el memmap abierto impide borrar; se
+            # reintenta en la próxima construcción
+            shutil.rmtree(ruta, ignore_errors=True)
+
+
+def construir(directorio=None, using=None, completo=False):
+    """
+    Construye una generación nueva del snapshot y la publica. Devuelve el
+    manifiesto, con la estadística de lectura por tabla en 'construccion'.
+    """
+    directorio = Path(directorio or settings.REPORTES_SNAPSHOT_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    using = using or router.db_for_read(Parto)
+    base = str(connections[using].settings_dict["NAME"])
+    marca = timezone.now()
+
+    anterior = None if completo else Snapshot.abrir(directorio)
+    if anterior is not None and anterior.manifiesto["base"] != base:
+        anterior = None
+    marca_anterior = anterior.marca if anterior else None
+
+    generacion = f"g{marca:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    destino = directorio / generacion
+    destino.mkdir()
+
+    manifiesto = {
+        "formato": FORMATO,
+        "base": base,
+        "generacion": generacion,
+        "marca": marca.isoformat(),
+        "tablas": {},
+        "construccion": {},
+    }
+    for nombre, tabla in TABLAS.items():
+        columnas, diccionarios, estadistica = _construir_tabla(nombre, tabla, using, anterior, marca_anterior)
+        for columna, valores in columnas.items():
+            np.save(destino / f"{nombre}.{columna}.npy", valores)
+        manifiesto["tablas"][nombre] = {
+            "filas": int(len(columnas["id"])),
+            "columnas": {c: t for c, _, t in tabla.columnas},
+            "diccionarios": diccionarios,
+        }
+        manifiesto["construccion"][nombre] = estadistica
+
+    with open(destino / ARCHIVO_MANIFIESTO, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    _escribir_actual(directorio, generacion)
+    _podar(directorio, generacion)
+    return manifiesto
+
+
+# --- LECTURA ---
+
+_abierto = None
+
+
+class Snapshot:
+    """Generación publicada del snapshot; las columnas se abren como memmap."""
+
+    def __init__(self, ruta, manifiesto):
+        self.ruta = Path(ruta)
+        self.manifiesto = manifiesto
+        self._columnas = {}
+
+    @classmethod
+    def abrir(cls, directorio=None):
+        """Generación actual del directorio, o None si no hay una válida."""
+        global _abierto
+        directorio = Path(directorio or settings.REPORTES_SNAPSHOT_DIR)
+        try:
+            generacion = (directorio / ARCHIVO_ACTUAL).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        ruta = directorio / generacion
+        if _abierto is not None and _abierto.ruta == ruta:
+            return _abierto
+        try:
+            with open(ruta / ARCHIVO_MANIFIESTO, encoding="utf-8") as f:
+                manifiesto = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifiesto.get("formato") != FORMATO:
+            return None
+        _abierto = cls(ruta, manifiesto)
+        return _abierto
+
+    @classmethod
+    def vigente(cls, using="default", max_edad=None):
+        """
+        Snapshot utilizable para la base `using`: construido desde esa misma
+        base y con menos de REPORTES_SNAPSHOT_MAX_EDAD segundos (0 = nunca).
+        """
+        if max_edad is None:
+            max_edad = getattr(settings, "REPORTES_SNAPSHOT_MAX_EDAD", 0)
+        if not max_edad:
+            return None
+        snapshot = cls.abrir()
+        if snapshot is None or snapshot.manifiesto["base"] != str(connections[using].settings_dict["NAME"]):
+            return None
+        if timezone.now() - snapshot.marca > timedelta(seconds=max_edad):
+            return None
+        return snapshot
+
+    @property
+    def generacion(self):
+        return self.manifiesto["generacion"]
+
+    @property
+    def marca(self):
+        return datetime.fromisoformat(self.manifiesto["marca"])
+
+    def filas(self, tabla):
+        return self.manifiesto["tablas"][tabla]["filas"]
+
+    def columna(self, tabla, nombre):
+        clave = (tabla, nombre)
+        if clave not in self._columnas:
+            self._columnas[clave] = np.load(self.ruta / f"{tabla}.{nombre}.npy", mmap_mode="r")
+        return self._columnas[clave]
+
+    def diccionario(self, tabla, columna):
+        return self.manifiesto["tablas"][tabla]["diccionarios"][columna]
+
+    # --- OPERACIONES VECTORIZADAS ---
+
+    def mascara_ventana(self, tabla, ventana):
+        """Filas de `tabla` con fecha_hora dentro de la ventana (None = todas)."""
+        if not ventana.acotada:
+            return None
+        fechas = self.columna(tabla, "fecha_hora")
+        mascara = np.ones(len(fechas), dtype=bool)
+        if ventana.inicio is not None:
+            mascara &= fechas >= _segundos(ventana.inicio)
+        if ventana.fin is not None:
+            mascara &= fechas < _segundos(ventana.fin)
+        return mascara
+
+    def seleccionar(self, tabla, columna, mascara=None):
+        valores = self.columna(tabla, columna)
+        return valores if mascara is None else valores[mascara]
+
+    def conteo(self, tabla, columna, mascara=None, posiciones=None):
+        """{valor decodificado: filas} de una columna categórica."""
+        codigos = self.seleccionar(tabla, columna, mascara)
+        if posiciones is not None:
+            codigos = codigos[posiciones]
+        conteos = np.bincount(codigos + 1, minlength=1)[1:]  # el código -1 (vacío) cae en el 0
+        lista = self.diccionario(tabla, columna)
+        return {lista[i]: int(n) for i, n in enumerate(conteos) if n}
+
+    def resumen(self, ventana):
+        """Mismo resultado que `ejecutor.ejecutar` para la ventana."""
+        from .ejecutor import ANCHO_HISTOGRAMA_PESO, CAMPOS_STATS, parcial_vacio
+
+        resumen = parcial_vacio()
+        m_partos = self.mascara_ventana("partos", ventana)
+        m_rn = self.mascara_ventana("rn", ventana)
+
+        resumen["total_partos"] = int(len(self.seleccionar("partos", "id", m_partos)))
+        resumen["total_recien_nacidos"] = int(len(self.seleccionar("rn", "id", m_rn)))
+        resumen["total_complicaciones"] = int(np.count_nonzero(self.seleccionar("partos", "complicado", m_partos)))
+        resumen["tipo_parto"] = self.conteo("partos", "tipo_parto", m_partos)
+        resumen["posicion_parto"] = self.conteo("partos", "posicion_parto", m_partos)
+        resumen["sexo"] = self.conteo("rn", "sexo", m_rn)
+
+        for campo in CAMPOS_STATS:
+            valores = self.seleccionar("rn", campo, m_rn).astype(np.float64)
+            valores = valores[~np.isnan(valores)]
+            resumen["stats"][campo] = [int(len(valores)), float(valores.sum()), float(np.square(valores).sum())]
+
+        peso = self.seleccionar("rn", "peso_gramos", m_rn)
+        bins = (peso[~np.isnan(peso)] // ANCHO_HISTOGRAMA_PESO).astype(np.int64)
+        valores, conteos = np.unique(bins, return_counts=True)
+        resumen["histograma_peso"] = {str(int(v) * ANCHO_HISTOGRAMA_PESO): int(n) for v, n in zip(valores, conteos)}
+        return resumen
+
+    def distribuciones(self, ventana, campos=DISTRIBUCIONES_DEMOGRAFICAS):
+        """Mismo resultado que `Cohorte(ventana).distribuciones()`."""
+        madres = np.unique(self.seleccionar("partos", "paciente_id", self.mascara_ventana("partos", ventana)))
+        ids = self.columna("pacientes", "id")
+        posiciones = np.searchsorted(ids, madres)
+        encontradas = posiciones < len(ids)
+        encontradas[encontradas] = ids[posiciones[encontradas]] == madres[encontradas]
+        posiciones = posiciones[encontradas]
+
+        resultado = {}
+        for campo, (clave, choices) in campos.items():
+            mapping = dict(choices.choices) if choices else {}
+            totales = self.conteo("pacientes", campo, posiciones=posiciones)
+            resultado[clave] = [
+                {"display": str(mapping.get(valor, valor)), "total": total}
+                for valor, total in sorted(totales.items(), key=lambda kv: -kv[1])
+            ]
+        return resultado
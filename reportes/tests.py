@@ -1,9 +1,36 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from django.urls import reverse
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db.models import Avg, Count
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
 from django.utils import timezone
+import numpy as np
+
+from clinica.models import Paciente, Parto, RecienNacido, TipoParto
+from core.pruebas import DatosSinteticosMixin, generar_datos
 
-from clinica.models import Paciente, Parto, RecienNacido
+from . import analitica, benchmark, cohortes, ejecutor, exportadores, snapshot
+from .exportadores import texto
+from .cohortes import Cohorte
+from .downsampling import lttb, serie_evolucion
+from .models import PerfilEjecucion
+from .profiling import perfilar_trabajo, tabla_acumulada
+from .time_window import MES, SEMANA, TimeWindow
 
 
 class ReportesDashboardTests(TestCase):
@@ -48,3 +75,512 @@ class ReportesDashboardTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context["total_partos"], 1)
         self.assertContains(response, "Dashboard de Obstetricia")
+
+
+class BenchmarkComparacionTests(TestCase):
+    def corrida(self, tiempo, consultas=5, memoria=100.0):
+        return {"resultados": {"dashboard": {
+            "status": 200, "tiempo_ms": tiempo, "consultas": consultas, "memoria_pico_kb": memoria,
+        }}}
+
+    def test_detecta_regresion_de_tiempo_y_consultas(self):
+        regresiones = benchmark.comparar(self.corrida(100), self.corrida(150, consultas=6), umbral=0.15)
+        metricas = {metrica for _, metrica, _, _ in regresiones}
+        self.assertEqual(metricas, {"tiempo_ms", "consultas"})
+
+    def test_ignora_ruido_bajo_el_piso(self):
+        self.assertEqual(benchmark.comparar(self.corrida(2), self.corrida(4), umbral=0.15, piso_ms=5), [])
+
+
+def vista_que_falla(request):
+    raise RuntimeError("falla perfilada")
+
+
+# URLconf mínima para ProfilingTests (la vista vive en la app "reportes")
+urlpatterns = [path("falla/", vista_que_falla)]
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PROFILING_MAX_PERFILES=2)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser(username="director", password="segura123")
+        self.usuario = User.objects.create_user(username="lectura", password="segura123")
+
+    def test_cabecera_perfila_para_acceso_total(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("reportes:auditoria_list"), HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 200)
+        perfil = PerfilEjecucion.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(perfil.nombre, "reportes:auditoria_list")
+        self.assertTrue(tabla_acumulada(perfil.archivo, top=5))
+        admin = self.client.get(reverse("admin:reportes_perfilejecucion_change", args=[perfil.pk]))
+        self.assertContains(admin, "Acumulado (ms)")
+
+    def test_cabecera_ignorada_sin_acceso_total(self):
+        self.client.force_login(self.usuario)
+        self.client.get(reverse("Home"), HTTP_X_PROFILE="1")
+        self.assertFalse(PerfilEjecucion.objects.exists())
+
+    def test_trabajos_y_retencion(self):
+        for _ in range(3):
+            with perfilar_trabajo("trabajo_prueba", forzar=True):
+                sum(range(1000))
+        self.assertEqual(PerfilEjecucion.objects.filter(tipo="trabajo").count(), 2)
+
+    @override_settings(ROOT_URLCONF="reportes.tests")
+    def test_excepcion_de_vista_perfilada_sigue_el_manejo_normal(self):
+        self.client.force_login(self.admin)
+        with self.assertRaisesMessage(RuntimeError, "falla perfilada"):
+            self.client.get("/falla/", HTTP_X_PROFILE="1")
+
+        self.client.raise_request_exception = False
+        response = self.client.get("/falla/", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 500)
+        perfil = PerfilEjecucion.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(perfil.tipo, "request")
+        # El perfilador quedó apagado: un trabajo posterior se perfila aparte
+        with perfilar_trabajo("despues_de_la_falla", forzar=True):
+            pass
+        self.assertTrue(PerfilEjecucion.objects.filter(nombre="despues_de_la_falla").exists())
+
+    def test_trabajo_anidado_queda_en_el_perfil_externo(self):
+        with perfilar_trabajo("externo", forzar=True):
+            with perfilar_trabajo("interno", forzar=True):
+                sum(range(1000))
+        self.assertEqual(list(PerfilEjecucion.objects.values_list("nombre", flat=True)), ["externo"])
+
+    @override_settings(PROFILING_TASA_TRABAJOS=1.0)
+    def test_comando_de_snapshot_perfilado(self):
+        call_command("construir_snapshot", "--directorio", tempfile.mkdtemp(), stdout=StringIO())
+        self.assertTrue(PerfilEjecucion.objects.filter(tipo="trabajo", nombre="construir_snapshot").exists())
+
+
+class TimeWindowTests(SimpleTestCase):
+    def test_rango_semiabierto_con_zona_horaria(self):
+        ventana = TimeWindow.desde_parametros({"fecha_inicio": "2024-03-01", "fecha_final": "2024-03-31"})
+        self.assertTrue(timezone.is_aware(ventana.inicio))
+        self.assertEqual(timezone.localtime(ventana.inicio).date(), date(2024, 3, 1))
+        self.assertEqual(timezone.localtime(ventana.fin).date(), date(2024, 4, 1))
+        self.assertEqual(set(ventana.filtro("fecha_hora")), {"fecha_hora__gte", "fecha_hora__lt"})
+        ultimo_minuto = timezone.make_aware(datetime(2024, 3, 31, 23, 59))
+        self.assertTrue(ventana.contiene(ultimo_minuto))
+        self.assertFalse(ventana.contiene(ventana.fin))
+
+    def test_parametros_invalidos_o_historico(self):
+        self.assertFalse(TimeWindow.desde_parametros({"fecha_inicio": "ayer", "fecha_final": "hoy"}).acotada)
+        self.assertFalse(TimeWindow.desde_parametros({"days": "historic"}).acotada)
+        ventana = TimeWindow.desde_parametros({"days": "30"})
+        self.assertIsNone(ventana.fin)
+        self.assertEqual(ventana.titulo(), "(Últimos 30 días)")
+
+    def test_se_parsea_una_vez_por_request(self):
+        request = RequestFactory().get("/", {"days": "7"})
+        self.assertIs(TimeWindow.desde_request(request), TimeWindow.desde_request(request))
+
+    def test_buckets(self):
+        ventana = TimeWindow.entre_fechas(date(2024, 1, 10), date(2024, 3, 5))
+        self.assertEqual(ventana.buckets(MES), [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(ventana.buckets(SEMANA)[0], date(2024, 1, 8))
+        self.assertEqual(ventana.granularidad(), "day")
+        self.assertEqual(TimeWindow.entre_fechas(date(2022, 1, 1), date(2024, 1, 1)).granularidad(), SEMANA)
+        self.assertEqual(TimeWindow.entre_fechas(date(2015, 1, 1), date(2024, 1, 1)).granularidad(), MES)
+        self.assertEqual(TimeWindow.etiqueta(date(2024, 2, 1), MES), "2024-02")
+
+
+class TimeWindowIndiceTests(TestCase):
+    def test_filtro_usa_busqueda_por_indice(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN es propio de SQLite")
+        ventana = TimeWindow.entre_fechas(date(2024, 1, 1), date(2024, 12, 31))
+        consulta = ventana.aplicar(Parto.objects.all(), "fecha_hora").values("id")
+        sql, params = consulta.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn("SEARCH", plan)
+        self.assertIn("idx_parto_fecha", plan)
+
+
+class CohorteTests(DatosSinteticosMixin, TestCase):
+    datos = {"madres": 60, "anios": 2, "semilla": 11}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ventana = TimeWindow.entre_fechas(date(2024, 1, 1), date(2024, 6, 30))
+
+    def esperado(self):
+        partos = Parto.objects.filter(fecha_hora__date__range=[date(2024, 1, 1), date(2024, 6, 30)])
+        return set(partos.values_list("paciente_id", flat=True))
+
+    def test_estrategias_y_tabla_temporal_coinciden(self):
+        self.assertTrue(self.esperado())
+        for estrategia in (cohortes.EXISTS, cohortes.SEMI_JOIN):
+            cohorte = Cohorte(self.ventana, estrategia=estrategia)
+            self.assertEqual(set(cohorte.pacientes().values_list("pk", flat=True)), self.esperado())
+            self.assertNotIn("DISTINCT", str(cohorte.pacientes().query))
+        with cohorte.materializar():
+            self.assertEqual(set(cohorte.pacientes().values_list("pk", flat=True)), self.esperado())
+        self.assertIn("EXISTS", str(Cohorte(TimeWindow()).pacientes().query))
+
+    def test_distribuciones_en_una_consulta(self):
+        cohorte = Cohorte(self.ventana)
+        with self.assertNumQueries(1):
+            distribuciones = cohorte.distribuciones()
+        pacientes = Paciente.objects.filter(pk__in=self.esperado())
+        estado_civil = {
+            str(Paciente.EstadoCivilChoices(f["estado_civil"]).label): f["total"]
+            for f in pacientes.exclude(estado_civil="").values("estado_civil").annotate(total=Count("id"))
+        }
+        self.assertEqual(
+            {d["display"]: d["total"] for d in distribuciones["distribucion_estado_civil"]}, estado_civil
+        )
+        nacionalidades = {
+            f["nacionalidad__nombre"]: f["total"]
+            for f in pacientes.filter(nacionalidad__isnull=False).values("nacionalidad__nombre").annotate(total=Count("id"))
+        }
+        self.assertEqual(
+            {d["display"]: d["total"] for d in distribuciones["distribucion_nacionalidad"]}, nacionalidades
+        )
+
+
+class DownsamplingTests(TestCase):
+    def test_lttb_conserva_extremos_y_picos(self):
+        puntos = [(x, 100 if x == 437 else x % 7) for x in range(1000)]
+        reducidos = lttb(puntos, 50)
+        self.assertEqual(len(reducidos), 50)
+        self.assertEqual(reducidos[0], puntos[0])
+        self.assertEqual(reducidos[-1], puntos[-1])
+        self.assertIn((437, 100), reducidos)
+        self.assertEqual(lttb(puntos[:10], 50), puntos[:10])
+
+    def test_serie_columnar_por_mes(self):
+        generar_datos(madres=80, anios=3, semilla=5)
+        serie = serie_evolucion(Parto.objects.all(), "fecha_hora", Count("id"), MES, objetivo=12)
+        self.assertEqual(serie["granularity"], MES)
+        self.assertEqual(len(serie["labels"]), len(serie["values"]))
+        self.assertLessEqual(len(serie["values"]), 12)
+        self.assertGreater(serie["total_points"], 12)
+        completa = serie_evolucion(Parto.objects.all(), "fecha_hora", Count("id"), MES, objetivo=1000)
+        self.assertEqual(sum(completa["values"]), Parto.objects.count())
+        self.assertRegex(completa["labels"][0], r"^\d{4}-\d{2}$")
+
+
+class EjecutorParticionadoTests(DatosSinteticosMixin, TestCase):
+    cache_local = True
+
+    def test_combinacion_igual_a_consulta_directa(self):
+        resumen = ejecutor.ejecutar(TimeWindow(), procesos=1)
+        self.assertEqual(resumen["total_partos"], Parto.objects.count())
+        self.assertEqual(resumen["total_recien_nacidos"], RecienNacido.objects.count())
+        self.assertEqual(sum(resumen["histograma_peso"].values()), RecienNacido.objects.count())
+        tipos = dict(Parto.objects.values_list("tipo_parto__nombre").annotate(t=Count("id")))
+        self.assertEqual(resumen["tipo_parto"], {k: v for k, v in tipos.items() if k})
+        promedio, _ = ejecutor.promedio_y_desviacion(*resumen["stats"]["peso_gramos"])
+        self.assertAlmostEqual(promedio, RecienNacido.objects.aggregate(p=Avg("peso_gramos"))["p"])
+
+    def test_meses_cerrados_en_cache_e_invalidacion(self):
+        ventana = TimeWindow.entre_fechas(date(2023, 1, 1), date(2023, 12, 31))
+        primero = ejecutor.ejecutar(ventana, procesos=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(ejecutor.ejecutar(ventana, procesos=1), primero)
+
+        parto = Parto.objects.filter(**ventana.filtro("fecha_hora")).first()
+        parto.complicaciones = "Hemorragia postparto"
+        clave = ejecutor.clave_cache(TimeWindow.inicio_bucket(parto.fecha_hora, MES))
+        with self.captureOnCommitCallbacks(execute=True):
+            parto.save()
+            # Hasta el commit, un reporte concurrente sigue leyendo la fila anterior
+            self.assertIsNotNone(cache.get(clave))
+        self.assertIsNone(cache.get(clave))
+        self.assertEqual(ejecutor.ejecutar(ventana, procesos=1)["total_partos"], primero["total_partos"])
+
+    def test_escrituras_sin_senales_invalidan_todos_los_meses(self):
+        ventana = TimeWindow.entre_fechas(date(2023, 1, 1), date(2023, 12, 31))
+        primero = ejecutor.ejecutar(ventana, procesos=1)
+
+        # Renombrar un tipo de parto cambia las claves de todos los meses
+        tipo = TipoParto.objects.filter(episodios__fecha_hora__year=2023).distinct().first()
+        tipo.nombre = f"{tipo.nombre} (renombrado)"
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo.save()
+        self.assertIn(tipo.nombre, ejecutor.ejecutar(ventana, procesos=1)["tipo_parto"])
+
+        # bulk_create del generador sintético no pasa por las señales de Parto
+        generar_datos(madres=20, anios=2, semilla=4)
+        total = Parto.objects.filter(**ventana.filtro("fecha_hora")).count()
+        self.assertGreater(total, primero["total_partos"])
+        self.assertEqual(ejecutor.ejecutar(ventana, procesos=1)["total_partos"], total)
+
+    def test_parciales_con_vigencia_finita(self):
+        ventana = TimeWindow.entre_fechas(date(2023, 1, 1), date(2023, 1, 31))
+        clave = ejecutor.clave_cache(date(2023, 1, 1))
+        with override_settings(REPORTES_PARCIAL_TIMEOUT=60):
+            ejecutor.ejecutar(ventana, procesos=1)
+        self.assertIsNotNone(cache.get(clave))
+        self.assertLessEqual(cache._expire_info[cache.make_and_validate_key(clave)] - time.time(), 60)
+
+        # Caché local al proceso: las invalidaciones no llegan a otros workers
+        cache.clear()
+        ejecutor.ejecutar(ventana, procesos=1)
+        clave = ejecutor.clave_cache(date(2023, 1, 1))
+        self.assertLessEqual(
+            cache._expire_info[cache.make_and_validate_key(clave)] - time.time(), ejecutor.TIMEOUT_PARCIAL_LOCAL
+        )
+
+    def test_no_guarda_un_mes_invalidado_durante_el_calculo(self):
+        ventana = TimeWindow.entre_fechas(date(2023, 3, 1), date(2023, 3, 31))
+        calcular = ejecutor.calcular_parcial
+
+        def calcular_y_confirmar_cambio(desde, hasta, using):
+            parcial = calcular(desde, hasta, using)
+            # Otro request confirma un cambio del mes después de estas lecturas
+            ejecutor.invalidar_mes(desde)
+            return parcial
+
+        with mock.patch.object(ejecutor, "calcular_parcial", side_effect=calcular_y_confirmar_cambio):
+            ejecutor.ejecutar(ventana, procesos=1)
+        self.assertIsNone(cache.get(ejecutor.clave_cache(date(2023, 3, 1))))
+        ejecutor.ejecutar(ventana, procesos=1)
+        self.assertIsNotNone(cache.get(ejecutor.clave_cache(date(2023, 3, 1))))
+
+    def test_no_guarda_parciales_de_una_copia_anterior_al_cambio(self):
+        momento = timezone.make_aware(datetime(2024, 1, 20, 10, 0))
+        mes = date(2024, 1, 1)
+        ejecutor.invalidar_mes(momento)
+        self.assertFalse(ejecutor._guardable(mes, timezone.now() - timedelta(minutes=1)))
+        self.assertTrue(ejecutor._guardable(mes, timezone.now() + timedelta(minutes=1)))
+        self.assertTrue(ejecutor._guardable(mes, None))
+        self.assertTrue(ejecutor._guardable(date(2024, 2, 1), timezone.now() - timedelta(minutes=1)))
+        ejecutor.invalidar_todo()
+        self.assertFalse(ejecutor._guardable(date(2024, 2, 1), timezone.now() - timedelta(minutes=1)))
+
+    def test_particiones_recortan_bordes(self):
+        ventana = TimeWindow.entre_fechas(date(2024, 1, 15), date(2024, 3, 10))
+        particiones = ejecutor.particiones_mensuales(ventana)
+        self.assertEqual([mes for _, _, mes in particiones], [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(particiones[0][0], ventana.inicio)
+        self.assertEqual(particiones[-1][1], ventana.fin)
+
+
+class AnaliticaCrecimientoTests(DatosSinteticosMixin, TestCase):
+    cache_local = True
+    nombre_usuario = "analista"
+
+    def test_percentiles_vectorizados_igual_a_numpy(self):
+        rng = np.random.default_rng(7)
+        semanas_rn = rng.integers(34, 42, 2000).astype(float)
+        peso = rng.normal(3300, 450, 2000).round()
+        peso[::50] = np.nan
+        semanas, valores, conteos = analitica.percentiles_por_semana(peso, semanas_rn, minimo=1)
+        for i, semana in enumerate(semanas):
+            grupo = peso[(semanas_rn == semana) & ~np.isnan(peso)]
+            self.assertEqual(conteos[i], len(grupo))
+            np.testing.assert_allclose(valores[i], np.percentile(grupo, analitica.PERCENTILES))
+
+    def test_tasas_con_referencia_configurada(self):
+        peso = np.array([2000, 3000, 4500, 2500, np.nan])
+        semanas_rn = np.array([39, 39, 39, 30, 39], dtype=float)
+        peg, geg, evaluados = analitica.tasas_peg_geg(
+            peso, semanas_rn, np.array([39]), np.array([2800.0]), np.array([4000.0]),
+        )
+        # La semana 30 no está en la referencia y el NaN se descarta
+        self.assertEqual(evaluados, 3)
+        self.assertAlmostEqual(peg, 1 / 3)
+        self.assertAlmostEqual(geg, 1 / 3)
+
+    def test_carga_y_cache_por_version(self):
+        mediciones = analitica.cargar_mediciones(lote=37)
+        self.assertEqual(len(mediciones), RecienNacido.objects.count())
+        self.assertAlmostEqual(np.nanmean(mediciones.peso), RecienNacido.objects.aggregate(p=Avg("peso_gramos"))["p"])
+
+        with self.settings(ANALITICA_REFERENCIA_PESO={s: (2500, 4000) for s in range(24, 44)}):
+            resultado = analitica.crecimiento()
+            self.assertEqual(resultado["referencia"], "configurada")
+            self.assertEqual(sum(resultado["histograma_peso"]["values"]), RecienNacido.objects.exclude(peso_gramos=None).count())
+            # Acierto de caché: solo las consultas de la versión de datos
+            with self.assertNumQueries(2):
+                self.assertEqual(analitica.crecimiento(), resultado)
+
+            rn = RecienNacido.objects.first()
+            rn.peso_gramos += 1
+            rn.save()
+            with self.assertNumQueries(3):
+                analitica.crecimiento()
+
+    def test_metrica_en_api(self):
+        respuesta = self.client.get(reverse("reportes:api_chart_data"), {"metric": "crecimiento_percentiles", "days": "historic"})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos["type"], "percentiles")
+        self.assertEqual(datos["referencia"], "local")
+        self.assertEqual(set(datos["series"]), {"P3", "P10", "P50", "P90", "P97"})
+        self.assertEqual(len(datos["labels"]), len(datos["series"]["P50"]))
+
+
+class SnapshotColumnarTests(DatosSinteticosMixin, TestCase):
+    cache_local = True
+
+    def setUp(self):
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def construir(self, **kwargs):
+        return snapshot.construir(self.directorio, **kwargs)
+
+    def test_resumen_y_distribuciones_iguales_a_la_base(self):
+        self.construir()
+        snap = snapshot.Snapshot.abrir(self.directorio)
+        self.assertIsInstance(snap.columna("rn", "peso_gramos"), np.memmap)
+        for ventana in (TimeWindow(), TimeWindow.entre_fechas(date(2023, 3, 1), date(2023, 9, 15))):
+            self.assertEqual(snap.resumen(ventana), ejecutor.ejecutar(ventana, procesos=1))
+            esperadas = Cohorte(ventana).distribuciones()
+            for clave, filas in snap.distribuciones(ventana).items():
+                self.assertCountEqual(filas, esperadas[clave])
+
+    def test_incremental_por_pk_y_fecha_actualizacion(self):
+        self.construir()
+        parto = Parto.objects.order_by("pk").first()
+        parto.fecha_hora = parto.fecha_hora.replace(year=2015)
+        parto.save()
+        rn = RecienNacido.objects.order_by("-pk")[3]
+        rn.peso_gramos = 5100
+        rn.save()
+        nuevo = RecienNacido.objects.get(pk=rn.pk)
+        nuevo.pk, nuevo.sexo = None, "I"
+        nuevo.save()
+
+        manifiesto = self.construir()
+        self.assertEqual(manifiesto["construccion"]["rn"]["modo"], "incremental")
+        self.assertEqual(manifiesto["construccion"]["rn"]["nuevas"], 1)
+        snap = snapshot.Snapshot.abrir(self.directorio)
+        ids = np.asarray(snap.columna("rn", "id"))
+        self.assertEqual(list(ids), list(RecienNacido.objects.order_by("pk").values_list("pk", flat=True)))
+        self.assertEqual(snap.columna("rn", "peso_gramos")[np.searchsorted(ids, rn.pk)], 5100)
+        self.assertEqual(snap.resumen(TimeWindow()), ejecutor.ejecutar(TimeWindow(), procesos=1))
+        # La fecha del parto desnormalizada en sus RN también se actualiza
+        ventana = TimeWindow.entre_fechas(date(2015, 1, 1), date(2015, 12, 31))
+        self.assertEqual(snap.resumen(ventana)["total_recien_nacidos"], parto.recien_nacidos.count())
+
+        Parto.objects.order_by("pk").last().delete()
+        manifiesto = self.construir()
+        self.assertEqual(manifiesto["construccion"]["partos"]["modo"], "completo")
+        self.assertEqual(snapshot.Snapshot.abrir(self.directorio).filas("partos"), Parto.objects.count())
+
+    def test_vigencia_y_uso_en_analitica(self):
+        with self.settings(REPORTES_SNAPSHOT_DIR=self.directorio, REPORTES_SNAPSHOT_MAX_EDAD=600):
+            self.assertIsNone(snapshot.Snapshot.vigente())
+            self.construir()
+            snap = snapshot.Snapshot.vigente()
+            self.assertIsNotNone(snap)
+            # Sin consultas: ni versión de datos ni lectura de filas
+            with self.assertNumQueries(0):
+                resultado = analitica.crecimiento()
+            self.assertEqual(resultado, analitica.crecimiento(cargar=analitica.cargar_mediciones))
+            self.assertIsNone(snapshot.Snapshot.vigente(using="default", max_edad=0))
+
+
+class ExportadoresTests(DatosSinteticosMixin, TestCase):
+    datos = {"madres": 15, "anios": 1, "semilla": 5}
+    nombre_usuario = "exporta"
+
+    def test_arranque_no_importa_backends(self):
+        codigo = (
+            "import sys, django; django.setup(); import core.urls; "
+            "print([m for m in ('openpyxl', 'xhtml2pdf', 'reportlab', 'numpy') if m in sys.modules])"
+        )
+        salida = subprocess.run(
+            [sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings", "REPORTES_EXPORTADORES_PRECARGA": "0"},
+        ).stdout
+        self.assertEqual(salida.strip().splitlines()[-1], "[]")
+
+    def test_urls_existentes_y_por_formato(self):
+        historico = {"days": "historic"}
+        xlsx = self.client.get(reverse("reportes:exportar_excel"), historico)
+        self.assertEqual(xlsx["Content-Type"], exportadores.obtener("xlsx").content_type)
+        self.assertTrue(xlsx.content.startswith(b"PK"))
+        pdf = self.client.get(reverse("reportes:exportar_pdf"), historico)
+        self.assertTrue(b"".join(pdf.streaming_content).startswith(b"%PDF"))
+        self.assertTrue(exportadores.obtener("pdf").cargado)
+
+        csv = self.client.get(reverse("reportes:exportar", args=["csv"]), historico)
+        self.assertTrue(csv.streaming)
+        self.assertGreater(len(b"".join(csv.streaming_content).decode().splitlines()), 1)
+
+        self.assertEqual(self.client.get(reverse("reportes:exportar", args=["docx"])).status_code, 404)
+
+    def contenido(self, formato, **parametros):
+        respuesta = self.client.get(reverse("reportes:exportar", args=[formato]), parametros)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b"".join(respuesta.streaming_content)
+
+    def test_streaming_una_fila_por_recien_nacido_y_rango(self):
+        esperadas = Parto.objects.values_list("id", "recien_nacidos__id").count()
+        _, cuerpo = self.contenido("csv", days="historic")
+        lineas = cuerpo.decode().splitlines()
+        self.assertEqual(lineas[0].split(","), texto.ENCABEZADOS)
+        self.assertEqual(len(lineas), esperadas + 1)
+
+        ventana = TimeWindow.desde_parametros({"fecha_inicio": "2024-01-01", "fecha_final": "2024-03-31"})
+        en_rango = ventana.aplicar(Parto.objects.all(), "fecha_hora")
+        _, cuerpo = self.contenido("ndjson", fecha_inicio="2024-01-01", fecha_final="2024-03-31")
+        filas = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+        self.assertTrue(filas)
+        self.assertEqual(len(filas), en_rango.values_list("id", "recien_nacidos__id").count())
+        self.assertEqual({f["parto_id"] for f in filas}, set(en_rango.values_list("id", flat=True)))
+        self.assertTrue(all("2024-01-01" <= f["fecha_hora"][:10] <= "2024-03-31" for f in filas))
+
+    def test_gzip(self):
+        _, plano = self.contenido("ndjson", days="historic")
+        respuesta, comprimido = self.contenido("ndjson", days="historic", gzip="1")
+        self.assertEqual(respuesta["Content-Type"], "application/gzip")
+        self.assertTrue(respuesta["Content-Disposition"].endswith(".ndjson.gz"))
+        self.assertEqual(gzip.decompress(comprimido), plano)
+
+    def test_pdf_resumen_y_listado_con_platypus(self):
+        from pypdf import PdfReader
+
+        resumen = self.client.get(reverse("reportes:exportar_pdf"), {"days": "historic"})
+        self.assertEqual(resumen["Content-Type"], "application/pdf")
+        texto_resumen = PdfReader(io.BytesIO(b"".join(resumen.streaming_content))).pages[0].extract_text()
+        self.assertIn("Reporte de Gestión Obstétrica", texto_resumen)
+        self.assertIn(str(Parto.objects.count()), texto_resumen)
+
+        listado = self.client.get(reverse("reportes:exportar", args=["listado_pdf"]), {"days": "historic"})
+        self.assertTrue(listado["Content-Disposition"].startswith('attachment; filename="Listado_Partos_'))
+        texto_listado = "".join(p.extract_text() for p in PdfReader(io.BytesIO(b"".join(listado.streaming_content))).pages)
+        rut = Parto.objects.order_by("-fecha_hora").values_list("paciente__rut", flat=True).first()
+        self.assertIn(rut, texto_listado)
+
+    def test_pdf_con_fechas_con_marcado_se_escapan(self):
+        from pypdf import PdfReader
+
+        parametros = {"fecha_inicio": "<b", "fecha_final": "<img src='x'/>"}
+        for url in (reverse("reportes:exportar_pdf"), reverse("reportes:exportar", args=["listado_pdf"])):
+            respuesta = self.client.get(url, parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            texto = PdfReader(io.BytesIO(b"".join(respuesta.streaming_content))).pages[0].extract_text()
+            self.assertIn("Periodo: <b - <img src='x'/>", texto)
+
+    def test_tablas_paginadas_consumen_filas_por_bloque(self):
+        from pypdf import PdfReader
+
+        from .exportadores import pdf
+
+        leidas = []
+
+        def filas():
+            for i in range(1000):
+                leidas.append(i)
+                yield [f"fila-{i}", i, "x" * 100]
+
+        tablas = pdf.tabla_paginada(["Fila", "N", "Texto"], filas(), [4 * 28, 2 * 28, 8 * 28], [20, 6, 30])
+        next(tablas)
+        self.assertEqual(len(leidas), pdf.FILAS_POR_TABLA)
+        paginas = PdfReader(pdf.escribir_pdf(tablas)).pages
+        self.assertEqual(len(leidas), 1000)
+        self.assertGreater(len(paginas), 10)
+        self.assertIn("fila-999", paginas[-1].extract_text())
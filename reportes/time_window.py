@@ -0,0 +1,204 @@
+# reportes/time_window.py
+"""
+Ventana de tiempo compartida por los reportes.
+
+Los filtros `fecha_hora__date__range` / `__date__gte` envuelven la columna en
+una función de fecha y SQLite no puede usar `idx_parto_fecha`: recorre la
+tabla completa. `TimeWindow` traduce los parámetros del request a un rango
+semiabierto de datetimes con zona horaria (`campo__gte` / `campo__lt`), que sí
+es una búsqueda por rango sobre el índice.
+
+Parámetros aceptados (se leen una sola vez por request):
+- `fecha_inicio` y `fecha_final` (AAAA-MM-DD, ambos inclusive).
+- `days`: últimos N días, o `historic` para no acotar.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+DIA = "day"
+SEMANA = "week"
+MES = "month"
+
+TRUNCADORES = {DIA: TruncDay, SEMANA: TruncWeek, MES: TruncMonth}
+
+# Cantidad máxima de buckets antes de pasar a la granularidad siguiente
+# (hasta un año por día, hasta cinco años por semana)
+MAX_BUCKETS_DIARIOS = 366
+MAX_BUCKETS_SEMANALES = 260
+
+
+def inicio_del_dia(fecha):
+    """Medianoche local (aware) del día indicado."""
+    return timezone.make_aware(datetime.combine(fecha, time.min), timezone.get_current_timezone())
+
+
+def _parsear_fecha(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+class TimeWindow:
+    """
+    Rango semiabierto [inicio, fin) de datetimes aware. Cualquiera de los dos
+    extremos puede ser None (sin límite).
+    """
+
+    ATRIBUTO_REQUEST = "_reportes_time_window"
+
+    def __init__(self, inicio=None, fin=None, fecha_inicio=None, fecha_final=None, dias=None):
+        self.inicio = inicio
+        self.fin = fin
+        # Valores originales, para devolverlos al template y a los títulos
+        self.fecha_inicio = fecha_inicio
+        self.fecha_final = fecha_final
+        self.dias = dias
+
+    def __repr__(self):
+        return f"TimeWindow({self.inicio!r}, {self.fin!r})"
+
+    def __eq__(self, otro):
+        return isinstance(otro, TimeWindow) and (self.inicio, self.fin) == (otro.inicio, otro.fin)
+
+    def __hash__(self):
+        return hash((self.inicio, self.fin))
+
+    # --- CONSTRUCCIÓN ---
+
+    @classmethod
+    def entre_fechas(cls, fecha_inicio, fecha_final):
+        """Días calendario locales, ambos inclusive."""
+        return cls(
+            inicio_del_dia(fecha_inicio),
+            inicio_del_dia(fecha_final + timedelta(days=1)),
+            fecha_inicio=fecha_inicio,
+            fecha_final=fecha_final,
+        )
+
+    @classmethod
+    def ultimos_dias(cls, dias, hoy=None):
+        """Desde la medianoche de hace `dias` días, sin límite superior."""
+        hoy = hoy or timezone.localdate()
+        desde = hoy - timedelta(days=dias)
+        return cls(inicio_del_dia(desde), None, fecha_inicio=desde, dias=dias)
+
+    @classmethod
+    def desde_parametros(cls, params):
+        fecha_inicio = _parsear_fecha(params.get("fecha_inicio"))
+        fecha_final = _parsear_fecha(params.get("fecha_final"))
+        if fecha_inicio and fecha_final:
+            return cls.entre_fechas(fecha_inicio, fecha_final)
+
+        dias = params.get("days")
+        if dias and dias != "historic":
+            try:
+                return cls.ultimos_dias(int(dias))
+            except ValueError:
+                pass
+        return cls()
+
+    @classmethod
+    def desde_request(cls, request):
+        """Parsea `request.GET` una sola vez y reutiliza el resultado."""
+        ventana = getattr(request, cls.ATRIBUTO_REQUEST, None)
+        if ventana is None:
+            ventana = cls.desde_parametros(request.GET)
+            setattr(request, cls.ATRIBUTO_REQUEST, ventana)
+        return ventana
+
+    def titulo(self):
+        if self.dias is not None:
+            return f"(Últimos {self.dias} días)"
+        if self.fecha_inicio and self.fecha_final:
+            return f"({self.fecha_inicio:%d/%m/%Y} - {self.fecha_final:%d/%m/%Y})"
+        return "(Histórico)"
+
+    # --- FILTROS ---
+
+    @property
+    def acotada(self):
+        return self.inicio is not None or self.fin is not None
+
+    def filtro(self, campo):
+        """kwargs de rango indexable para `campo` (p.ej. 'fecha_hora')."""
+        kwargs = {}
+        if self.inicio is not None:
+            kwargs[f"{campo}__gte"] = self.inicio
+        if self.fin is not None:
+            kwargs[f"{campo}__lt"] = self.fin
+        return kwargs
+
+    def aplicar(self, queryset, campo):
+        return queryset.filter(**self.filtro(campo)) if self.acotada else queryset
+
+    def contiene(self, momento):
+        return (self.inicio is None or momento >= self.inicio) and (self.fin is None or momento < self.fin)
+
+    # --- BUCKETS ---
+
+    def dias_abarcados(self, primer_dato=None, ultimo_dato=None):
+        """Largo en días; usa los extremos de los datos para ventanas abiertas."""
+        inicio = self.inicio or primer_dato
+        fin = self.fin or ultimo_dato or timezone.now()
+        if inicio is None:
+            return None
+        return max((fin - inicio).days, 1)
+
+    def granularidad(self, primer_dato=None, ultimo_dato=None):
+        """Día, semana o mes según el largo de la ventana."""
+        dias = self.dias_abarcados(primer_dato, ultimo_dato)
+        if dias is None or dias > MAX_BUCKETS_SEMANALES * 7:
+            return MES
+        if dias > MAX_BUCKETS_DIARIOS:
+            return SEMANA
+        return DIA
+
+    @staticmethod
+    def truncar(campo, granularidad=DIA):
+        """Expresión Trunc* en la zona horaria local para agrupar por bucket."""
+        return TRUNCADORES[granularidad](campo, tzinfo=timezone.get_current_timezone())
+
+    @staticmethod
+    def inicio_bucket(momento, granularidad=DIA):
+        """Fecha local de inicio del bucket que contiene `momento`."""
+        fecha = timezone.localtime(momento).date() if isinstance(momento, datetime) else momento
+        if granularidad == SEMANA:
+            return fecha - timedelta(days=fecha.weekday())
+        if granularidad == MES:
+            return fecha.replace(day=1)
+        return fecha
+
+    @staticmethod
+    def siguiente_bucket(fecha, granularidad=DIA):
+        if granularidad == SEMANA:
+            return fecha + timedelta(days=7)
+        if granularidad == MES:
+            return date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+        return fecha + timedelta(days=1)
+
+    def buckets(self, granularidad=DIA, hasta=None):
+        """Fechas de inicio de cada bucket de la ventana (requiere inicio)."""
+        if self.inicio is None:
+            return []
+        actual = self.inicio_bucket(self.inicio, granularidad)
+        if self.fin is not None:
+            ultimo = self.inicio_bucket(self.fin - timedelta(microseconds=1), granularidad)
+        else:
+            ultimo = self.inicio_bucket(hasta or timezone.now(), granularidad)
+        fechas = []
+        while actual <= ultimo:
+            fechas.append(actual)
+            actual = self.siguiente_bucket(actual, granularidad)
+        return fechas
+
+    @staticmethod
+    def etiqueta(fecha, granularidad=DIA):
+        if isinstance(fecha, datetime):
+            fecha = timezone.localtime(fecha).date() if timezone.is_aware(fecha) else fecha.date()
+        if granularidad == MES:
+            return fecha.strftime("%Y-%m")
+        return fecha.strftime("%Y-%m-%d")
@@ -13,6 +13,7 @@ urlpatterns = [
     # Rutas de exportación
     path("exportar/excel/", views.ExportarReporteExcelView.as_view(), name="exportar_excel"),
     path("exportar/pdf/", views.ExportarReportePDFView.as_view(), name="exportar_pdf"),
+    path("exportar/<str:formato>/", views.ExportarReporteView.as_view(), name="exportar"),
 
     path('auditoria/', views.ReporteAuditoriaView.as_view(), name='auditoria_list'),
 ]
\ No newline at end of file
@@ -1,100 +1,90 @@
 # reportes/views.py
 
 import json
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from datetime import datetime, timedelta
-from math import sqrt
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse, HttpResponse
-from django.utils import timezone
+from django.http import Http404, JsonResponse
 # SE AGREGÓ 'Q' A LA IMPORTACIÓN
 from django.db.models import Count, Avg, StdDev, Q
-from django.db.models.functions import TruncDate
-from django.template.loader import get_template
-from xhtml2pdf import pisa
 from clinica.models import Paciente, Parto, RecienNacido, TipoParto
 from clinica.models import HistorialPaciente
+# analitica y snapshot (NumPy) se importan donde se usan, no al cargar las URLs
+from . import ejecutor, exportadores
+from .cohortes import Cohorte
+from .downsampling import granularidad_para, serie_evolucion
+from .time_window import TimeWindow
 
 # --- IMPORTACIÓN SEGURIDAD ---
 from core.mixins import PermitsPositionMixin
+from core.db_router import LecturaReportesMixin
+from core.metrics import medir_exportacion
 
 # --- MIXIN DE FILTRADO ---
 class ReporteFilterMixin:
+    def get_time_window(self, request):
+        return TimeWindow.desde_request(request)
+
+    def get_cohorte(self, request):
+        return Cohorte(self.get_time_window(request))
+
     def get_filtered_querysets(self, request):
         fecha_inicio_str = request.GET.get('fecha_inicio')
         fecha_final_str = request.GET.get('fecha_final')
+        ventana = self.get_time_window(request)
 
-        partos_qs = Parto.objects.all()
-        rn_qs = RecienNacido.objects.all()
-        pacientes_qs = Paciente.objects.all()
+        # Filtramos por la fecha CLÍNICA (fecha_hora) con un rango indexable
+        partos_qs = ventana.aplicar(Parto.objects.all(), 'fecha_hora')
+        rn_qs = ventana.aplicar(RecienNacido.objects.all(), 'parto__fecha_hora')
 
-        if fecha_inicio_str and fecha_final_str:
-            try:
-                fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
-                fecha_final = datetime.strptime(fecha_final_str, '%Y-%m-%d').date()
-                
-                # CORRECCIÓN: Filtramos por la fecha CLÍNICA (fecha_hora), no la de sistema
-                partos_qs = partos_qs.filter(fecha_hora__date__range=[fecha_inicio, fecha_final])
-                rn_qs = rn_qs.filter(parto__fecha_hora__date__range=[fecha_inicio, fecha_final])
-                
-                ids = partos_qs.values_list('paciente_id', flat=True).distinct()
-                pacientes_qs = Paciente.objects.filter(id__in=ids)
-            except ValueError:
-                pass
-        else:
-            ids = partos_qs.values_list('paciente_id', flat=True).distinct()
-            pacientes_qs = Paciente.objects.filter(id__in=ids)
+        # Madres con algún parto en la ventana, sin DISTINCT: `Cohorte` usa un
+        # subquery pk__in si la ventana está acotada y un EXISTS correlacionado si no
+        pacientes_qs = self.get_cohorte(request).pacientes()
 
         return partos_qs, rn_qs, pacientes_qs, fecha_inicio_str, fecha_final_str
 
 
 # --- VISTA DASHBOARD (PROTEGIDA) ---
-class ReportesObstetriciaView(PermitsPositionMixin, ReporteFilterMixin, TemplateView):
+class ReportesObstetriciaView(PermitsPositionMixin, LecturaReportesMixin, ReporteFilterMixin, TemplateView):
     template_name = "reportes/dashboard_obstetricia.html"
     
     permission_required = ['READ_ONLY', 'ADMINISTRATIVE', 'CLINICAL_FULL', 'TOTAL_ACCESS']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        partos_qs, rn_qs, pacientes_qs, f_ini, f_fin = self.get_filtered_querysets(self.request)
+        _, _, _, f_ini, f_fin = self.get_filtered_querysets(self.request)
         
         context.update({"fecha_inicio": f_ini, "fecha_final": f_fin})
+        from .snapshot import Snapshot
+
+        # Con un snapshot columnar vigente todo se calcula sobre memmap, sin
+        # tocar la base. Si no, agregados combinables por mes (meses cerrados
+        # en caché, el resto en paralelo)
+        ventana = self.get_time_window(self.request)
+        snapshot = Snapshot.vigente()
+        resumen = snapshot.resumen(ventana) if snapshot else ejecutor.ejecutar(ventana)
+        context["total_partos"] = resumen["total_partos"]
+        context["total_recien_nacidos"] = resumen["total_recien_nacidos"]
+        context["total_complicaciones"] = resumen["total_complicaciones"]
 
-        # Totales
-        context["total_partos"] = partos_qs.count()
-        context["total_recien_nacidos"] = rn_qs.count()
-        context["total_complicaciones"] = partos_qs.exclude(Q(complicaciones__isnull=True) | Q(complicaciones__exact='')).count()
+        def ordenar(conteos):
+            return sorted(conteos.items(), key=lambda kv: -kv[1])
 
         # Listas Resumen
-        # Agrupamos por el nombre del tipo de parto relacionado
-        tipo_raw = partos_qs.values('tipo_parto__nombre').annotate(total=Count('id')).order_by('-total')
         context["distribucion_tipo_parto"] = [
-            {'tipo_display': item['tipo_parto__nombre'], 'total': item['total']} 
-            for item in tipo_raw if item['tipo_parto__nombre']
+            {'tipo_display': nombre, 'total': total} for nombre, total in ordenar(resumen["tipo_parto"])
         ]
 
         # Posición
         pos_map = dict(Parto.PosicionPartoChoices.choices)
-        pos_raw = partos_qs.values('posicion_parto').annotate(total=Count('id')).order_by('-total')
-        context["distribucion_posicion_parto"] = [{'posicion_display': str(pos_map.get(i['posicion_parto'], i['posicion_parto'])), 'total': i['total']} for i in pos_raw if i['posicion_parto']]
+        context["distribucion_posicion_parto"] = [{'posicion_display': str(pos_map.get(k, k)), 'total': t} for k, t in ordenar(resumen["posicion_parto"])]
 
         sex_map = dict(RecienNacido.SexoChoices.choices)
-        sex_raw = rn_qs.values('sexo').annotate(total=Count('id')).order_by('sexo')
-        context["distribucion_sexo_rn"] = [{'sexo_display': str(sex_map.get(i['sexo'], i['sexo'])), 'total': i['total']} for i in sex_raw]
+        context["distribucion_sexo_rn"] = [{'sexo_display': str(sex_map.get(k, k)), 'total': t} for k, t in sorted(resumen["sexo"].items())]
 
-        # Stats Vitales
-        def calcular_stats(queryset, campo):
-            vals = list(queryset.values_list(campo, flat=True).exclude(**{f'{campo}__isnull': True}))
-            if not vals: return None, None
-            prom = sum(vals) / len(vals)
-            desv = sqrt(sum((x - prom) ** 2 for x in vals) / len(vals)) if len(vals) > 1 else 0
-            return prom, desv
-
-        p_peso, d_peso = calcular_stats(rn_qs, 'peso_gramos')
-        p_talla, d_talla = calcular_stats(rn_qs, 'talla_cm')
-        p_apgar, d_apgar = calcular_stats(rn_qs, 'apgar5')
+        # Stats Vitales (a partir de n, suma y suma de cuadrados)
+        p_peso, d_peso = ejecutor.promedio_y_desviacion(*resumen["stats"]["peso_gramos"])
+        p_talla, d_talla = ejecutor.promedio_y_desviacion(*resumen["stats"]["talla_cm"])
+        p_apgar, d_apgar = ejecutor.promedio_y_desviacion(*resumen["stats"]["apgar5"])
 
         context.update({
             "promedio_peso_rn": p_peso, "stddev_peso_rn": d_peso,
@@ -102,64 +92,55 @@ class ReportesObstetriciaView(PermitsPositionMixin, ReporteFilterMixin, Template
             "promedio_apgar_rn": p_apgar, "stddev_apgar_rn": d_apgar,
         })
 
-        # Demografía
-        def get_dist_fk(qs, field):
-            data = qs.values(f'{field}__nombre').annotate(total=Count('id')).order_by('-total')
-            return [{'display': str(i[f'{field}__nombre']), 'total': i['total']} for i in data if i[f'{field}__nombre']]
-
-        def get_dist_choice(qs, field, choices):
-            mapping = dict(choices.choices)
-            data = qs.values(field).annotate(total=Count('id')).order_by('-total')
-            return [{'display': str(mapping.get(i[field], i[field])), 'total': i['total']} for i in data if i[field]]
-
-        context["distribucion_pueblos"] = get_dist_fk(pacientes_qs, 'pueblo_originario')
-        context["distribucion_nacionalidad"] = get_dist_fk(pacientes_qs, 'nacionalidad')
-        context["distribucion_educacion"] = get_dist_choice(pacientes_qs, 'nivel_educacional', Paciente.NivelEducacionalChoices)
-        context["distribucion_estado_civil"] = get_dist_choice(pacientes_qs, 'estado_civil', Paciente.EstadoCivilChoices)
+        # Demografía: las cuatro distribuciones salen de una sola cohorte
+        if snapshot:
+            context.update(snapshot.distribuciones(ventana))
+        else:
+            context.update(self.get_cohorte(self.request).distribuciones())
 
         return context
 
 
 # --- VISTA API (JSON) - PROTEGIDA ---
-class ChartDataView(PermitsPositionMixin, View):
+class ChartDataView(PermitsPositionMixin, LecturaReportesMixin, View):
     permission_required = ['READ_ONLY', 'ADMINISTRATIVE', 'CLINICAL_FULL', 'TOTAL_ACCESS']
 
     def get(self, request):
         metric = request.GET.get('metric')
-        days_param = request.GET.get('days', '7')
-        start_date = None
-        title_suffix = "(Histórico)"
-
-        if days_param != 'historic':
-            try:
-                days = int(days_param)
-                start_date = timezone.now().date() - timedelta(days=days)
-                title_suffix = f"(Últimos {days} días)"
-            except ValueError:
-                pass
+        params = request.GET.copy()
+        params.setdefault('days', '7')
+        ventana = TimeWindow.desde_parametros(params)
+        title_suffix = ventana.titulo()
 
         data = {}
 
         # 1. EVOLUCIÓN (LÍNEA)
         if metric == 'partos_evolucion':
-            qs = Parto.objects.all()
             # CORRECCIÓN: Usamos 'fecha_hora' (la real del parto)
-            if start_date: qs = qs.filter(fecha_hora__date__gte=start_date)
+            qs = ventana.aplicar(Parto.objects.all(), 'fecha_hora')
             
-            # CORRECCIÓN: Agrupamos por 'fecha_hora'
-            evo = qs.annotate(date=TruncDate('fecha_hora')).values('date').annotate(c=Count('id')).order_by('date')
-            chart = [[i['date'].strftime('%Y-%m-%d'), i['c']] for i in evo]
-            data = {'title': f'Partos {title_suffix}', 'type': 'line', 'series_data': chart, 'labels': [x[0] for x in chart], 'values': [x[1] for x in chart]}
+            # Buckets de día/semana/mes según la ventana, reducidos con LTTB
+            serie = serie_evolucion(qs, 'fecha_hora', Count('id'), granularidad_para(ventana))
+            data = {'title': f'Partos {title_suffix}', 'type': 'line', **serie}
 
         elif metric == 'vitales_peso_evolucion':
-            qs = RecienNacido.objects.all()
             # CORRECCIÓN: Usamos 'parto__fecha_hora' (la fecha del parto asociado)
-            if start_date: qs = qs.filter(parto__fecha_hora__date__gte=start_date)
+            qs = ventana.aplicar(RecienNacido.objects.all(), 'parto__fecha_hora')
             
-            # CORRECCIÓN: Agrupamos por 'parto__fecha_hora'
-            evo = qs.annotate(date=TruncDate('parto__fecha_hora')).values('date').annotate(avg=Avg('peso_gramos')).order_by('date')
-            chart = [[i['date'].strftime('%Y-%m-%d'), round(i['avg'], 1)] for i in evo]
-            data = {'title': f'Peso Promedio {title_suffix}', 'type': 'line', 'color': '#34d399', 'series_data': chart, 'labels': [x[0] for x in chart], 'values': [x[1] for x in chart]}
+            serie = serie_evolucion(qs, 'parto__fecha_hora', Avg('peso_gramos'), granularidad_para(ventana), decimales=1)
+            data = {'title': f'Peso Promedio {title_suffix}', 'type': 'line', 'color': '#34d399', **serie}
+
+        elif metric == 'crecimiento_percentiles':
+            # Percentiles de peso por semana de gestación (NumPy, en caché por versión de datos)
+            from . import analitica
+
+            crec = analitica.crecimiento(ventana)
+            data = {
+                'title': f'Peso por Edad Gestacional {title_suffix}', 'type': 'percentiles',
+                'labels': crec['semanas'], 'series': crec['percentiles'], 'n': crec['conteos'],
+                'sga_rate': crec['tasa_peg'], 'lga_rate': crec['tasa_geg'],
+                'referencia': crec['referencia'], 'histograma': crec['histograma_peso'],
+            }
 
         # 2. DISTRIBUCIONES (VARIEDAD)
         else:
@@ -183,14 +164,13 @@ class ChartDataView(PermitsPositionMixin, View):
                 
                 # Filtro de fecha usando la fecha clínica correcta
                 date_field = 'fecha_hora' if Model == Parto else ('parto__fecha_hora' if Model == RecienNacido else 'fecha_creacion')
-                if Model == Paciente and start_date:
-                    # Pacientes se filtran por sus partos en la fecha
-                    partos_in = Parto.objects.filter(fecha_hora__date__gte=start_date)
-                    qs = qs.filter(partos__in=partos_in).distinct()
-                elif start_date:
+                if Model == Paciente and ventana.acotada:
+                    # Pacientes se filtran por sus partos en la fecha (EXISTS)
+                    qs = Cohorte(ventana).pacientes()
+                else:
                     # Nota: Si el modelo no tiene fecha_hora (como Paciente directo), usamos fecha_creacion por defecto,
                     # pero la lógica de arriba ya maneja Paciente via Parto.
-                    qs = qs.filter(**{f'{date_field}__date__gte': start_date})
+                    qs = ventana.aplicar(qs, date_field)
 
                 # Agrupamos por nombre de la relación FK
                 raw = qs.values(f'{field}__nombre').annotate(t=Count('id')).order_by('-t')
@@ -206,11 +186,10 @@ class ChartDataView(PermitsPositionMixin, View):
                 
                 date_field = 'fecha_hora' if Model == Parto else ('parto__fecha_hora' if Model == RecienNacido else 'fecha_creacion')
 
-                if Model == Paciente and start_date:
-                    partos_in = Parto.objects.filter(fecha_hora__date__gte=start_date)
-                    qs = qs.filter(partos__in=partos_in).distinct()
-                elif start_date:
-                    qs = qs.filter(**{f'{date_field}__date__gte': start_date})
+                if Model == Paciente and ventana.acotada:
+                    qs = Cohorte(ventana).pacientes()
+                else:
+                    qs = ventana.aplicar(qs, date_field)
 
                 if field == 'complicaciones':
                      qs = qs.exclude(Q(complicaciones__isnull=True)|Q(complicaciones__exact=''))
@@ -234,71 +213,34 @@ class ChartDataView(PermitsPositionMixin, View):
         return JsonResponse(data)
 
 
-# --- VISTA EXPORTAR EXCEL ---
-class ExportarReporteExcelView(PermitsPositionMixin, ReporteFilterMixin, View):
+# --- VISTAS DE EXPORTACIÓN ---
+class ExportarReporteView(PermitsPositionMixin, LecturaReportesMixin, ReporteFilterMixin, View):
+    """Exporta con el backend registrado en `reportes.exportadores` (importado al primer uso)."""
     permission_required = ['READ_ONLY', 'ADMINISTRATIVE', 'CLINICAL_FULL', 'TOTAL_ACCESS']
+    formato = None
 
-    def get(self, request):
-        partos_qs, rn_qs, _, f_ini, f_fin = self.get_filtered_querysets(request)
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Resumen Obstétrico"
-        
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill("solid", fgColor="4F81BD")
-        
-        ws['A1'] = f"Reporte: {f_ini or 'Histórico'} - {f_fin or 'Hoy'}"
-        ws['A3'] = "Total Partos"; ws['B3'] = partos_qs.count()
-        
-        cols = ["Fecha", "Paciente", "Edad", "Pueblo", "Educación", "Tipo", "Posición", "Sexo RN", "Peso", "Talla"]
-        for idx, title in enumerate(cols, 1):
-            c = ws.cell(row=6, column=idx, value=title)
-            c.font = header_font; c.fill = header_fill
-
-        row = 7
-        for p in partos_qs.select_related('paciente', 'tipo_parto', 'paciente__pueblo_originario', 'paciente__nacionalidad').prefetch_related('recien_nacidos'):
-            rn = p.recien_nacidos.first()
-            edad = "N/A"
-            if p.paciente.fecha_nacimiento:
-                hoy = timezone.now().date()
-                fn = p.paciente.fecha_nacimiento
-                edad = hoy.year - fn.year - ((hoy.month, hoy.day) < (fn.month, fn.day))
-
-            # Nombres seguros de FKs
-            pueblo = p.paciente.pueblo_originario.nombre if p.paciente.pueblo_originario else "-"
-            tipo_p = p.tipo_parto.nombre if p.tipo_parto else "-"
-
-            ws.append([
-                p.fecha_hora.strftime('%d/%m/%Y %H:%M'), # CORRECCIÓN: Usar fecha_hora
-                str(p.paciente), edad,
-                pueblo, p.paciente.get_nivel_educacional_display(),
-                tipo_p, p.get_posicion_parto_display(),
-                rn.get_sexo_display() if rn else "-", rn.peso_gramos if rn else "-", rn.talla_cm if rn else "-"
-            ])
-
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename=Reporte_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        wb.save(response)
-        return response
-
-# --- VISTA EXPORTAR PDF ---
-class ExportarReportePDFView(PermitsPositionMixin, ReporteFilterMixin, View):
-    permission_required = ['READ_ONLY', 'ADMINISTRATIVE', 'CLINICAL_FULL', 'TOTAL_ACCESS']
-    
-    def get(self, request):
-        view = ReportesObstetriciaView()
-        view.request = request
-        context = view.get_context_data()
-        template = get_template('reportes/reporte_pdf.html')
-        html = template.render(context)
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="Reporte.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
+    def get(self, request, formato=None):
+        formato = formato or self.formato
+        try:
+            exportador = exportadores.obtener(formato)
+        except KeyError:
+            raise Http404(f"Formato de exportación desconocido: {formato}")
+        if exportador.streaming:
+            return exportador(self, request)
+        with medir_exportacion(formato):
+            return exportador(self, request)
+
+
+class ExportarReporteExcelView(ExportarReporteView):
+    formato = "xlsx"
+
+
+class ExportarReportePDFView(ExportarReporteView):
+    formato = "pdf"
     
 
 # --- VISTA AUDITORÍA (MODIFICADA CON BUSCADOR) ---
-class ReporteAuditoriaView(PermitsPositionMixin, TemplateView):
+class ReporteAuditoriaView(PermitsPositionMixin, LecturaReportesMixin, TemplateView):
     template_name = "reportes/auditoria_list.html"
     permission_required = ['ADMINISTRATIVE', 'TOTAL_ACCESS']
 
@@ -322,16 +264,12 @@ class ReporteAuditoriaView(PermitsPositionMixin, TemplateView):
                 Q(usuario__first_name__icontains=search_query)
             )
 
-        # 2. Filtro por Fecha
-        if fecha_inicio and fecha_final:
-            try:
-                f_ini = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
-                f_fin = datetime.strptime(fecha_final, '%Y-%m-%d').date()
-                qs = qs.filter(fecha__date__range=[f_ini, f_fin])
-                context['fecha_inicio'] = fecha_inicio
-                context['fecha_final'] = fecha_final
-            except ValueError:
-                pass
+        # 2. Filtro por Fecha (rango indexable sobre 'fecha')
+        ventana = TimeWindow.desde_request(self.request)
+        if ventana.fecha_inicio and ventana.fecha_final:
+            qs = ventana.aplicar(qs, 'fecha')
+            context['fecha_inicio'] = fecha_inicio
+            context['fecha_final'] = fecha_final
         
         context['historial_qs'] = qs[:200]
         context['q'] = search_query # <--- Para mantener el texto en el input
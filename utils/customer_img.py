@@ -1,62 +1,72 @@
-from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from PIL import Image, ImageFile, UnidentifiedImageError
-import os
+from PIL import Image, ImageFile, ImageOps, UnidentifiedImageError
+import hashlib
+import io
+import logging
+
+logger = logging.getLogger(__name__)
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+IMAGEN_POR_DEFECTO = "profile.webp"
+TAMANOS_AVATAR = (32, 64, 300)
+CALIDAD_WEBP = 82
 
-def resize_image(img_path, img_size):
-    try:
-        with Image.open(img_path) as img:
-            ancho, alto = img.size
-            if alto != img_size or ancho != img_size:
-                if ancho > alto:
-                    nuevo_alto = img_size
-                    nuevo_ancho = int((ancho / alto) * nuevo_alto)
-                    img = img.resize(
-                        (nuevo_ancho, nuevo_alto), Image.Resampling.BILINEAR
-                    )
-                elif alto > ancho:
-                    nuevo_ancho = img_size
-                    nuevo_alto = int((alto / ancho) * nuevo_ancho)
-                    img = img.resize(
-                        (nuevo_ancho, nuevo_alto), Image.Resampling.BILINEAR
-                    )
-                else:
-                    img.thumbnail((img_size, img_size))
-                img.save(img_path)
-    except (FileExistsError, UnidentifiedImageError):
-        print("Error al Redimensionar la imagen")
-
-
-def crop_image(img_path, img_size):
+
+def ruta_variante(digest, tam):
+    return f"avatares/{digest[:2]}/{digest}-{tam}.webp"
+
+
+def procesar_avatar(nombre, tamanos=TAMANOS_AVATAR, storage=None, origen=None):
+    """
+    Genera las variantes cuadradas (WebP) de la imagen `nombre` del storage
+    con una sola decodificación: recorte centrado al tamaño mayor y de ahí
+    las reducciones. Las variantes se nombran por el hash del contenido
+    original, así que dos subidas iguales comparten archivos y no se vuelven
+    a procesar. `origen` es el storage de la imagen (por defecto el mismo de
+    las variantes). Devuelve el hash, o None si el archivo no es una imagen.
+    """
+    storage = storage or default_storage
+    with (origen or storage).open(nombre, "rb") as f:
+        datos = f.read()
+    digest = hashlib.sha256(datos).hexdigest()[:32]
+    if all(storage.exists(ruta_variante(digest, tam)) for tam in tamanos):
+        return digest
+
+    mayor = max(tamanos)
     try:
-        with Image.open(img_path) as img:
-            ancho, alto = img.size
-            if alto != img_size or ancho != img_size:
-                lado = min(ancho, alto)
-                left = (ancho - lado) / 2
-                top = (alto - lado) / 2
-                right = (ancho + lado) / 2
-                bottom = (alto + lado) / 2
-                img = img.crop((left, top, right, bottom))
-                img.save(img_path)
-    except (FileExistsError, UnidentifiedImageError):
-        print("Erro al Recortar la imagen")
-
-
-def handle_old_image(modelo, pk, image):
-    default_image = "profile.webp"
-    old_profile = modelo.objects.get(pk=pk)
-    default_image_path = os.path.join(settings.MEDIA_ROOT, default_image)
-
-    if (
-        old_profile.image.path != image.path
-        and old_profile.image.path != default_image_path
-    ):
-        default_storage.delete(old_profile.image.path)
-
-
-def upload_to_s3(img, s3_path):
-    print(f"Esta en el otro archivo {img} {s3_path}")
+        with Image.open(io.BytesIO(datos)) as img:
+            # JPEG: decodifica directamente a una escala cercana a la final
+            img.draft("RGB", (mayor, mayor))
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            cuadrado = ImageOps.fit(img, (mayor, mayor), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError):
+        logger.warning("No se pudo procesar la imagen %s", nombre, exc_info=True)
+        return None
+
+    for tam in sorted(tamanos, reverse=True):
+        variante = cuadrado if tam == mayor else cuadrado.resize((tam, tam), Image.Resampling.LANCZOS)
+        salida = io.BytesIO()
+        variante.save(salida, "WEBP", quality=CALIDAD_WEBP, method=4)
+        ruta = ruta_variante(digest, tam)
+        if not storage.exists(ruta):
+            storage.save(ruta, ContentFile(salida.getvalue()))
+    return digest
+
+
+def borrar_variantes(digest, tamanos=TAMANOS_AVATAR, storage=None):
+    storage = storage or default_storage
+    for tam in tamanos:
+        storage.delete(ruta_variante(digest, tam))
+
+
+def handle_old_image(nombre_anterior, image):
+    """
+    Suelta la imagen anterior tras una subida (nunca la por defecto). En el
+    almacén por contenido resta una referencia: si la nueva es el mismo
+    archivo, o lo usa otro perfil, no se borra.
+    """
+    if nombre_anterior and nombre_anterior != IMAGEN_POR_DEFECTO:
+        image.storage.delete(nombre_anterior)